@@ -1,62 +1,132 @@
-import CoolProp.CoolProp as CP
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import numpy as np
-import matplotlib.pyplot as plt
 
-# Define the substance
-substance = 'Methane'
+# CoolProp and matplotlib are imported inside the functions, run with: python -m Zephyr_v1.PVT_coolprop
 
-# Define the range of temperatures (K)
-temperatures = np.linspace(200, 2000, 10)  # 10 temperatures from 200K to 2000K
+# Outputs filled in by property_grid by default, any CoolProp parameter name can be asked for
+OUTPUTS = ('Dmass', 'Hmass', 'Cpmass', 'speed_of_sound')
 
-# Define the range of pressures (Pa)
-pressures = np.linspace(100000, 1000000, 100)  # Pressure range from 10,000 Pa to 10,000,000 Pa
+@lru_cache(maxsize=None)
+def abstract_state(fluid, backend='HEOS'):
+    """
+    Low-level CoolProp state for a fluid, created once per process and
+    reused for every update. backend can be 'HEOS', or 'TTSE&HEOS' /
+    'BICUBIC&HEOS' for the tabular backends, which are several times faster
+    per point once their tables are built (the first use builds and caches
+    them in ~/.CoolProp) but less accurate near the critical point and NaN
+    outside their table range.
+    """
+    import CoolProp.CoolProp as CP
+    return CP.AbstractState(backend, fluid)
 
-# Initialize a dictionary to hold volume values for each temperature
-volume_data = {T: [] for T in temperatures}
-saturation_liquid = []
-saturation_vapor = []
+def _grid_chunk(args):
+    # Evaluate one chunk of property_grid, runs in a worker process when a pool is used
+    fluid, backend, outputs, T, P = args
+    import CoolProp.CoolProp as CP
+    state = abstract_state(fluid, backend)
+    keys = [CP.get_parameter_index(name) for name in outputs]
+    values = np.full((len(keys), len(T)), np.nan)
+    for i, (t, p) in enumerate(zip(T.tolist(), P.tolist())):
+        try:
+            state.update(CP.PT_INPUTS, p, t)
+            values[:, i] = [state.keyed_output(key) for key in keys]
+        except ValueError:
+            pass  # Outside the equation of state's range, left as NaN
+    return values
+
+def property_grid(fluid, T, P, outputs=OUTPUTS, backend='HEOS', processes=1, chunk_size=50000):
+    """
+    Evaluate CoolProp `outputs` (e.g. 'Dmass', 'Hmass', 'Cpmass',
+    'speed_of_sound', 'Dmolar') at every temperature (K) and pressure (Pa).
+
+    T and P are broadcast against each other, so T[:, None] and P[None, :]
+    give a full grid. States CoolProp can't evaluate are NaN. With
+    processes > 1 (None for every core) grids bigger than chunk_size are
+    split over a process pool.
+
+    Returns {output: array with the broadcast shape}.
+    """
+    T, P = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(P, dtype=float))
+    shape = T.shape
+    T, P = T.ravel(), P.ravel()
+    n_chunks = max(1, int(np.ceil(T.size / chunk_size)))
+    args = [(fluid, backend, tuple(outputs), t, p) for t, p in zip(np.array_split(T, n_chunks), np.array_split(P, n_chunks))]
+    if processes == 1 or n_chunks == 1:
+        values = [_grid_chunk(a) for a in args]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            values = list(pool.map(_grid_chunk, args))
+    values = np.hstack(values)
+    values[~np.isfinite(values)] = np.nan
+    return {name: v.reshape(shape) for name, v in zip(outputs, values)}
+
+def pv_data(substance='Methane', temperatures=np.linspace(200, 2000, 10), pressures=np.linspace(100000, 1000000, 100)):
+    """
+    Molar volume (m^3/mol) of `substance` at each temperature (K) and
+    pressure (Pa), plus the liquid and vapour saturation points at each
+    temperature below the critical point.
+    Returns ({T: [volume, ...]}, [(v_liquid, Psat), ...], [(v_vapor, Psat), ...]).
+    """
+    import CoolProp.CoolProp as CP
 
-# Calculate volumes for each temperature and pressure
-for T in temperatures:
-    for P in pressures:
+    # Calculate volumes for each temperature and pressure, NaN where CoolProp can't calculate them
+    density = property_grid(substance, np.asarray(temperatures)[:, None], np.asarray(pressures)[None, :], ('Dmolar',))['Dmolar']
+    volume_data = {T: (1 / density[i]).tolist() for i, T in enumerate(temperatures)}
+    saturation_liquid = []
+    saturation_vapor = []
+
+    # Get saturation properties at each temperature
+    state = abstract_state(substance)
+    for T in temperatures:
         try:
-            # Calculate the molar volume (m^3/mol)
-            volume = CP.PropsSI('Dmolar', 'T', T, 'P', P, substance) ** -1
-            volume_data[T].append(volume)
+            state.update(CP.QT_INPUTS, 0, T)
+            Psat = state.p()  # Saturation pressure
+            v_liquid = 1 / state.rhomolar()  # Liquid molar volume
+            state.update(CP.QT_INPUTS, 1, T)
+            v_vapor = 1 / state.rhomolar()  # Vapor molar volume
+            saturation_liquid.append((v_liquid, Psat))
+            saturation_vapor.append((v_vapor, Psat))
         except ValueError:
-            volume_data[T].append(np.nan)  # Handle values that CoolProp can't calculate
+            pass
+
+    return volume_data, saturation_liquid, saturation_vapor
+
+def plot_pv_diagram(pressures, volume_data, saturation_liquid, saturation_vapor, substance='Methane'):
+    import matplotlib.pyplot as plt
+
+    # Plot the P-V diagram
+    plt.figure(figsize=(10, 6))
+    for T in volume_data:
+        plt.plot(volume_data[T], pressures, label=f'T = {T} K')
+
 
-    # Get saturation properties at this temperature
-    try:
-        Psat = CP.PropsSI('P', 'T', T, 'Q', 0, substance)  # Saturation pressure
-        v_liquid = CP.PropsSI('Dmolar', 'T', T, 'Q', 0, substance) ** -1  # Liquid molar volume
-        v_vapor = CP.PropsSI('Dmolar', 'T', T, 'Q', 1, substance) ** -1  # Vapor molar volume
-        saturation_liquid.append((v_liquid, Psat))
-        saturation_vapor.append((v_vapor, Psat))
-    except ValueError:
-        pass
+    plt.xlabel('Molar Volume (m^3/mol)')
+    plt.ylabel('Pressure (Pa)')
+    plt.title(f'P-V Diagram for {substance} at Different Temperatures')
 
-# Plot the P-V diagram
-plt.figure(figsize=(10, 6))
-for T in temperatures:
-    plt.plot(volume_data[T], pressures, label=f'T = {T} K')
 
 
-plt.xlabel('Molar Volume (m^3/mol)')
-plt.ylabel('Pressure (Pa)')
-plt.title('P-V Diagram for Methane at Different Temperatures')
+    # Plot saturation lines
+    if saturation_liquid and saturation_vapor:
+        v_liquid, P_liquid = zip(*saturation_liquid)
+        v_vapor, P_vapor = zip(*saturation_vapor)
+        plt.plot(v_liquid, P_liquid, 'r--', label='Saturation Liquid')
+        plt.plot(v_vapor, P_vapor, 'b--', label='Saturation Vapor')
 
+    plt.legend()
+    plt.grid(True, which="both", ls="--")
 
+    plt.show()
 
-# Plot saturation lines
-if saturation_liquid and saturation_vapor:
-    v_liquid, P_liquid = zip(*saturation_liquid)
-    v_vapor, P_vapor = zip(*saturation_vapor)
-    plt.plot(v_liquid, P_liquid, 'r--', label='Saturation Liquid')
-    plt.plot(v_vapor, P_vapor, 'b--', label='Saturation Vapor')
+if __name__ == '__main__':
+    # Define the substance
+    substance = 'Methane'
 
-plt.legend()
-plt.grid(True, which="both", ls="--")
+    # Define the range of temperatures (K)
+    temperatures = np.linspace(200, 2000, 10)  # 10 temperatures from 200K to 2000K
 
-plt.show()
+    # Define the range of pressures (Pa)
+    pressures = np.linspace(100000, 1000000, 100)  # Pressure range from 10,000 Pa to 10,000,000 Pa
 
+    plot_pv_diagram(pressures, *pv_data(substance, temperatures, pressures), substance=substance)
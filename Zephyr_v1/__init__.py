@@ -0,0 +1,6 @@
+# Project Zephyr v1, engine design calculations.
+#
+# Every module only defines functions and classes, importing one does no work and doesn't load
+# Cantera, CoolProp, scipy or matplotlib until a function needs them. Modules with a demo run it
+# under __main__, e.g. python -m Zephyr_v1.combustion_optimiser from the repository root.
+# import_benchmark.py checks the cold import time of each module against a budget.
@@ -1,4 +1,211 @@
+import numpy as np
+from .gas import coolprop_name, get_fluid_table
+from .PVT_coolprop import property_grid
+
 # Blowdown calculation of PV for oxygen and propellant
+# Run with: python -m Zephyr_v1.blowdown
+#
+# Each feed is a tank (plus the pipe up to the valve) blowing down through the valve, or a
+# regulator, into the line between the valve and the injector, which feeds the chamber through
+# the injector. Both volumes are adiabatic and well mixed, with real-fluid properties from the
+# tables in gas.py. Every argument can be an array, all the configurations are integrated
+# together as one ODE system.
+
+ONE_ATM = 101325.0
+FEEDS = ['PROP', 'OX']
+
+# Each feed has four states, density (kg/m^3) and specific internal energy (J/kg) of the tank and
+# then of the line, these are their absolute tolerances
+ATOL = [1e-6, 1e-2, 1e-6, 1e-2]
+
+
+def orifice_flow(A, P_up, rho_up, k_up, P_down, Cd=0.65):
+    """
+    Mass flow (kg/s) through an orifice of area A (m^2), isentropic with
+    exponent k_up and choked below the critical pressure ratio. No flow
+    when P_down >= P_up. For large k (liquids, two-phase) it tends to the
+    incompressible Cd A sqrt(2 rho dP).
+    """
+    r = np.clip(P_down / P_up, 0, 1)
+    r = np.maximum(r, (2 / (k_up + 1)) ** (k_up / (k_up - 1)))
+    flux = 2 * rho_up * P_up * k_up / (k_up - 1) * (r ** (2 / k_up) - r ** ((k_up + 1) / k_up))
+    return Cd * A * np.sqrt(np.maximum(flux, 0))
+
+
+def regulator_opening(P_line, P_set, droop=0.05):
+    # Fraction of the valve area open, fully open droop * P_set below the set point, none above it
+    finite = np.isfinite(P_set)
+    P_set = np.where(finite, P_set, 1.0)
+    return np.where(finite, np.clip((P_set - P_line) / (droop * P_set), 0, 1), 1.0)
+
+
+class _Feeds:
+    # Everything the right hand side needs, for M feed instances (propellant configurations then oxidizer)
+
+    def __init__(self, tables, V_tank, V_line, A_valve, A_injector, P_set, P_chamber, Cd, droop):
+        self.tables = tables  # [(FluidTable, slice of instances), ...]
+        self.V_tank = V_tank
+        self.V_line = V_line
+        self.A_valve = A_valve
+        self.A_injector = A_injector
+        self.P_set = P_set
+        self.P_chamber = P_chamber
+        self.Cd = Cd
+        self.droop = droop
+
+    def properties(self, rho, u):
+        # P, T, h, k of each instance, every table looks up its own instances
+        out = np.empty((4,) + rho.shape)
+        for table, instances in self.tables:
+            out[:, instances] = table(rho[instances], u[instances])
+        return out
+
+    def flows(self, y):
+        # y is (M, 4, ...), returns the tank and line properties and the valve and injector mass flows
+        tank = self.properties(y[:, 0], y[:, 1])
+        line = self.properties(y[:, 2], y[:, 3])
+        extra = (slice(None),) + (None,) * (y.ndim - 2)  # Broadcast the parameters over any time axis
+        opening = regulator_opening(line[0], self.P_set[extra], self.droop[extra])
+        mdot_valve = opening * orifice_flow(self.A_valve[extra], tank[0], y[:, 0], tank[3], line[0], self.Cd[extra])
+        mdot_injector = orifice_flow(self.A_injector[extra], line[0], y[:, 2], line[3], self.P_chamber[extra],
+                                     self.Cd[extra])
+        return tank, line, mdot_valve, mdot_injector
+
+    def __call__(self, t, y):
+        y = y.reshape(-1, 4)
+        (P_tank, _, h_tank, _), (P_line, _, _, _), mdot_valve, mdot_injector = self.flows(y)
+        rho_tank, _, rho_line, u_line = y.T
+        dy = np.empty_like(y)
+        dy[:, 0] = -mdot_valve / self.V_tank
+        dy[:, 1] = -mdot_valve * P_tank / (rho_tank ** 2 * self.V_tank)
+        dy[:, 2] = (mdot_valve - mdot_injector) / self.V_line
+        dy[:, 3] = ((mdot_valve * (h_tank - u_line) - mdot_injector * P_line / rho_line)
+                    / (rho_line * self.V_line))
+        return dy.ravel()
+
+    def jacobian(self, t, y):
+        # Forward differences of one state of every instance at a time, instances don't interact so
+        # four evaluations give the whole block diagonal
+        from scipy.sparse import bsr_matrix
+        f = self(t, y).reshape(-1, 4)
+        y = y.reshape(-1, 4)
+        blocks = np.empty((len(y), 4, 4))
+        for k in range(4):
+            step = 1.5e-8 * np.maximum(np.abs(y[:, k]), 1.0)
+            perturbed = y.copy()
+            perturbed[:, k] += step
+            blocks[:, :, k] = (self(t, perturbed.ravel()).reshape(-1, 4) - f) / step[:, None]
+        return bsr_matrix((blocks, np.arange(len(y)), np.arange(len(y) + 1)), shape=(y.size, y.size))
+
+
+def blowdown_calc(Propellant, PROP_vol_tank, PROP_vol_pipe_to_valve, PROP_vol_valve_to_injector, OX_vol_tank,
+                  OX_vol_pipe_to_valve, OX_vol_valve_to_injector, PROP_P_tank=200e5, OX_P_tank=200e5,
+                  PROP_P_set=np.inf, OX_P_set=np.inf, PROP_A_injector=7.85e-7, OX_A_injector=1.77e-6,
+                  A_valve=1.26e-5, T_tank=293.15, P_chamber=5 * ONE_ATM, P_ambient=ONE_ATM, Cd=0.65, droop=0.05,
+                  Oxidizer='O2', end_time=10.0, n_out=201, method='BDF', rtol=1e-6):
+    """
+    Blowdown of the propellant and oxidizer feeds into a chamber held at
+    P_chamber (Pa), from the valve opening at t = 0 to end_time (s).
+
+    Volumes are m^3, areas m^2 and pressures Pa. The tanks start at their
+    P_tank and T_tank (K), the lines after the valves at P_ambient.
+    P_set is the regulator set point for each feed, np.inf for a plain
+    valve. Propellant and Oxidizer are CoolProp or Cantera names.
+
+    Every numeric argument can be an array, they're broadcast together and
+    each configuration is integrated at once, with the stiff `method` from
+    scipy.integrate.solve_ivp and a block diagonal Jacobian, so the cost
+    grows linearly with the number of configurations.
+
+    Returns {'t': (n_out,), 'PROP_P_tank': (n_out, *shape), ...} with the
+    tank and line P and T, the tank mass and the injector mass flow mdot of
+    each feed, and OFR, the oxidizer to propellant mass flow ratio.
+    """
+    from scipy.integrate import solve_ivp
+
+    args = {
+        'PROP': (PROP_vol_tank + np.asarray(PROP_vol_pipe_to_valve), PROP_vol_valve_to_injector, PROP_A_injector,
+                 PROP_P_set, PROP_P_tank),
+        'OX': (OX_vol_tank + np.asarray(OX_vol_pipe_to_valve), OX_vol_valve_to_injector, OX_A_injector, OX_P_set,
+               OX_P_tank),
+    }
+    common = (A_valve, T_tank, P_chamber, P_ambient, Cd, droop)
+    arrays = np.broadcast_arrays(*[np.asarray(a, dtype=float) for feed in FEEDS for a in args[feed]],
+                                 *[np.asarray(a, dtype=float) for a in common])
+    shape = arrays[0].shape
+    n = arrays[0].size
+    per_feed = [np.concatenate([arrays[5 * i + j].ravel() for i in range(len(FEEDS))]) for j in range(5)]
+    A_valve, T_tank, P_chamber, P_ambient, Cd, droop = [np.tile(a.ravel(), len(FEEDS)) for a in arrays[10:]]
+    V_tank, V_line, A_injector, P_set, P_tank = per_feed
+
+    fluids = [coolprop_name(Propellant), coolprop_name(Oxidizer)]
+    tables = [(get_fluid_table(fluid), slice(i * n, (i + 1) * n)) for i, fluid in enumerate(fluids)]
+    rhs = _Feeds(tables, V_tank, V_line, A_valve, A_injector, P_set, P_chamber, Cd, droop)
+
+    # Tank at its fill state, the line full of the same fluid at ambient pressure
+    y0 = np.empty((len(FEEDS) * n, 4))
+    for fluid, (_, instances) in zip(fluids, tables):
+        tank = property_grid(fluid, T_tank[instances], P_tank[instances], ('Dmass', 'Umass'))
+        line = property_grid(fluid, T_tank[instances], P_ambient[instances], ('Dmass', 'Umass'))
+        y0[instances] = np.column_stack([tank['Dmass'], tank['Umass'], line['Dmass'], line['Umass']])
+    if np.isnan(y0).any():
+        raise ValueError('Initial tank or line state outside the range of the equation of state')
+
+    # Each feed instance only depends on its own four states, the implicit methods get the Jacobian as
+    # sparse 4x4 blocks
+    options = {'jac': rhs.jacobian} if method in ('BDF', 'Radau') else {}
+    t_eval = np.linspace(0, end_time, n_out)
+    solution = solve_ivp(rhs, (0, end_time), y0.ravel(), method=method, t_eval=t_eval, rtol=rtol,
+                         atol=np.tile(ATOL, len(y0)), **options)
+    if not solution.success:
+        raise RuntimeError(f'Blowdown integration failed: {solution.message}')
+
+    y = solution.y.reshape(len(y0), 4, -1)
+    tank, line, _, mdot_injector = rhs.flows(y)
+    outputs = {'P_tank': tank[0], 'T_tank': tank[1], 'P_line': line[0], 'T_line': line[1],
+               'mass': y[:, 0] * V_tank[:, None], 'mdot': mdot_injector}
+    result = {'t': solution.t}
+    for i, feed in enumerate(FEEDS):
+        for name, value in outputs.items():
+            result[f'{feed}_{name}'] = value[i * n:(i + 1) * n].T.reshape((len(solution.t),) + shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['OFR'] = result['OX_mdot'] / result['PROP_mdot']
+    return result
+
+
+def plot_blowdown(result, index=()):
+    # Tank and line pressures and temperatures and the injector mass flows of one configuration
+    import matplotlib.pyplot as plt
+
+    t = result['t']
+    fig, axes = plt.subplots(3, 1, figsize=(10, 10), sharex=True)
+    for feed in FEEDS:
+        axes[0].plot(t, result[f'{feed}_P_tank'][(slice(None),) + index] / 1e5, label=f'{feed} tank')
+        axes[0].plot(t, result[f'{feed}_P_line'][(slice(None),) + index] / 1e5, '--', label=f'{feed} line')
+        axes[1].plot(t, result[f'{feed}_T_tank'][(slice(None),) + index], label=f'{feed} tank')
+        axes[1].plot(t, result[f'{feed}_T_line'][(slice(None),) + index], '--', label=f'{feed} line')
+        axes[2].plot(t, result[f'{feed}_mdot'][(slice(None),) + index] * 1e3, label=feed)
+    axes[0].set_ylabel('Pressure (bar)')
+    axes[1].set_ylabel('Temperature (K)')
+    axes[2].set_ylabel('Injector mass flow (g/s)')
+    axes[2].set_xlabel('Time (s)')
+    for ax in axes:
+        ax.legend()
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == '__main__':
+    import time
+
+    # One run: 2 L methane and 3 L oxygen cylinders at 200 bar, oxygen regulated to 30 bar
+    result = blowdown_calc('CH4', 2e-3, 5e-5, 2e-5, 3e-3, 5e-5, 2e-5, OX_P_set=30e5)
+    print(f"After 10 s: CH4 tank {result['PROP_P_tank'][-1] / 1e5:.1f} bar, {result['PROP_T_tank'][-1]:.1f} K, "
+          f"O2 tank {result['OX_P_tank'][-1] / 1e5:.1f} bar, OFR {result['OFR'][-1]:.2f}")
 
-def blowdown_calc(Propellant, PROP_vol_tank, PROP_vol_pipe_to_valve, PROP_vol_valve_to_injector, OX_vol_tank , OX_vol_pipe_to_valve , OX_vol_valve_to_injector)
-    
+    # Screening: oxygen tank volume against regulator set point, all in one integration
+    start = time.perf_counter()
+    screen = blowdown_calc('CH4', 2e-3, 5e-5, 2e-5, np.linspace(1e-3, 5e-3, 40)[:, None], 5e-5, 2e-5,
+                           OX_P_set=np.linspace(10e5, 60e5, 25))
+    print(f"{screen['OFR'][0].size} configurations in {time.perf_counter() - start:.2f} s")
+    plot_blowdown(result)
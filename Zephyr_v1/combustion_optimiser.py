@@ -1,70 +1,156 @@
 import numpy as np
-from scipy.optimize import fsolve
-import cantera as ct
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from .equilibrium_cache import EquilibriumCache
+
+# Cantera and scipy are imported inside the functions that use them, importing this module is free
+
+MECHANISM = 'gri30.yaml'
+ONE_ATM = 101325.0  # Pa, same as ct.one_atm
+
+_cache = None
+
+# Results are memoized on disk (see equilibrium_cache.py) so repeat runs skip Cantera entirely
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = EquilibriumCache()
+    return _cache
+
+# Call after changing anything the cache key doesn't cover, e.g. the Cantera version
+def invalidate_cache(mechanism=None):
+    get_cache().invalidate(mechanism)
+
+# Parsing the mechanism file costs far more than one equilibrium calculation, so each process
+# loads it once and reuses the same Solution object for every state
+@lru_cache(maxsize=None)
+def load_gas(mechanism=MECHANISM):
+    import cantera as ct
+    return ct.Solution(mechanism)
 
 # Function to compute the adiabatic flame temperature and additional properties for a given OFR
-def adiabatic_flame_temp(OFR, T_target):
+def adiabatic_flame_temp(OFR, T_target, fuel='C3H8', moles_O2_stoich=2, T_initial=298.15, P_initial=ONE_ATM, mechanism=MECHANISM, use_cache=True):
+    import cantera as ct
     moles_fuel = 1
-    moles_O2_stoich = 2
+    # fsolve passes OFR as a one element array
+    OFR = float(np.squeeze(OFR))
     moles_O2 = moles_O2_stoich * OFR
-    
-    # Define gas mixture with gri30 mechanism file
-    gas = ct.Solution('gri30.yaml')
-    
-    # Define the initial conditions of combustion without specifying pressure
-    gas.TPX = 298.15, None, {'C3H8': moles_fuel, 'O2': moles_O2}
-    
-    # Equilibrate the mixture adiabatically, allowing pressure to vary
+
+    if use_cache:
+        key = (mechanism, fuel, 'O2', moles_O2_stoich, OFR, T_initial, P_initial, 'HP')
+        (T, pressure, R_products, k_products, rho_products), found = get_cache().get(*key)
+        if found[0]:
+            return T[0] - T_target, pressure[0], R_products[0], k_products[0], rho_products[0]
+
+    # Reuse the cached gas mixture for the gri30 mechanism file
+    gas = load_gas(mechanism)
+
+    # Define the initial conditions of combustion
+    gas.TPX = T_initial, P_initial, {fuel: moles_fuel, 'O2': moles_O2}
+
+    # Equilibrate the mixture adiabatically at constant pressure
     gas.equilibrate('HP')
-    
+
     # Get the equilibrium pressure
     pressure = gas.P
-    
+
     # Calculate R_products and k_products
     R_products = ct.gas_constant / gas.mean_molecular_weight
     k_products = gas.cp / gas.cv
     rho_products = gas.density
-    
+    if use_cache:
+        get_cache().put(*key, gas.T, pressure, R_products, k_products, rho_products)
+
     # Return the difference between the computed and target temperatures
     return gas.T - T_target, pressure, R_products, k_products, rho_products
 
 # Wrapper function for fsolve to only return the temperature difference
-def temp_difference(OFR, T_target):
-    return adiabatic_flame_temp(OFR, T_target)[0]
-
-# Define the target temperature
-T_target = 2500
-# Initial guess for OFR
-OFR_initial_guess = 1.0
-
-# Solve for the OFR that results in the target temperature
-OFR_solution = fsolve(temp_difference, OFR_initial_guess, args=(T_target,))[0]
-
-# Get the final properties using the solved OFR
-_, final_pressure, R_products_solution, k_products_solution, rho_products_solution = adiabatic_flame_temp(OFR_solution, T_target)
-
-# Collect data for plotting the resulting parameter values against OFR:
-
-OFR_values = np.linspace(0.1, 6, 100)
-T_final_values = []
-pressure_values = []
-R_products_values = []
-k_products_values = []
-rho_products_values = []
-
-# Calculate T_final, pressure, R_products, k_products, rho_products for each OFR value
-for OFR in OFR_values:
-    moles_O2 = 2 * OFR
-    gas = ct.Solution('gri30.yaml')
-    gas.TPX = 298.15, None, {'CH4': 1, 'O2': moles_O2}
-    gas.equilibrate('HP')
-    T_final_values.append(gas.T)
-    pressure_values.append(gas.P)
-    R_products_values.append(ct.gas_constant / gas.mean_molecular_weight)
-    k_products_values.append(gas.cp / gas.cv)
-    rho_products_values.append(gas.density)
+def temp_difference(OFR, T_target, **kwargs):
+    return adiabatic_flame_temp(OFR, T_target, **kwargs)[0]
+
+def _sweep_chunk(args):
+    # Equilibrate one chunk of the sweep, runs in a worker process when ofr_sweep uses a pool
+    import cantera as ct
+    OFR_values, T_initial, P_initial, fuel, oxidizer, moles_O2_stoich, mechanism = args
+    gas = load_gas(mechanism)
+    n = len(OFR_values)
+    X = np.zeros((n, gas.n_species))
+    X[:, gas.species_index(fuel)] = 1
+    X[:, gas.species_index(oxidizer)] = moles_O2_stoich * OFR_values
+    states = ct.SolutionArray(gas, n)
+    states.TPX = T_initial, P_initial, X
+    states.equilibrate('HP')
+    return np.vstack([states.T, states.P, ct.gas_constant / states.mean_molecular_weight,
+                      states.cp / states.cv, states.density])
+
+def ofr_sweep(OFR_values, fuel='CH4', moles_O2_stoich=2, T_initial=298.15, P_initial=ONE_ATM,
+              mechanism=MECHANISM, processes=1, chunk_size=250, use_cache=True, oxidizer='O2'):
+    """
+    HP-equilibrate fuel + oxidizer mixtures over a grid of OFR values.
+
+    OFR_values, T_initial and P_initial are broadcast against each other, so
+    any grid of OFR, initial temperature and pressure can be passed at once.
+    The grid is split into chunks of `chunk_size` states; with processes > 1
+    (or None for every core) the chunks run in a process pool, each worker
+    loading the mechanism once. With use_cache, only states missing from the
+    on-disk cache are calculated.
+
+    Returns T, P, R, k and rho arrays with the broadcast shape.
+    """
+    OFR_values, T_initial, P_initial = np.broadcast_arrays(
+        np.asarray(OFR_values, dtype=float), np.asarray(T_initial, dtype=float), np.asarray(P_initial, dtype=float))
+    shape = OFR_values.shape
+    OFR_values, T_initial, P_initial = OFR_values.ravel(), T_initial.ravel(), P_initial.ravel()
+    key = (mechanism, fuel, oxidizer, moles_O2_stoich)
+    if use_cache:
+        results, found = get_cache().get(*key, OFR_values, T_initial, P_initial, 'HP')
+    else:
+        results, found = np.empty((5, OFR_values.size)), np.zeros(OFR_values.size, dtype=bool)
+
+    missing = np.flatnonzero(~found)
+    if missing.size:
+        n_chunks = max(1, int(np.ceil(missing.size / chunk_size)))
+        args = [
+            (OFR_values[i], T_initial[i], P_initial[i], fuel, oxidizer, moles_O2_stoich, mechanism)
+            for i in np.array_split(missing, n_chunks)
+        ]
+        if processes == 1 or n_chunks == 1:
+            computed = [_sweep_chunk(a) for a in args]
+        else:
+            with ProcessPoolExecutor(processes) as pool:
+                computed = list(pool.map(_sweep_chunk, args))
+        results[:, missing] = np.hstack(computed)
+        if use_cache:
+            get_cache().put(*key, OFR_values[missing], T_initial[missing], P_initial[missing], 'HP', *results[:, missing])
+
+    T, P, R, k, rho = (values.reshape(shape) for values in results)
+    return T, P, R, k, rho
+
+def solve_ofr(T_target=2500, OFR_initial_guess=1.0, **kwargs):
+    """
+    OFR whose adiabatic flame temperature is T_target, found with fsolve.
+    Extra arguments go to adiabatic_flame_temp. Returns the OFR and the
+    products' pressure, R, k and rho at that OFR.
+    """
+    from scipy.optimize import fsolve
+    OFR_solution = fsolve(lambda OFR: temp_difference(OFR, T_target, **kwargs), OFR_initial_guess)[0]
+    _, pressure, R_products, k_products, rho_products = adiabatic_flame_temp(OFR_solution, T_target, **kwargs)
+    return OFR_solution, pressure, R_products, k_products, rho_products
 
 
+if __name__ == '__main__':
+    # Define the target temperature
+    T_target = 2500
 
+    # Solve for the OFR that results in the target temperature, and get the final properties at it
+    OFR_solution, final_pressure, R_products_solution, k_products_solution, rho_products_solution = solve_ofr(T_target)
+    print(f"The OFR that results in an adiabatic flame temperature of {T_target} K is approximately {OFR_solution:.4f}")
 
+    # Collect data for plotting the resulting parameter values against OFR
+    OFR_values = np.linspace(0.1, 6, 100)
+    T_final_values, pressure_values, R_products_values, k_products_values, rho_products_values = ofr_sweep(OFR_values)
 
+    from .combustion_plot import combustion_charts
+    combustion_charts(OFR_solution, T_target, OFR_values, T_final_values, R_products_values, k_products_values,
+                      rho_products_values, pressure_values, R_products_solution, k_products_solution,
+                      rho_products_solution, final_pressure)
@@ -1,7 +1,7 @@
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
-
 def combustion_charts(OFR_solution, T_target, OFR_values, T_final_values, R_products_values, k_products_values, rho_products_values, pressure_values, R_products_solution, k_products_solution, rho_products_solution, final_pressure):
+    import matplotlib.pyplot as plt
+    import matplotlib.ticker as ticker
+
     # Plot the results
     plt.figure(figsize=(10, 6))
     plt.plot(OFR_values, T_final_values, label='Adiabatic Flame Temperature')
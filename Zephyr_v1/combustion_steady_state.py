@@ -1,65 +1,93 @@
-import cantera as ct
-import matplotlib.pyplot as plt
 import numpy as np
+from .reactor_run import load_gas, run_reactor, ReactorRecorder, LogSpaced, SteadyState
 
-# Load the GRI-Mech 3.0 mechanism from a YAML file
-gas = ct.Solution('gri30.yaml')
-
-OFR = 5
-moles_methane = 1
-moles_O2_stoich = 2
-moles_O2 = moles_O2_stoich * OFR
-
-# Set the temperature, pressure, and composition of the gas mixture
-gas.TPX = 2500, None, {'CH4': moles_methane, 'O2': moles_O2}
-
-# Create an IdealGasReactor object with the specified gas mixture
-r = ct.IdealGasReactor(gas)
-
-# Create a ReactorNet object to handle the reactor network
-net = ct.ReactorNet([r])
-
-# Time-stepping parameters
-time = 0.0
-end_time = 50
-time_step = 1e-1
-
-# Data storage
-times = []
-production_rates_over_time = []
-temperatures_over_time = []
-
-# Time-stepping loop
-while time < end_time:
-    net.advance(time + time_step)
-    times.append(net.time)
-    production_rates_over_time.append(gas.net_production_rates.copy())
-    temperatures_over_time.append(gas.T)
-    time += time_step
-
-# Convert to arrays for easier plotting
-production_rates_over_time = np.array(production_rates_over_time)
-temperatures_over_time = np.array(temperatures_over_time)
-
-# Plotting
-species_indices = [gas.species_index(s) for s in ['CH4', 'O2', 'CO2', 'H2O']]
-species_names = ['CH4', 'O2', 'CO2', 'H2O']
-
-fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8), sharex=True)
-
-for i, idx in enumerate(species_indices):
-    ax1.plot(times, production_rates_over_time[:, idx], label=species_names[i])
-ax1.set_ylabel('Net Production Rate (mol/m^3·s)')
-ax1.legend()
-ax1.set_title('Net Production Rates of Key Species Over Time')
-ax1.ticklabel_format(useOffset=False)
-
-ax2.plot(times, temperatures_over_time, label='Temperature', linestyle='--', color='k')
-ax2.set_ylabel('Temperature (K)')
-ax2.set_xlabel('Time (s)')
-ax2.legend()
-ax2.set_title('Temperature Over Time')
-ax2.ticklabel_format(useOffset=False)
-
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+# Run with: python -m Zephyr_v1.combustion_steady_state
+
+
+def steady_state(OFR, T_initial=2500, P_initial=101325.0, fuel='CH4', moles_O2_stoich=2, mechanism='gri30.yaml',
+                 method='integrate', end_time=50, T_rate=1e-3, rate_atol=1e-9):
+    """
+    Run a constant volume reactor from T_initial until it reaches steady state.
+
+    method='integrate' records on a log-spaced time grid and stops once the
+    temperature and every net production rate have flattened out (see
+    SteadyState in reactor_run.py), end_time is only an upper limit.
+    'advance_to_steady_state' hands the run to Cantera and keeps only the
+    initial and final states. 'equilibrium' skips the kinetics and
+    UV-equilibrates directly, the result is just the final state.
+
+    Returns the ReactorResult and the time to steady state, NaN for
+    'equilibrium' or if it wasn't reached by end_time.
+    """
+    import cantera as ct
+    if method not in ('integrate', 'advance_to_steady_state', 'equilibrium'):
+        raise ValueError(f"Unknown method '{method}'")
+    gas = load_gas(mechanism)
+    gas.TPX = T_initial, P_initial, {fuel: 1, 'O2': moles_O2_stoich * OFR}
+    if method == 'equilibrium':
+        # Only the final state, the reactor is just there to record it
+        gas.equilibrate('UV')
+        recorder = ReactorRecorder(ct.IdealGasReactor(gas, clone=True), capacity=1, reactions=False)
+        recorder.record(np.nan)
+        return recorder.result('equilibrium'), np.nan
+
+    # load_gas is shared by every caller in the process, the reactor integrates its own copy
+    r = ct.IdealGasReactor(gas, clone=True)
+    net = ct.ReactorNet([r])
+    if method == 'integrate':
+        event = SteadyState(T_rate, rate_atol)
+        result = run_reactor(r, net, end_time, LogSpaced(1e-7, 10), [event], reactions=False)
+        return result, event.t_steady if result.event else np.nan
+
+    recorder = ReactorRecorder(r, capacity=2, reactions=False)
+    recorder.record(0.0)
+    net.advance_to_steady_state()
+    recorder.record(net.time)
+    return recorder.result('steady state'), net.time
+
+
+def steady_state_sweep(OFR_values, **kwargs):
+    # Final temperature and time to steady state over a range of OFR values
+    T_final, t_steady = [], []
+    for OFR in OFR_values:
+        result, t = steady_state(OFR, **kwargs)
+        T_final.append(result.T[-1])
+        t_steady.append(t)
+    return np.array(T_final), np.array(t_steady)
+
+
+def plot_steady_state(result):
+    import matplotlib.pyplot as plt
+
+    times = result.t
+    production_rates_over_time = result.production_rates
+    temperatures_over_time = result.T
+    species_names = ['CH4', 'O2', 'CO2', 'H2O']
+    species_indices = [result.species_names.index(s) for s in species_names]
+
+    # Plotting
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8), sharex=True)
+
+    for i, idx in enumerate(species_indices):
+        ax1.plot(times, production_rates_over_time[:, idx], label=species_names[i])
+    ax1.set_ylabel('Net Production Rate (mol/m^3·s)')
+    ax1.legend()
+    ax1.set_title('Net Production Rates of Key Species Over Time')
+    ax1.ticklabel_format(useOffset=False)
+
+    ax2.plot(times, temperatures_over_time, label='Temperature', linestyle='--', color='k')
+    ax2.set_ylabel('Temperature (K)')
+    ax2.set_xlabel('Time (s)')
+    ax2.legend()
+    ax2.set_title('Temperature Over Time')
+    ax2.ticklabel_format(useOffset=False)
+    ax2.set_xscale('log')  # Output is log-spaced in time
+
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == '__main__':
+    result, time_to_steady_state = steady_state(OFR=5)
+    print(f'Steady state at {result.T[-1]:.1f} K after {time_to_steady_state:.3e} s')
+    plot_steady_state(result)
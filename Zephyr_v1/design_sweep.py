@@ -0,0 +1,246 @@
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from .equilibrium_cache import CACHE_DIR, mechanism_hash
+from .nozzle_design import NozzleDesign, ONE_ATM
+
+# Design-space sweeps of the notebook's pipeline: the OFR that gives a target flame temperature
+# (combustion_optimiser), the laminar flame speed of that mixture at chamber pressure (flame_sweep)
+# and the nozzle design (nozzle_design), for every point of a parameter grid:
+#   results = run_sweep({'fuel': ['CH4', 'C3H8'], 'T_target': [2400, 2600], 'Pc': [5e5, 1e6],
+#                        'Me': [2, 2.5], 'At_radius': 0.02}, 'sweep.sqlite')
+# Each stage runs once per distinct input, on a process pool, and every result is written to the
+# store as soon as it's done, so rerunning an interrupted sweep picks up where it stopped.
+# Run with: python -m Zephyr_v1.design_sweep
+
+# Bump when a stage's calculation changes, results stored by older versions are then ignored
+SWEEP_VERSION = 1
+
+PARAMETERS = ['fuel', 'T_target', 'Pc', 'Me', 'At_radius']
+DEFAULTS = {'fuel': 'CH4', 'T_target': 2500.0, 'Pc': 5 * ONE_ATM, 'Me': 2.0, 'At_radius': 0.02}
+
+# Largest flame temperature error (K) for an OFR solution to count as converged
+T_TOLERANCE = 1.0
+
+
+class SweepStore:
+    """
+    SQLite store of stage results as JSON, keyed by stage and a hash of the
+    stage's inputs. Only the process running the sweep writes to it, each
+    result is committed as soon as it's stored.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, 'sweeps.sqlite')
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS results (stage TEXT, key TEXT, value TEXT, "
+                        "PRIMARY KEY (stage, key))")
+        self.db.commit()
+
+    def get(self, stage, keys):
+        # {key: result} for the keys that are stored
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self.db.execute(f"SELECT key, value FROM results WHERE stage = ? AND key IN "
+                                   f"({', '.join('?' * len(chunk))})", [stage] + chunk)
+            found.update((key, json.loads(value)) for key, value in rows)
+        return found
+
+    def put(self, stage, key, value):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (stage, key, json.dumps(value)))
+
+    def all(self, stage):
+        return [json.loads(value) for value, in self.db.execute("SELECT value FROM results WHERE stage = ?",
+                                                                (stage,))]
+
+
+def input_hash(stage, inputs):
+    return hashlib.sha1(json.dumps([SWEEP_VERSION, stage, inputs], sort_keys=True).encode()).hexdigest()
+
+
+class Progress:
+    """Prints how many tasks of a stage are done, the time taken and the estimated time left."""
+
+    def __init__(self, name, total, done=0, verbose=True, interval=1.0):
+        self.name = name
+        self.total = total
+        self.done = done
+        self.skipped = done  # Already in the store, they don't count towards the rate
+        self.verbose = verbose
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.printed = 0.0
+        self.report(force=True)
+
+    def update(self, n=1):
+        self.done += n
+        self.report(force=self.done == self.total)
+
+    def report(self, force=False):
+        elapsed = time.perf_counter() - self.start
+        if not self.verbose or (not force and elapsed - self.printed < self.interval):
+            return
+        self.printed = elapsed
+        computed = self.done - self.skipped
+        message = f'{self.name}: {self.done}/{self.total} done, {elapsed:.1f} s'
+        if 0 < computed and self.done < self.total:
+            message += f', ETA {elapsed / computed * (self.total - self.done):.0f} s'
+        if self.skipped:
+            message += f' ({self.skipped} from the store)'
+        print(message, flush=True)
+
+
+def combustion_stage(fuel, T_target, mechanism, T_initial, P_initial):
+    # OFR for the target flame temperature, with pure O2 and the stoichiometric O2 worked out from the fuel
+    from .combustion_optimiser import load_gas, solve_ofr, temp_difference
+    gas = load_gas(mechanism)
+    moles_O2_stoich = (gas.n_atoms(fuel, 'C') + gas.n_atoms(fuel, 'H') / 4
+                       - (gas.n_atoms(fuel, 'O') / 2 if 'O' in gas.element_names else 0))
+    kwargs = dict(fuel=fuel, moles_O2_stoich=moles_O2_stoich, T_initial=T_initial, P_initial=P_initial,
+                  mechanism=mechanism)
+    OFR, _, R, k, _ = solve_ofr(T_target, **kwargs)
+    if abs(temp_difference(OFR, T_target, **kwargs)) > T_TOLERANCE:
+        OFR, R, k = np.nan, np.nan, np.nan
+    return {'OFR': float(OFR), 'phi': float(1 / OFR), 'R': float(R), 'k': float(k),
+            'moles_O2_stoich': float(moles_O2_stoich)}
+
+
+def flame_stage(fuel, phi, P, T, mechanism):
+    # Laminar flame speed (m/s) with pure O2, NaN with Cantera's error in flame_error if it doesn't converge
+    import cantera as ct
+    from .flame_sweep import solve_flame
+    try:
+        return {'Su': float(solve_flame(phi, P, T, fuel=fuel, oxidizer='O2', mechanism=mechanism)),
+                'flame_error': None}
+    except ct.CanteraError as e:
+        return {'Su': np.nan, 'flame_error': str(e)}
+
+
+def run_stage(name, function, tasks, store, processes=None, verbose=True):
+    """
+    Run function(**inputs) for every {key: inputs} in tasks that isn't in
+    the store yet, storing each result as it finishes. Returns
+    {key: result} for every task.
+    """
+    results = store.get(name, tasks)
+    todo = {key: inputs for key, inputs in tasks.items() if key not in results}
+    progress = Progress(name, len(tasks), len(results), verbose)
+    if processes == 1 or len(todo) <= 1:
+        for key, inputs in todo.items():
+            results[key] = function(**inputs)
+            store.put(name, key, results[key])
+            progress.update()
+    elif todo:
+        with ProcessPoolExecutor(processes) as pool:
+            futures = {pool.submit(function, **inputs): key for key, inputs in todo.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                results[key] = future.result()
+                store.put(name, key, results[key])
+                progress.update()
+    return results
+
+
+def expand_grid(grid):
+    # Every combination of the grid's values, as a list of {parameter: value} points
+    values = [np.atleast_1d(grid.get(name, DEFAULTS[name])).tolist() for name in PARAMETERS]
+    return [dict(zip(PARAMETERS, point)) for point in itertools.product(*values)]
+
+
+def run_sweep(grid, path=None, flame=True, T_inlet=300.0, mechanism='gri30.yaml', T_initial=298.15,
+              P_initial=ONE_ATM, processes=None, verbose=True):
+    """
+    Run the design pipeline over every combination of the values in `grid`,
+    a dict of fuel, T_target (K), Pc (Pa), Me and At_radius (m), each a value
+    or a list. Missing parameters take their DEFAULTS.
+
+    The combustion stage finds the OFR giving T_target from T_initial and
+    P_initial, the flame stage (skipped with flame=False, it's by far the
+    slowest) solves the flame speed at that mixture with inlet temperature
+    T_inlet at Pc, and the nozzle is designed with Tc = T_target and the
+    products' k and R. Where a flame fails Su is NaN and flame_error holds
+    Cantera's message. Stage results are kept in the SweepStore at `path`
+    (default in CACHE_DIR), shared by any sweep using the same store.
+
+    Returns a pandas DataFrame, one row per point, of the parameters, the
+    stage results, the NozzleDesign outputs and the settings above.
+    """
+    import pandas as pd
+    store = SweepStore(path)
+    points = expand_grid(grid)
+    mechanism_key = mechanism_hash(mechanism)
+
+    def tasks(stage, inputs_of):
+        # {input hash: inputs} over the distinct inputs of a stage, plus the hash of each point
+        all_tasks, keys = {}, []
+        for point in points:
+            inputs = inputs_of(point)
+            key = input_hash(stage, dict(inputs, mechanism=mechanism_key))
+            all_tasks[key] = inputs
+            keys.append(key)
+        return all_tasks, keys
+
+    combustion_tasks, combustion_keys = tasks('combustion', lambda p: dict(
+        fuel=p['fuel'], T_target=float(p['T_target']), mechanism=mechanism, T_initial=T_initial,
+        P_initial=P_initial))
+    combustion = run_stage('combustion', combustion_stage, combustion_tasks, store, processes, verbose)
+    for point, key in zip(points, combustion_keys):
+        point.update(combustion[key])
+
+    if flame:
+        flame_points = [point for point in points if np.isfinite(point['phi'])]
+        flame_tasks, flame_keys = {}, []
+        for point in flame_points:
+            inputs = dict(fuel=point['fuel'], phi=point['phi'], P=float(point['Pc']), T=T_inlet,
+                          mechanism=mechanism)
+            key = input_hash('flame', dict(inputs, mechanism=mechanism_key))
+            flame_tasks[key] = inputs
+            flame_keys.append(key)
+        flames = run_stage('flame', flame_stage, flame_tasks, store, processes, verbose)
+        for point in points:
+            point.update(Su=np.nan, flame_error=None)
+        for point, key in zip(flame_points, flame_keys):
+            point.update(flames[key])
+
+    # The nozzle stage is cheap and vectorised, all points at once
+    frame = pd.DataFrame(points)
+    nozzle = NozzleDesign(frame['At_radius'].to_numpy(), frame['k'].to_numpy(), frame['R'].to_numpy(),
+                          frame['T_target'].to_numpy(), Me=frame['Me'].to_numpy(),
+                          Pc=frame['Pc'].to_numpy()).evaluate()
+    for name, value in nozzle.items():
+        if name not in frame:
+            frame[name] = value
+    # The settings the stages ran with go in each row and its key, so sweeps with other settings
+    # keep their own rows
+    settings = dict(mechanism=mechanism, T_initial=T_initial, P_initial=P_initial, T_inlet=T_inlet if flame else np.nan)
+    for name, value in settings.items():
+        frame[name] = value
+    for row in frame.to_dict('records'):
+        key = dict(settings, flame=flame, mechanism=mechanism_key, **{name: row[name] for name in PARAMETERS})
+        store.put('point', input_hash('point', key), row)
+    return frame
+
+
+def load_sweep(path=None):
+    # Every point stored by run_sweep in the store at `path`, as a DataFrame
+    import pandas as pd
+    return pd.DataFrame(SweepStore(path).all('point'))
+
+
+if __name__ == '__main__':
+    # Two fuels and two flame temperatures, each combustion result shared by every Pc, Me and throat size
+    grid = {'fuel': ['CH4', 'C3H8'], 'T_target': [2400, 2600], 'Pc': [5e5, 1e6], 'Me': [2, 2.5],
+            'At_radius': [0.015, 0.02]}
+    results = run_sweep(grid, flame=False)
+    print(results[PARAMETERS + ['OFR', 'k', 'F', 'Isp']].to_string())
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import sqlite3
+import time
+import numpy as np
+
+# Default location, override with the ZEPHYR_CACHE_DIR environment variable
+CACHE_DIR = os.environ.get('ZEPHYR_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'zephyr'))
+
+KEY_COLUMNS = ['mechanism', 'fuel', 'oxidizer', 'moles_O2_stoich', 'OFR', 'T_initial', 'P_initial', 'mode']
+VALUE_COLUMNS = ['T', 'P', 'R', 'k', 'rho']
+
+
+def mechanism_hash(mechanism):
+    """
+    Hash of the mechanism file contents, so editing a mechanism invalidates
+    its cached results. Names like 'gri30.yaml' are looked up in Cantera's
+    data directories.
+    """
+    path = mechanism
+    if not os.path.exists(path):
+        import cantera as ct
+        for directory in ct.get_data_directories():
+            if os.path.exists(os.path.join(directory, mechanism)):
+                path = os.path.join(directory, mechanism)
+                break
+        else:
+            # Can't find the file, fall back to the name and Cantera version
+            return hashlib.sha1(f'{mechanism}:{ct.__version__}'.encode()).hexdigest()
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class EquilibriumCache:
+    """
+    SQLite store of equilibrium results, one row per mixture state.
+
+    Rows are keyed on mechanism hash, fuel, oxidizer, stoichiometric O2,
+    OFR, initial T and P and equilibrium mode (floats are stored as exact
+    IEEE doubles, so a repeated calculation hits exactly). Each lookup bumps
+    the row's last_used time and the least recently used rows are evicted
+    once there are more than `max_entries`.
+    """
+
+    def __init__(self, path=None, max_entries=200000):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, 'equilibrium.sqlite')
+        self.path = path
+        self.max_entries = max_entries
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            f"CREATE TABLE IF NOT EXISTS equilibrium ("
+            f"mechanism TEXT, fuel TEXT, oxidizer TEXT, moles_O2_stoich REAL, OFR REAL, "
+            f"T_initial REAL, P_initial REAL, mode TEXT, {', '.join(c + ' REAL' for c in VALUE_COLUMNS)}, "
+            f"last_used REAL, UNIQUE ({', '.join(KEY_COLUMNS)}))"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS equilibrium_lru ON equilibrium (last_used)")
+        self.db.commit()
+        self._hashes = {}
+
+    def mechanism_key(self, mechanism):
+        if mechanism not in self._hashes:
+            self._hashes[mechanism] = mechanism_hash(mechanism)
+        return self._hashes[mechanism]
+
+    def get(self, mechanism, fuel, oxidizer, moles_O2_stoich, OFR, T_initial, P_initial, mode='HP'):
+        # Returns (T, P, R, k, rho) arrays and a boolean mask of which states were found
+        keys = self._keys(mechanism, fuel, oxidizer, moles_O2_stoich, OFR, T_initial, P_initial, mode)
+        values = np.full((len(keys), len(VALUE_COLUMNS)), np.nan)
+        found = np.zeros(len(keys), dtype=bool)
+        with self.db:
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS lookup (i INTEGER, " + ", ".join(KEY_COLUMNS) + ")")
+            self.db.execute("DELETE FROM lookup")
+            self.db.executemany(f"INSERT INTO lookup VALUES (?, {', '.join('?' * len(KEY_COLUMNS))})",
+                                ((i,) + key for i, key in enumerate(keys)))
+            rows = self.db.execute(
+                f"SELECT lookup.i, e.rowid, {', '.join('e.' + c for c in VALUE_COLUMNS)} FROM lookup "
+                f"JOIN equilibrium e USING ({', '.join(KEY_COLUMNS)})"
+            ).fetchall()
+            if rows:
+                rows = np.array(rows)
+                index = rows[:, 0].astype(int)
+                values[index] = rows[:, 2:]
+                found[index] = True
+                self.db.executemany("UPDATE equilibrium SET last_used = ? WHERE rowid = ?",
+                                    ((time.time(), int(rowid)) for rowid in rows[:, 1]))
+        return values.T, found
+
+    def put(self, mechanism, fuel, oxidizer, moles_O2_stoich, OFR, T_initial, P_initial, mode, T, P, R, k, rho):
+        keys = self._keys(mechanism, fuel, oxidizer, moles_O2_stoich, OFR, T_initial, P_initial, mode)
+        values = np.column_stack([np.ravel(v) for v in (T, P, R, k, rho)]).tolist()
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO equilibrium VALUES ({', '.join('?' * (len(KEY_COLUMNS) + len(VALUE_COLUMNS) + 1))})",
+                (key + tuple(value) + (now,) for key, value in zip(keys, values))
+            )
+            self._evict()
+
+    def invalidate(self, mechanism=None):
+        # Drop every cached result, or only those for one mechanism file
+        with self.db:
+            if mechanism is None:
+                self.db.execute("DELETE FROM equilibrium")
+            else:
+                self.db.execute("DELETE FROM equilibrium WHERE mechanism = ?", (self.mechanism_key(mechanism),))
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM equilibrium").fetchone()[0]
+
+    def _evict(self):
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self.db.execute("DELETE FROM equilibrium WHERE rowid IN "
+                            "(SELECT rowid FROM equilibrium ORDER BY last_used LIMIT ?)", (excess,))
+
+    def _keys(self, mechanism, fuel, oxidizer, moles_O2_stoich, OFR, T_initial, P_initial, mode):
+        OFR, T_initial, P_initial = (np.ravel(a).astype(float).tolist()
+                                     for a in np.broadcast_arrays(OFR, T_initial, P_initial))
+        prefix = (self.mechanism_key(mechanism), fuel, oxidizer, float(moles_O2_stoich))
+        return [prefix + (o, T, P, mode) for o, T, P in zip(OFR, T_initial, P_initial)]
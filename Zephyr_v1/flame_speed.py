@@ -1,53 +1,50 @@
-import cantera as ct
 import numpy as np
-import pandas as pd
 
+# Cantera, matplotlib and scipy are only imported by the functions that need them, so importing
+# this module is free and solving a flame doesn't pay for plotting
+# Run with: python -m Zephyr_v1.flame_speed
 
 
-from matplotlib import pyplot as plt
-import matplotlib
+def set_plot_style():
+    # Plotting preferences, applied when a plot is actually made
+    from matplotlib import pyplot as plt
+    plt.rcParams["axes.labelsize"] = 14
+    plt.rcParams["xtick.labelsize"] = 12
+    plt.rcParams["ytick.labelsize"] = 12
+    plt.rcParams["legend.fontsize"] = 10
+    plt.rcParams["figure.figsize"] = (8, 6)
+    plt.rcParams["figure.dpi"] = 120
 
-from IPython.display import display, HTML
+    # Get the best of both ggplot and seaborn
+    plt.style.use("ggplot")
+    plt.style.use("seaborn-v0_8-deep")
 
-import scipy
-import scipy.optimize
+    plt.rcParams["figure.autolayout"] = True
+    return plt
 
-# Import plotting modules and define plotting preference
-
-plt.rcParams["axes.labelsize"] = 14
-plt.rcParams["xtick.labelsize"] = 12
-plt.rcParams["ytick.labelsize"] = 12
-plt.rcParams["legend.fontsize"] = 10
-plt.rcParams["figure.figsize"] = (8, 6)
-plt.rcParams["figure.dpi"] = 120
-
-# Get the best of both ggplot and seaborn
-plt.style.use("ggplot")
-plt.style.use("seaborn-v0_8-deep")
+def speed_from_grid_size(grid_size, true_speed, error):
+    """
+    Given a grid size (or an array or list of grid sizes)
+    return a prediction (or array of predictions)
+    of the computed flame speed, based on
+    the parameters `true_speed` and `error`.
 
-plt.rcParams["figure.autolayout"] = True
+    It seems, from experience, that error scales roughly with
+    1/grid_size, so we assume that form.
+    """
+    return true_speed + error / np.array(grid_size)
 
-def extrapolate_uncertainty(grids, speeds, plot=True):
+def extrapolate_uncertainty(grids, speeds, plot=False, verbose=True):
     """
     Given a list of grid sizes and a corresponding list of flame speeds,
     extrapolate and estimate the uncertainty in the final flame speed.
-    Also makes a plot, unless called with `plot=False`.
+    Also makes a plot if called with `plot=True`.
     """
+    import scipy.optimize
+
     grids = list(grids)
     speeds = list(speeds)
 
-    def speed_from_grid_size(grid_size, true_speed, error):
-        """
-        Given a grid size (or an array or list of grid sizes)
-        return a prediction (or array of predictions)
-        of the computed flame speed, based on
-        the parameters `true_speed` and `error`.
-
-        It seems, from experience, that error scales roughly with
-        1/grid_size, so we assume that form.
-        """
-        return true_speed + error / np.array(grid_size)
-
     # Fit the chosen form of speed_from_grid_size, to the last four
     # speed and grid size values.
     popt, pcov = scipy.optimize.curve_fit(speed_from_grid_size, grids[-4:], speeds[-4:])
@@ -56,193 +53,209 @@ def extrapolate_uncertainty(grids, speeds, plot=True):
     perr = np.sqrt(np.diag(pcov))
     true_speed_estimate = popt[0]
     percent_error_in_true_speed = perr[0] / popt[0]
-    print(
-        f"Fitted true_speed is {popt[0] * 100:.4f} ± {perr[0] * 100:.4f} cm/s "
-        f"({percent_error_in_true_speed:.1%})"
-    )
+    if verbose:
+        print(
+            f"Fitted true_speed is {popt[0] * 100:.4f} ± {perr[0] * 100:.4f} cm/s "
+            f"({percent_error_in_true_speed:.1%})"
+        )
 
     # How far your extrapolated infinite grid value is from your extrapolated
     # (or interpolated) final grid value, gives you some other error, `estimated_percent_error`
     estimated_percent_error = (
         speed_from_grid_size(grids[-1], *popt) - true_speed_estimate
     ) / true_speed_estimate
-    print(f"Estimated error in final calculation {estimated_percent_error:.1%}")
+    if verbose:
+        print(f"Estimated error in final calculation {estimated_percent_error:.1%}")
 
     # The total estimated error is the sum of these two errors.
     total_percent_error_estimate = abs(percent_error_in_true_speed) + abs(
         estimated_percent_error
     )
-    print(f"Estimated total error {total_percent_error_estimate:.1%}")
+    if verbose:
+        print(f"Estimated total error {total_percent_error_estimate:.1%}")
 
     if plot:
-        plt.semilogx(grids, speeds, "o-")
-        plt.ylim(
-            min(speeds[-5:] + [true_speed_estimate - perr[0]]) * 0.95,
-            max(speeds[-5:] + [true_speed_estimate + perr[0]]) * 1.05,
-        )
-        plt.plot(grids[-4:], speeds[-4:], "or")
-        extrapolated_grids = grids + [grids[-1] * i for i in range(2, 8)]
-        plt.plot(
-            extrapolated_grids, speed_from_grid_size(extrapolated_grids, *popt), ":r"
-        )
-        plt.xlim(*plt.xlim())
-        plt.hlines(true_speed_estimate, *plt.xlim(), colors="r", linestyles="dashed")
-        plt.hlines(
-            true_speed_estimate + perr[0],
-            *plt.xlim(),
-            colors="r",
-            linestyles="dashed",
-            alpha=0.3,
-        )
-        plt.hlines(
-            true_speed_estimate - perr[0],
-            *plt.xlim(),
-            colors="r",
-            linestyles="dashed",
-            alpha=0.3,
-        )
-        plt.fill_between(
-            plt.xlim(),
-            true_speed_estimate - perr[0],
-            true_speed_estimate + perr[0],
-            facecolor="red",
-            alpha=0.1,
-        )
+        plot_extrapolation(grids, speeds, popt, perr, estimated_percent_error, percent_error_in_true_speed)
 
-        above = popt[1] / abs(
-            popt[1]
-        )  # will be +1 if approach from above or -1 if approach from below
-
-        plt.annotate(
-            "",
-            xy=(grids[-1], true_speed_estimate),
-            xycoords="data",
-            xytext=(grids[-1], speed_from_grid_size(grids[-1], *popt)),
-            textcoords="data",
-            arrowprops=dict(
-                arrowstyle="|-|, widthA=0.5, widthB=0.5",
-                linewidth=1,
-                connectionstyle="arc3",
-                color="black",
-                shrinkA=0,
-                shrinkB=0,
-            ),
-        )
+    return true_speed_estimate, total_percent_error_estimate
 
-        plt.annotate(
-            f"{abs(estimated_percent_error):.1%}",
-            xy=(grids[-1], speed_from_grid_size(grids[-1], *popt)),
-            xycoords="data",
-            xytext=(5, 15 * above),
-            va="center",
-            textcoords="offset points",
-            arrowprops=dict(arrowstyle="->", connectionstyle="arc3"),
-        )
+def plot_extrapolation(grids, speeds, popt, perr, estimated_percent_error, percent_error_in_true_speed):
+    """
+    Plot the flame speed against grid size with the fitted extrapolation
+    and both error estimates from extrapolate_uncertainty.
+    """
+    plt = set_plot_style()
+    true_speed_estimate = popt[0]
+    plt.semilogx(grids, speeds, "o-")
+    plt.ylim(
+        min(speeds[-5:] + [true_speed_estimate - perr[0]]) * 0.95,
+        max(speeds[-5:] + [true_speed_estimate + perr[0]]) * 1.05,
+    )
+    plt.plot(grids[-4:], speeds[-4:], "or")
+    extrapolated_grids = grids + [grids[-1] * i for i in range(2, 8)]
+    plt.plot(
+        extrapolated_grids, speed_from_grid_size(extrapolated_grids, *popt), ":r"
+    )
+    plt.xlim(*plt.xlim())
+    plt.hlines(true_speed_estimate, *plt.xlim(), colors="r", linestyles="dashed")
+    plt.hlines(
+        true_speed_estimate + perr[0],
+        *plt.xlim(),
+        colors="r",
+        linestyles="dashed",
+        alpha=0.3,
+    )
+    plt.hlines(
+        true_speed_estimate - perr[0],
+        *plt.xlim(),
+        colors="r",
+        linestyles="dashed",
+        alpha=0.3,
+    )
+    plt.fill_between(
+        plt.xlim(),
+        true_speed_estimate - perr[0],
+        true_speed_estimate + perr[0],
+        facecolor="red",
+        alpha=0.1,
+    )
 
-        plt.annotate(
-            "",
-            xy=(grids[-1] * 4, true_speed_estimate - (above * perr[0])),
-            xycoords="data",
-            xytext=(grids[-1] * 4, true_speed_estimate),
-            textcoords="data",
-            arrowprops=dict(
-                arrowstyle="|-|, widthA=0.5, widthB=0.5",
-                linewidth=1,
-                connectionstyle="arc3",
-                color="black",
-                shrinkA=0,
-                shrinkB=0,
-            ),
-        )
-        plt.annotate(
-            f"{abs(percent_error_in_true_speed):.1%}",
-            xy=(grids[-1] * 4, true_speed_estimate - (above * perr[0])),
-            xycoords="data",
-            xytext=(5, -15 * above),
-            va="center",
-            textcoords="offset points",
-            arrowprops=dict(arrowstyle="->", connectionstyle="arc3"),
-        )
+    above = popt[1] / abs(
+        popt[1]
+    )  # will be +1 if approach from above or -1 if approach from below
+
+    plt.annotate(
+        "",
+        xy=(grids[-1], true_speed_estimate),
+        xycoords="data",
+        xytext=(grids[-1], speed_from_grid_size(grids[-1], *popt)),
+        textcoords="data",
+        arrowprops=dict(
+            arrowstyle="|-|, widthA=0.5, widthB=0.5",
+            linewidth=1,
+            connectionstyle="arc3",
+            color="black",
+            shrinkA=0,
+            shrinkB=0,
+        ),
+    )
 
-        plt.ylabel("Flame speed (m/s)")
-        plt.xlabel("Grid size")
-        plt.show()
+    plt.annotate(
+        f"{abs(estimated_percent_error):.1%}",
+        xy=(grids[-1], speed_from_grid_size(grids[-1], *popt)),
+        xycoords="data",
+        xytext=(5, 15 * above),
+        va="center",
+        textcoords="offset points",
+        arrowprops=dict(arrowstyle="->", connectionstyle="arc3"),
+    )
 
-    return true_speed_estimate, total_percent_error_estimate
+    plt.annotate(
+        "",
+        xy=(grids[-1] * 4, true_speed_estimate - (above * perr[0])),
+        xycoords="data",
+        xytext=(grids[-1] * 4, true_speed_estimate),
+        textcoords="data",
+        arrowprops=dict(
+            arrowstyle="|-|, widthA=0.5, widthB=0.5",
+            linewidth=1,
+            connectionstyle="arc3",
+            color="black",
+            shrinkA=0,
+            shrinkB=0,
+        ),
+    )
+    plt.annotate(
+        f"{abs(percent_error_in_true_speed):.1%}",
+        xy=(grids[-1] * 4, true_speed_estimate - (above * perr[0])),
+        xycoords="data",
+        xytext=(5, -15 * above),
+        va="center",
+        textcoords="offset points",
+        arrowprops=dict(arrowstyle="->", connectionstyle="arc3"),
+    )
 
-def make_callback(flame):
+    plt.ylabel("Flame speed (m/s)")
+    plt.xlabel("Grid size")
+    plt.show()
+
+class ConvergenceTracker:
     """
-    Create and return a callback function that you will attach to
-    a flame solver. The reason we define a function to make the callback function,
-    instead of just defining the callback function, is so that it can store
-    a pair of lists that persist between function calls, to store the
-    values of grid size and flame speed.
-
-    This factory returns the callback function, and the two lists:
-    (callback, speeds, grids)
+    Steady-solver callback that records the grid size and flame speed after
+    every steady solve. It does nothing else while the solver is running;
+    extrapolate() fits the grid convergence on demand and plot() draws it.
     """
-    speeds = []
-    grids = []
-
-    def callback(_):
-        speed = flame.velocity[0]
-        grid = len(flame.grid)
-        speeds.append(speed)
-        grids.append(grid)
-        print(f"Iteration {len(grids)}")
-        print(f"Current flame speed is is {speed * 100:.4f} cm/s")
-        if len(grids) < 5:
-            return 1.0  #
-        try:
-            extrapolate_uncertainty(grids, speeds)
-        except Exception as e:
-            print("Couldn't estimate uncertainty. " + str(e))
-            return 1.0  # continue anyway
+
+    def __init__(self, flame, verbose=False):
+        self.flame = flame
+        self.verbose = verbose
+        self.speeds = []
+        self.grids = []
+
+    def __call__(self, _):
+        self.speeds.append(self.flame.velocity[0])
+        self.grids.append(self.flame.grid.size)
+        if self.verbose:
+            print(f"Iteration {len(self.grids)}, flame speed {self.speeds[-1] * 100:.4f} cm/s")
         return 1.0
 
-    return callback, speeds, grids
+    def extrapolate(self, plot=False, verbose=True):
+        # Needs at least four steady solves, returns (true speed estimate, total error estimate)
+        return extrapolate_uncertainty(self.grids, self.speeds, plot=plot, verbose=verbose)
 
-# Inlet Temperature in Kelvin and Inlet Pressure in Pascals
-# In this case we are setting the inlet T and P to room temperature conditions
-# CHANGE INLET PRESSURE WHEN CALCULATED
-To = 300
-Po = 101325 * 5
+    def plot(self):
+        return self.extrapolate(plot=True, verbose=False)
 
-# Define the gas-mixutre and kinetics
-# In this case, we are choosing a GRI3.0 gas
-gas = ct.Solution("gri30.yaml")
+def make_callback(flame):
+    """
+    Create a ConvergenceTracker to attach to a flame solver, returned with
+    its lists of speeds and grid sizes: (callback, speeds, grids)
+    """
+    callback = ConvergenceTracker(flame)
+    return callback, callback.speeds, callback.grids
 
-# Create a stoichiometric CH4/Air premixed mixture
-gas.set_equivalence_ratio(1.0, "CH4", {"O2": 7.1066})
-gas.TP = To, Po
+# Define tight tolerances for the solver
+REFINE_CRITERIA = {"ratio": 2, "slope": 0.01, "curve": 0.01}
 
-# Domain width in metres
-width = 0.014
+def solve_flame_speed(To=300, Po=101325 * 5, phi=1.0, fuel="CH4", oxidizer={"O2": 7.1066}, width=0.014,
+                      refine_criteria=REFINE_CRITERIA, loglevel=1, mechanism="gri30.yaml"):
+    """
+    Solve a freely propagating flame with inlet temperature To (K) and
+    pressure Po (Pa), width is the domain width in metres. Returns the
+    flame and its ConvergenceTracker; the flame speed is
+    flame.velocity[0] and tracker.extrapolate() estimates its grid error.
+    """
+    import cantera as ct
 
-# Create the flame object
-flame = ct.FreeFlame(gas, width=width)
+    # Define the gas-mixutre and kinetics
+    gas = ct.Solution(mechanism)
 
-# Define logging level
-loglevel = 1
+    # Create the premixed mixture, stoichiometric by default
+    gas.set_equivalence_ratio(phi, fuel, oxidizer)
+    gas.TP = To, Po
 
-# Define tight tolerances for the solver
-refine_criteria = {"ratio": 2, "slope": 0.01, "curve": 0.01}
-flame.set_refine_criteria(**refine_criteria)
+    # Create the flame object
+    flame = ct.FreeFlame(gas, width=width)
+    flame.set_refine_criteria(**refine_criteria)
 
-# Set maxiumum number of grid points to be very high (otherwise default is 1000)
-flame.set_max_grid_points(flame.domains[flame.domain_index("flame")], 1e4)
+    # Set maxiumum number of grid points to be very high (otherwise default is 1000)
+    flame.set_max_grid_points(flame.domains[flame.domain_index("flame")], 1e4)
 
-# Set up the the callback function and lists of speeds and grids
-callback, speeds, grids = make_callback(flame)
-flame.set_steady_callback(callback)
+    # Set up the the callback function and lists of speeds and grids
+    callback, speeds, grids = make_callback(flame)
+    flame.set_steady_callback(callback)
 
-flame.solve(loglevel=loglevel, auto=True)
+    flame.solve(loglevel=loglevel, auto=True)
+    return flame, callback
 
-Su0 = flame.velocity[0]
-print(f"Flame Speed is: {Su0 * 100:.2f} cm/s")
+if __name__ == "__main__":
+    # Inlet Temperature in Kelvin and Inlet Pressure in Pascals
+    # CHANGE INLET PRESSURE WHEN CALCULATED
+    flame, callback = solve_flame_speed(To=300, Po=101325 * 5)
 
-best_true_speed_estimate, best_total_percent_error_estimate = extrapolate_uncertainty(
-    grids, speeds
-)
+    Su0 = flame.velocity[0]
+    print(f"Flame Speed is: {Su0 * 100:.2f} cm/s")
 
-best_true_speed_estimate
\ No newline at end of file
+    # Extrapolate once the solve has finished, then plot the grid convergence as a separate step
+    best_true_speed_estimate, best_total_percent_error_estimate = callback.extrapolate()
+    callback.plot()
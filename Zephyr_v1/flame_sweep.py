@@ -0,0 +1,196 @@
+import glob
+import hashlib
+import json
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .equilibrium_cache import CACHE_DIR, mechanism_hash
+from .reactor_run import load_gas
+
+# Laminar flame speed sweeps over equivalence ratio, pressure and inlet temperature, the batch
+# version of flame_speed.py:
+#   Su = flame_speed_sweep(np.linspace(0.7, 1.3, 7)[:, None], [1e5, 5e5, 2e6], 300)
+# Every converged flame is saved to disk, and each new point starts from the nearest saved
+# flame instead of from scratch.
+
+FLAME_DIR = os.path.join(CACHE_DIR, 'flames')
+
+# Refine criteria for a cold start, loosest first. The last stage is used for warm starts and
+# sets the accuracy of every stored flame, the same criteria as flame_speed.py
+REFINE_SCHEDULE = [
+    {'ratio': 3, 'slope': 0.3, 'curve': 0.5},
+    {'ratio': 3, 'slope': 0.1, 'curve': 0.2},
+    {'ratio': 2, 'slope': 0.01, 'curve': 0.01},
+]
+
+# How far apart two operating points are, for picking the nearest stored flame: 0.1 in phi,
+# a factor of 2 in pressure and 50 K in inlet temperature all count the same
+NEIGHBOUR_SCALES = (0.1, np.log(2), 50.0)
+
+# Anything faster is a solve that diverged rather than a flame
+MAX_SPEED = 100.0  # m/s
+
+
+class FlameCache:
+    """
+    Converged flames on disk, one Cantera YAML solution plus a small JSON
+    entry per operating point. Entries are grouped by a setup digest of the
+    mechanism contents, fuel, oxidizer, domain width and final refine
+    criteria, so flames are only reused for the same problem. Each file is
+    written by a single process, so parallel sweeps can share a directory.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or FLAME_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def setup_digest(self, mechanism, fuel, oxidizer, width, criteria):
+        setup = [mechanism_hash(mechanism), fuel, oxidizer, width, sorted(criteria.items())]
+        return hashlib.sha1(json.dumps(setup, sort_keys=True).encode()).hexdigest()[:16]
+
+    def path(self, setup, phi, P, T):
+        point = hashlib.sha1(repr((float(phi), float(P), float(T))).encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f'{setup}_{point}')
+
+    def get(self, setup, phi, P, T):
+        try:
+            with open(self.path(setup, phi, P, T) + '.json') as f:
+                return json.load(f)
+        except OSError:
+            return None
+
+    def entries(self, setup):
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, f'{setup}_*.json')):
+            try:
+                with open(path) as f:
+                    entries.append(json.load(f))
+            except (OSError, ValueError):
+                pass  # Still being written by another process
+        return entries
+
+    def nearest(self, setup, phi, P, T):
+        entries = self.entries(setup)
+        if not entries:
+            return None
+        points = np.array([(e['phi'], np.log(e['P']), e['T']) for e in entries])
+        distance = np.sum(((points - (phi, np.log(P), T)) / NEIGHBOUR_SCALES) ** 2, axis=1)
+        return entries[int(np.argmin(distance))]
+
+    def put(self, setup, phi, P, T, flame):
+        path = self.path(setup, phi, P, T)
+        flame.save(path + '.yaml', name='solution', overwrite=True)
+        entry = {'phi': float(phi), 'P': float(P), 'T': float(T), 'Su': float(flame.velocity[0]),
+                 'points': len(flame.grid), 'solution': path + '.yaml'}
+        # The JSON entry is what marks a flame as stored, write it last and in one go
+        with open(path + '.json.tmp', 'w') as f:
+            json.dump(entry, f)
+        os.replace(path + '.json.tmp', path + '.json')
+        return entry
+
+
+def solve_flame(phi, P, T, fuel='CH4', oxidizer='O2', mechanism='gri30.yaml', width=0.014,
+                schedule=REFINE_SCHEDULE, cache=None, max_points=1e4, loglevel=0):
+    """
+    Laminar flame speed (m/s) of one FreeFlame, stored in `cache`.
+
+    A flame already in the cache is returned without solving. Otherwise the
+    nearest stored flame is restored, moved to the new inlet state and
+    re-solved at the final refine criteria, which takes a fraction of a cold
+    start. With no neighbour, or if the warm start fails, the flame is
+    solved cold through the coarse-to-fine `schedule`.
+    """
+    import cantera as ct
+    cache = cache or FlameCache()
+    setup = cache.setup_digest(mechanism, fuel, oxidizer, width, schedule[-1])
+    entry = cache.get(setup, phi, P, T)
+    if entry:
+        return entry['Su']
+
+    gas = load_gas(mechanism)
+    gas.set_equivalence_ratio(phi, fuel, oxidizer)
+    gas.TP = T, P
+    X = gas.X
+
+    def new_flame():
+        gas.TPX = T, P, X
+        flame = ct.FreeFlame(gas, width=width)
+        flame.set_max_grid_points(flame.domains[flame.domain_index('flame')], max_points)
+        return flame
+
+    neighbour = cache.nearest(setup, phi, P, T)
+    if neighbour:
+        flame = new_flame()
+        try:
+            flame.restore(neighbour['solution'], name='solution', loglevel=0)
+            flame.inlet.T = T
+            flame.inlet.X = X
+            flame.P = P
+            flame.set_refine_criteria(**schedule[-1])
+            flame.solve(loglevel=loglevel, auto=False)
+            if 0 < flame.velocity[0] < MAX_SPEED:
+                return cache.put(setup, phi, P, T, flame)['Su']
+        except ct.CanteraError:
+            pass
+
+    flame = new_flame()
+    for i, criteria in enumerate(schedule):
+        flame.set_refine_criteria(**criteria)
+        flame.solve(loglevel=loglevel, auto=(i == 0))
+    if not 0 < flame.velocity[0] < MAX_SPEED:
+        raise ct.CanteraError(f'Flame at phi={phi}, P={P}Pa, T={T}K diverged')
+    return cache.put(setup, phi, P, T, flame)['Su']
+
+
+def _solve_branch(args):
+    # Solve one branch of the sweep in order, each point warm starts from the ones before it.
+    # Returns (point, Su, error) for each, the error message is None unless the solve failed
+    import cantera as ct
+    points, kwargs = args
+    cache = FlameCache(kwargs.pop('cache_dir'))
+    results = []
+    for phi, P, T in points:
+        try:
+            results.append(((phi, P, T), solve_flame(phi, P, T, cache=cache, **kwargs), None))
+        except ct.CanteraError as e:
+            results.append(((phi, P, T), np.nan, str(e)))
+    return results
+
+
+def flame_speed_sweep(phi, P, T, fuel='CH4', oxidizer='O2', mechanism='gri30.yaml', width=0.014,
+                      schedule=REFINE_SCHEDULE, processes=None, cache_dir=None, loglevel=0):
+    """
+    Flame speed (m/s) over the broadcast grid of phi, P and T, NaN where
+    the solve failed. Each failed point raises a RuntimeWarning with its
+    Cantera error, in this process whichever process solved it.
+
+    Each (P, T) pair is a branch, solved in its own process (processes=None
+    for every core, 1 to run here). Within a branch the points go outwards
+    from phi = 1, which converges most easily, so each one continues from
+    an already converged neighbour. Flames are stored in cache_dir (default
+    FLAME_DIR), so a rerun or a neighbouring sweep starts warm.
+    """
+    phi, P, T = np.broadcast_arrays(np.asarray(phi, dtype=float), np.asarray(P, dtype=float),
+                                    np.asarray(T, dtype=float))
+    points = list(zip(phi.ravel().tolist(), P.ravel().tolist(), T.ravel().tolist()))
+    branches = {}
+    for point in dict.fromkeys(points):
+        branches.setdefault(point[1:], []).append(point)
+    kwargs = dict(fuel=fuel, oxidizer=oxidizer, mechanism=mechanism, width=width, schedule=schedule,
+                  cache_dir=cache_dir, loglevel=loglevel)
+    args = [(sorted(branch, key=lambda point: abs(point[0] - 1)), dict(kwargs)) for branch in branches.values()]
+
+    if processes == 1 or len(args) == 1:
+        done = [_solve_branch(a) for a in args]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            done = list(pool.map(_solve_branch, args))
+    results = {}
+    for branch in done:
+        for point, Su, error in branch:
+            results[point] = Su
+            if error is not None:
+                warnings.warn(f'Flame at phi={point[0]}, P={point[1]}Pa, T={point[2]}K failed: {error}',
+                              RuntimeWarning)
+    return np.array([results[point] for point in points]).reshape(phi.shape)
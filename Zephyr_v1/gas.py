@@ -1,8 +1,153 @@
+import json
+import os
+from functools import lru_cache
+import numpy as np
+from .equilibrium_cache import CACHE_DIR
+from .PVT_coolprop import abstract_state
+
+# Real-fluid properties of the feed gases for blowdown.py. CoolProp is slow to call point by point
+# inside an ODE right hand side, so each fluid is tabulated once over density and internal
+# energy (the variables a tank's mass and energy balance gives directly) and interpolated.
+
+# Bump when the layout or the way tables are built changes, older tables are then rebuilt
+FLUID_TABLE_VERSION = 1
+FLUID_DIR = os.path.join(CACHE_DIR, 'fluids')
+
+PROPERTIES = ['P', 'T', 'h', 'k']
+
+# Cantera species names used elsewhere in the package, to CoolProp fluid names
+COOLPROP_NAMES = {'CH4': 'Methane', 'C3H8': 'Propane', 'O2': 'Oxygen', 'N2': 'Nitrogen', 'H2': 'Hydrogen',
+                  'N2O': 'NitrousOxide', 'air': 'Air'}
+
+# Two-phase states have no speed of sound in CoolProp, a large isentropic exponent makes the
+# orifice flow in blowdown.py incompressible there, the usual single-phase incompressible model
+K_TWO_PHASE = 1e3
+
+
+def coolprop_name(name):
+    return COOLPROP_NAMES.get(name, name)
 
 
 def air_propane():
+    # Fuel and oxidizer of an air-propane mixture, in Cantera's names
     fuel = 'C3H8'
-    ox = 
+    ox = 'O2:1, N2:3.76'
+    return fuel, ox
+
+
+class FluidTable:
+    """
+    P (Pa), T (K), h (J/kg) and isentropic exponent k = c^2 rho / P of one
+    fluid, tabulated on a uniform grid of log(density) and specific internal
+    energy.
+
+    Calls take arrays of any broadcastable shape and interpolate bilinearly,
+    states outside the table or that CoolProp couldn't evaluate are NaN.
+    Liquid states are stored but poorly resolved, the table is meant for
+    gas and supercritical feeds.
+    """
+
+    def __init__(self, log_rho, u, values, meta):
+        self.log_rho = log_rho  # 1D, uniform
+        self.u = u              # 1D, uniform
+        self.values = values    # {'P': 2D array over (log_rho, u), 'T': ..., ...}
+        self.meta = meta
+
+    def __call__(self, rho, u):
+        # Returns P, T, h, k arrays with the broadcast shape of rho and u
+        rho, u = np.broadcast_arrays(np.asarray(rho, dtype=float), np.asarray(u, dtype=float))
+        i, fi, inside_i = _uniform_locate(self.log_rho, np.log(rho))
+        j, fj, inside_j = _uniform_locate(self.u, u)
+        out = []
+        for prop in PROPERTIES:
+            v = self.values[prop]
+            value = ((1 - fi) * ((1 - fj) * v[i, j] + fj * v[i, j + 1])
+                     + fi * ((1 - fj) * v[i + 1, j] + fj * v[i + 1, j + 1]))
+            out.append(np.where(inside_i & inside_j, value, np.nan))
+        return out
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'axis_log_rho.npy'), self.log_rho)
+        np.save(os.path.join(directory, 'axis_u.npy'), self.u)
+        for prop in PROPERTIES:
+            np.save(os.path.join(directory, f'{prop}.npy'), self.values[prop])
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f, indent=2)
+
+    @classmethod
+    def load(cls, directory):
+        # Raises OSError if there's no table, ValueError if it's from an older version
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != FLUID_TABLE_VERSION:
+            raise ValueError(f'Fluid table in {directory} is version {meta.get("version")}')
+        log_rho = np.load(os.path.join(directory, 'axis_log_rho.npy'))
+        u = np.load(os.path.join(directory, 'axis_u.npy'))
+        values = {prop: np.load(os.path.join(directory, f'{prop}.npy')) for prop in PROPERTIES}
+        return cls(log_rho, u, values, meta)
+
+
+def _uniform_locate(grid, x):
+    # Cell index, fraction through the cell and whether x is inside the grid at all
+    position = (x - grid[0]) / (grid[1] - grid[0])
+    inside = (position >= 0) & (position <= len(grid) - 1)
+    i = np.clip(np.floor(np.nan_to_num(position)).astype(int), 0, len(grid) - 2)
+    return i, position - i, inside
+
+
+def build_fluid_table(fluid, rho_min=1e-2, T_max=700.0, n_rho=256, n_u=256, backend='HEOS'):
+    """
+    Tabulate `fluid` (a CoolProp or Cantera name) from rho_min up to the
+    saturated liquid density at the triple point, and from that liquid's
+    internal energy up to the gas at T_max. About a second with HEOS.
+    """
+    import CoolProp
+    import CoolProp.CoolProp as CP
+    name = coolprop_name(fluid)
+    state = abstract_state(name, backend)
+    state.update(CP.QT_INPUTS, 0, state.Ttriple())
+    rho_max, u_min = state.rhomass(), state.umass()
+    state.update(CP.DmassT_INPUTS, rho_min, T_max)
+    u_max = state.umass()
+
+    log_rho = np.linspace(np.log(rho_min), np.log(rho_max), n_rho)
+    u = np.linspace(u_min, u_max, n_u)
+    values = {prop: np.full((n_rho, n_u), np.nan) for prop in PROPERTIES}
+    for i, rho in enumerate(np.exp(log_rho).tolist()):
+        for j, u_j in enumerate(u.tolist()):
+            try:
+                state.update(CP.DmassUmass_INPUTS, rho, u_j)
+                P = state.p()
+                values['P'][i, j] = P
+                values['T'][i, j] = state.T()
+                values['h'][i, j] = state.hmass()
+            except ValueError:
+                continue  # Outside the equation of state's range
+            try:
+                values['k'][i, j] = state.speed_sound() ** 2 * rho / P
+            except ValueError:
+                values['k'][i, j] = K_TWO_PHASE
+
+    meta = {'version': FLUID_TABLE_VERSION, 'fluid': name, 'backend': backend, 'rho_min': rho_min, 'T_max': T_max,
+            'n_rho': n_rho, 'n_u': n_u, 'coolprop': CoolProp.__version__}
+    return FluidTable(log_rho, u, values, meta)
 
 
-    return
+@lru_cache(maxsize=None)
+def get_fluid_table(fluid, backend='HEOS', **kwargs):
+    """
+    Load the table for `fluid` from FLUID_DIR, building and saving it the
+    first time. Cached per process.
+    """
+    name = coolprop_name(fluid)
+    directory = os.path.join(FLUID_DIR, f'{name}_{backend.replace("&", "_")}')
+    try:
+        table = FluidTable.load(directory)
+        if all(table.meta.get(key) == value for key, value in kwargs.items()):
+            return table
+    except (OSError, ValueError):
+        pass
+    table = build_fluid_table(name, backend=backend, **kwargs)
+    table.save(directory)
+    return table
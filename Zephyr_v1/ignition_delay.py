@@ -0,0 +1,130 @@
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from .reactor_run import load_gas
+
+# Ignition delay maps over temperature, pressure and equivalence ratio, the batch version of
+# ignition_delay.ipynb. Each point is an independent constant volume reactor run, so the map
+# is spread over a process pool and every finished point is appended to a CSV straight away:
+#   tau = ignition_map(T, 5 * 101325, [0.8, 1.0, 1.2], 'ignition_C3H8.csv', processes=None)
+# Re-running with the same file skips the points already in it.
+
+RESULT_COLUMNS = ['T', 'P', 'phi', 'tau', 'X_peak', 'wall_time']
+
+
+def ignition_delay(T, P, phi, fuel='C3H8', oxidizer='O2', mechanism='gri30.yaml', species='OH',
+                   t_max=100.0, ignition_rise=400.0, peak_rtol=0.01):
+    """
+    Ignition delay of a constant volume batch reactor, taken as the time of
+    the peak in `species` mole fraction.
+
+    No end time has to be guessed: the reactor is stepped one solver step at
+    a time, so the peak is found at the solver's own resolution, which is
+    fine through ignition. Once the temperature has risen by `ignition_rise`
+    the run stops when the time reached is twice the peak time. If the mole
+    fraction never falls more than `peak_rtol` below its highest value it
+    has no peak, just a rise to equilibrium (C3H8 in pure O2 does this),
+    and tau is the first step within `peak_rtol` of that plateau. Returns
+    (tau, peak mole fraction), tau is NaN if the mixture hasn't ignited by
+    `t_max`.
+    """
+    import cantera as ct
+    gas = load_gas(mechanism)
+    gas.TP = T, P
+    gas.set_equivalence_ratio(phi, fuel=fuel, oxidizer=oxidizer)
+    reactor = ct.IdealGasReactor(gas, clone=True, name='Batch Reactor')
+    network = ct.ReactorNet([reactor])
+    index = gas.species_index(species)
+
+    T_initial = reactor.T
+    t = 0.0
+    times, fractions = [], []
+    X_peak, t_peak = 0.0, 0.0  # Highest sample so far
+    X_rise, t_rise = 0.0, 0.0  # Last sample that rose by more than peak_rtol
+    ignited = False
+    while t < t_max:
+        # Every step is sampled, advancing to fixed times would only see the peak on their grid
+        t = network.step()
+        X = reactor.phase.X[index]
+        times.append(t)
+        fractions.append(X)
+        if X > X_peak:
+            X_peak, t_peak = X, t
+        if X > X_rise * (1 + peak_rtol):
+            X_rise, t_rise = X, t
+        ignited = ignited or reactor.T - T_initial > ignition_rise
+        # Without an overshoot the highest sample is just the latest one on the plateau, stop
+        # waiting for it to fall at 10 times the last real rise
+        if ignited and t >= 2 * t_rise and (t >= 2 * t_peak or t >= 10 * t_rise):
+            if X < X_peak / (1 + peak_rtol):
+                return t_peak, X_peak
+            # No peak, the first step onto the plateau
+            return times[np.argmax(np.array(fractions) >= X_peak / (1 + peak_rtol))], X_peak
+    return np.nan, X_peak
+
+
+def _run_point(args):
+    # One map point, runs in a worker process
+    T, P, phi, kwargs = args
+    start = time.perf_counter()
+    tau, X_peak = ignition_delay(T, P, phi, **kwargs)
+    return T, P, phi, float(tau), float(X_peak), time.perf_counter() - start
+
+
+def load_results(path):
+    # {(T, P, phi): row} of the points already in a results file
+    results = {}
+    if os.path.exists(path):
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                values = {name: float(row[name]) for name in RESULT_COLUMNS}
+                results[(values['T'], values['P'], values['phi'])] = values
+    return results
+
+
+def ignition_map(T, P, phi, results_path, fuel='C3H8', oxidizer='O2', mechanism='gri30.yaml',
+                 processes=None, verbose=True, **kwargs):
+    """
+    Ignition delay over the broadcast grid of T, P and phi.
+
+    Points run in a pool of `processes` workers (None for every core, 1 to
+    run in this process) and each result is appended to the CSV at
+    `results_path` as soon as it finishes, so an interrupted map resumes
+    where it stopped. Use a separate file per fuel, oxidizer and mechanism.
+    Extra arguments go to ignition_delay. Returns tau with the grid shape.
+    """
+    T, P, phi = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(P, dtype=float),
+                                    np.asarray(phi, dtype=float))
+    kwargs = dict(kwargs, fuel=fuel, oxidizer=oxidizer, mechanism=mechanism)
+    results = load_results(results_path)
+    points = list(zip(T.ravel().tolist(), P.ravel().tolist(), phi.ravel().tolist()))
+    todo = [point for point in dict.fromkeys(points) if point not in results]
+    if verbose and len(todo) < len(points):
+        print(f'Resuming, {len(points) - len(todo)} of {len(points)} points already in {results_path}')
+
+    new_file = not os.path.exists(results_path)
+    with open(results_path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(RESULT_COLUMNS)
+
+        def record(row):
+            writer.writerow([repr(value) for value in row])
+            f.flush()
+            results[row[:3]] = dict(zip(RESULT_COLUMNS, row))
+            if verbose:
+                print(f'Ignition delay {row[3]:.3e} s for T={row[0]}K, P={row[1]}Pa, phi={row[2]}, '
+                      f'took {row[5]:3.2f}s ({len(results)}/{len(points)})')
+
+        args = [point + (kwargs,) for point in todo]
+        if processes == 1:
+            for a in args:
+                record(_run_point(a))
+        elif args:
+            with ProcessPoolExecutor(processes) as pool:
+                for future in as_completed([pool.submit(_run_point, a) for a in args]):
+                    record(future.result())
+
+    return np.array([results[point]['tau'] for point in points]).reshape(T.shape)
@@ -0,0 +1,63 @@
+import json
+import os
+import subprocess
+import sys
+
+# Cold import time of each module in a fresh interpreter, run from the repository root with:
+#   python -m Zephyr_v1.import_benchmark
+# Fails (exit code 1) if any module takes longer than IMPORT_BUDGET or loads a heavy dependency.
+
+IMPORT_BUDGET = 0.2  # s, per module, not counting interpreter start up
+
+MODULES = [
+    'blowdown', 'combustion_optimiser', 'combustion_plot', 'combustion_steady_state', 'design_sweep',
+    'equilibrium_cache', 'flame_speed', 'flame_sweep', 'gas', 'GasReactor', 'ignition_delay', 'length_optimiser',
+    'nozzle_data_plot', 'nozzle_design', 'nozzle_ratios', 'property_table', 'PVT_coolprop', 'ratio_plot',
+    'reactor_run',
+]
+
+# Only imported by the functions that need them
+HEAVY = ['cantera', 'CoolProp', 'scipy', 'matplotlib', 'pandas', 'IPython']
+
+PACKAGE = __name__.rpartition('.')[0] or 'Zephyr_v1'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({"time": elapsed, "heavy": [m for m in sys.argv[2:] if m in sys.modules]}))
+'''
+
+
+def measure(module):
+    # Returns (seconds, heavy modules loaded), or raises RuntimeError if the import fails
+    done = subprocess.run([sys.executable, '-c', PROBE, f'{PACKAGE}.{module}', *HEAVY],
+                          cwd=ROOT, capture_output=True, text=True)
+    if done.returncode:
+        raise RuntimeError(done.stderr.strip().splitlines()[-1])
+    result = json.loads(done.stdout.strip().splitlines()[-1])
+    return result['time'], result['heavy']
+
+
+def main(budget=IMPORT_BUDGET):
+    failed = []
+    for module in MODULES:
+        try:
+            elapsed, heavy = measure(module)
+        except RuntimeError as e:
+            print(f'{module:<26} import failed: {e}')
+            failed.append(module)
+            continue
+        over = elapsed > budget or heavy
+        print(f'{module:<26} {elapsed * 1000:7.1f} ms' + (f'  loads {", ".join(heavy)}' if heavy else '')
+              + ('  OVER BUDGET' if over else ''))
+        if over:
+            failed.append(module)
+    print(f'{len(MODULES) - len(failed)}/{len(MODULES)} modules within {budget * 1000:.0f} ms with no heavy imports')
+    return not failed
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
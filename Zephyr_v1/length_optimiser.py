@@ -1,11 +1,11 @@
-import matplotlib.pyplot as plt
 import numpy as np
+from .nozzle_design import NozzleDesign, ONE_ATM, G0
 
 # To optimise this we normalise both the L_cone and ue_correction_factor equations creating a composite
 # objective function to balance the tradeoff. The the optimal 'theta' is found that minimises the 
 # objective function. The normalised values are plotted, highlighting the optimal 'theta'.
 
-def plot_and_optimize(theta, L_cone, ue_correction_factor, w1=0.5, w2=0.5):
+def plot_and_optimize(theta, L_cone, ue_correction_factor, w1=0.5, w2=0.5, plot=True, verbose=True):
     # Normalize values
     L_cone_normalized = (L_cone - np.min(L_cone)) / (np.max(L_cone) - np.min(L_cone))
     ue_correction_factor_normalized = (ue_correction_factor - np.min(ue_correction_factor)) / (np.max(ue_correction_factor) - np.min(ue_correction_factor))
@@ -19,7 +19,19 @@ def plot_and_optimize(theta, L_cone, ue_correction_factor, w1=0.5, w2=0.5):
     optimal_L_cone = L_cone[optimal_index]
     optimal_ue_correction_factor = ue_correction_factor[optimal_index]
 
-    # Plotting
+    if plot:
+        plot_tradeoff(theta, L_cone_normalized, ue_correction_factor_normalized, optimal_theta)
+
+    # Print optimal values
+    if verbose:
+        print(f'Optimal Theta: {optimal_theta:.1f} deg')
+        print(f'Optimal Length of Cone: {optimal_L_cone:.3f} m')
+        print(f'Optimal Correction Factor: {optimal_ue_correction_factor:.3f}')
+
+    return optimal_theta, optimal_L_cone, optimal_ue_correction_factor
+
+def plot_tradeoff(theta, L_cone_normalized, ue_correction_factor_normalized, optimal_theta):
+    import matplotlib.pyplot as plt
     plt.figure()
     plt.plot(theta, L_cone_normalized, label='Normalized Length of Cone')
     plt.plot(theta, ue_correction_factor_normalized, label='Normalized Correction Factor')
@@ -31,10 +43,123 @@ def plot_and_optimize(theta, L_cone, ue_correction_factor, w1=0.5, w2=0.5):
     plt.grid(True)
     plt.show()
 
-    # Print optimal values
-    print(f'Optimal Theta: {optimal_theta:.1f} deg')
-    print(f'Optimal Length of Cone: {optimal_L_cone:.3f} m')
-    print(f'Optimal Correction Factor: {optimal_ue_correction_factor:.3f}')
 
-    return optimal_theta, optimal_L_cone, optimal_ue_correction_factor
 
+# Multi-objective version: rather than one weighted point over a precomputed theta sweep, cone
+# length and the divergence loss are computed here over half-angle, expansion ratio and throat
+# radius together, and the whole Pareto front of the chosen objectives is returned. Run with:
+#   python -m Zephyr_v1.length_optimiser
+
+# Objectives that are minimised, every other output is maximised
+MINIMISE = ['L_cone', 'A_exit', 'R_exit', 'm_dot']
+
+def divergence_loss_factor(theta):
+    # Fraction of the exhaust momentum that is axial for a conical nozzle of half-angle theta (degrees)
+    return (1 + np.cos(np.radians(theta))) / 2
+
+def cone_length(At_radius, R_exit, theta):
+    # Length of the divergent cone from the throat to the exit radius
+    return (R_exit - At_radius) / np.tan(np.radians(theta))
+
+def evaluate_cones(theta, Ar, At_radius, k, R, Tc, Pc, Pa=ONE_ATM):
+    """
+    Conical nozzle candidates, all arguments broadcast together. Returns the
+    NozzleDesign outputs with thrust, CF and Isp reduced by the divergence
+    loss factor lambda on the momentum term, plus theta, lambda and L_cone.
+    """
+    theta = np.asarray(theta, dtype=float)
+    results = NozzleDesign(At_radius, k, R, Tc, Ar=Ar, Pc=Pc, Pa=Pa).evaluate()
+    loss = divergence_loss_factor(theta)
+    F = loss * results['m_dot'] * results['ue'] + results['F_pressure']
+    results.update(theta=np.broadcast_to(theta, F.shape), At_radius=np.broadcast_to(At_radius, F.shape),
+                   loss=loss * np.ones_like(F), L_cone=cone_length(At_radius, results['R_exit'], theta), F=F,
+                   CF=F / (results['At'] * results['Pc']), Isp=F / (results['m_dot'] * G0))
+    return results
+
+def pareto_front(costs):
+    """
+    Boolean mask of the rows of costs (n candidates by m objectives, all
+    minimised) that no other row is at least as good as in every objective
+    and better in one.
+    """
+    costs = np.asarray(costs, dtype=float)
+    # Sorted by the first objective, a point can only be dominated by the ones before it, so each
+    # survivor in turn removes everything it dominates
+    order = np.lexsort(costs.T[::-1])
+    remaining = order
+    i = 0
+    while i < len(remaining):
+        point = costs[remaining[i]]
+        others = costs[remaining]
+        dominated = np.all(others >= point, axis=1) & np.any(others > point, axis=1)
+        remaining = remaining[~dominated]
+        i += 1
+    efficient = np.zeros(len(costs), dtype=bool)
+    efficient[remaining] = True
+    return efficient
+
+def optimise_nozzle(k, R, Tc, Pc, Pa=ONE_ATM, theta=(8, 25), Ar=(1.5, 10), At_radius=(0.01, 0.03),
+                    objectives=('L_cone', 'F'), n=2000, rounds=4, spread=0.1, seed=0, plot=False):
+    """
+    Pareto front of conical nozzles over half-angle theta (degrees),
+    expansion ratio Ar and throat radius At_radius (m), each a (low, high)
+    range or a fixed value. objectives are output names of evaluate_cones,
+    those in MINIMISE are minimised and the rest maximised.
+
+    n random candidates are evaluated at once, then each of `rounds`
+    refinements adds n more scattered around the current front, with a
+    spread (as a fraction of each range) that halves every round. Flow
+    separation in over-expanded nozzles isn't modelled.
+
+    Returns {name: array} of the front's parameters and outputs, sorted by
+    the first objective. plot=True also plots the front.
+    """
+    rng = np.random.default_rng(seed)
+    bounds = np.array([np.broadcast_to(np.asarray(x, dtype=float), 2) for x in (theta, Ar, At_radius)])
+    low, width = bounds[:, 0], bounds[:, 1] - bounds[:, 0]
+    sense = np.array([1.0 if name in MINIMISE else -1.0 for name in objectives])
+
+    def evaluate(candidates):
+        results = evaluate_cones(*candidates.T, k=k, R=R, Tc=Tc, Pc=Pc, Pa=Pa)
+        return np.column_stack([results[name] for name in objectives]) * sense
+
+    candidates = low + width * rng.random((n, 3))
+    costs = evaluate(candidates)
+    front = pareto_front(costs)
+    for i in range(rounds):
+        parents = candidates[front][rng.integers(front.sum(), size=n)]
+        children = np.clip(parents + rng.normal(size=(n, 3)) * width * spread / 2**i, low, low + width)
+        candidates = np.vstack([candidates[front], children])
+        costs = np.vstack([costs[front], evaluate(children)])
+        front = pareto_front(costs)
+
+    best = candidates[front][np.argsort(costs[front, 0])]
+    results = {name: np.asarray(value) for name, value in
+               evaluate_cones(*best.T, k=k, R=R, Tc=Tc, Pc=Pc, Pa=Pa).items()}
+    if plot:
+        plot_front(results, objectives)
+    return results
+
+def plot_front(front, objectives=('L_cone', 'F')):
+    # The first two objectives of an optimise_nozzle front, coloured by half-angle
+    import matplotlib.pyplot as plt
+    plt.figure()
+    points = plt.scatter(front[objectives[0]], front[objectives[1]], c=front['theta'], s=10)
+    plt.colorbar(points, label='Half-angle (degrees)')
+    plt.xlabel(objectives[0])
+    plt.ylabel(objectives[1])
+    plt.title('Pareto Front of Conical Nozzles')
+    plt.grid(True)
+    plt.show()
+
+if __name__ == '__main__':
+    import time
+
+    # Shortest cone for each thrust level, chamber gas as in the user_interface notebook, sea level
+    start = time.perf_counter()
+    front = optimise_nozzle(k=1.2, R=350, Tc=2500, Pc=2e6)
+    print(f"{len(front['F'])} designs on the front in {time.perf_counter() - start:.2f} s")
+    for i in np.linspace(0, len(front['F']) - 1, 5).astype(int):
+        print(f"L_cone {front['L_cone'][i]:.3f} m, F {front['F'][i]:.0f} N: theta {front['theta'][i]:.1f} deg, "
+              f"Ar {front['Ar'][i]:.2f}, At_radius {front['At_radius'][i] * 1e3:.1f} mm")
+    plot_front(front)
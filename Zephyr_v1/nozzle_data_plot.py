@@ -1,4 +1,88 @@
-import matplotlib.pyplot as plt
+import numpy as np
+from .nozzle_ratios import mach_from_area_ratio, pressure_ratio, temperature_ratio, density_ratio
 
-# def nozzle_data_plot():
-# Aim of this code would be to plot PVT actual values through nozzle
\ No newline at end of file
+# Aim of this code would be to plot PVT actual values through nozzle
+# Quasi-1D isentropic flow along a nozzle contour, run with: python -m Zephyr_v1.nozzle_data_plot
+
+
+def conical_contour(r_throat, r_exit, r_inlet=None, half_angle=15, convergent_half_angle=45, n=1000):
+    """
+    Axial positions x (m, throat at x = 0) and areas A (m^2) of a conical
+    nozzle, n points with one of them at the throat. The convergent section
+    starts at r_inlet (default 3 * r_throat).
+    """
+    r_inlet = 3 * r_throat if r_inlet is None else r_inlet
+    L_convergent = (r_inlet - r_throat) / np.tan(np.radians(convergent_half_angle))
+    L_divergent = (r_exit - r_throat) / np.tan(np.radians(half_angle))
+    # Points shared out by length, nozzle_flow takes the smallest area as the throat so it has to be sampled
+    n_convergent = min(max(2, round(n * L_convergent / (L_convergent + L_divergent))), n - 1)
+    x = np.concatenate([np.linspace(-L_convergent, 0, n_convergent),
+                        np.linspace(0, L_divergent, n - n_convergent + 1)[1:]])
+    r = np.where(x < 0, r_throat - x * np.tan(np.radians(convergent_half_angle)),
+                 r_throat + x * np.tan(np.radians(half_angle)))
+    return x, np.pi * r**2
+
+
+def nozzle_flow(A, Pc, Tc, k=1.2, R=287.0):
+    """
+    Isentropic quasi-1D flow through a nozzle with areas A (m^2) along its
+    axis, from a chamber at Pc (Pa) and Tc (K), which are taken as the
+    stagnation conditions. The smallest area is the throat, the flow is
+    choked there, subsonic before it and supersonic after it, so shocks and
+    separation in an over-expanded nozzle aren't modelled.
+
+    A is (n,) or (..., n) for several contours, and Pc, Tc, k and R (J/kg/K)
+    are scalars or arrays that broadcast against A without its last axis,
+    e.g. k[:, None] to run many cases in one call. Returns a dict of M, P,
+    T, rho and u (m/s) arrays with the broadcast shape, plus mdot (kg/s).
+    """
+    A = np.asarray(A, dtype=float)
+    Pc, Tc, k, R = [np.asarray(a, dtype=float)[..., None] for a in (Pc, Tc, k, R)]
+    throat = np.argmin(A, axis=-1)[..., None]
+    At = np.take_along_axis(A, throat, axis=-1)
+    supersonic = np.arange(A.shape[-1]) > throat
+
+    M = mach_from_area_ratio(A / At, k, np.broadcast_to(supersonic, np.broadcast_shapes(A.shape, k.shape)))
+    T = Tc * temperature_ratio(M, k)
+    rho = Pc / (R * Tc) * density_ratio(M, k)
+    u = M * np.sqrt(k * R * T)
+    flow = {'M': M, 'P': Pc * pressure_ratio(M, k), 'T': T, 'rho': rho, 'u': u}
+    # M only depends on A and k, T on Tc too, so some profiles can have fewer dimensions than others
+    shape = np.broadcast_shapes(*[value.shape for value in flow.values()])
+    flow = {name: np.broadcast_to(value, shape) for name, value in flow.items()}
+    flow['mdot'] = (rho * u * A)[..., 0]
+    return flow
+
+
+def nozzle_data_plot(x, flow, index=()):
+    # Mach number, pressure, temperature, density and velocity along the nozzle for one case of nozzle_flow
+    import matplotlib.pyplot as plt
+
+    labels = {'M': 'Mach number', 'P': 'Pressure (Pa)', 'T': 'Temperature (K)', 'rho': 'Density (kg/m^3)',
+              'u': 'Velocity (m/s)'}
+    fig, axes = plt.subplots(len(labels), 1, figsize=(8, 12), sharex=True)
+    for ax, (name, label) in zip(axes, labels.items()):
+        ax.plot(x, flow[name][index])
+        ax.set_ylabel(label)
+        ax.axvline(x[np.argmax(flow['M'][index] >= 1)], color='gray', linestyle='--')
+        ax.grid(True)
+    axes[-1].set_xlabel('Axial position from throat (m)')
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == '__main__':
+    import time
+    from .nozzle_ratios import area_ratio_M
+
+    # Throat radius from the notebook, exit sized for Mach 2 with k = 1.2
+    x, A = conical_contour(0.02, 0.02 * np.sqrt(area_ratio_M(2, 1.2)))
+    flow = nozzle_flow(A, Pc=790e3, Tc=3000, k=1.2, R=350)
+    print(f"Exit Mach {flow['M'][-1]:.3f}, exit pressure {flow['P'][-1] / 1e3:.1f} kPa, "
+          f"mass flow {flow['mdot']:.3f} kg/s")
+
+    # Many cases at once: 50 values of k by 40 chamber pressures, 1000 points each
+    start = time.perf_counter()
+    cases = nozzle_flow(A, Pc=np.linspace(3e5, 3e6, 40), Tc=3000, k=np.linspace(1.1, 1.4, 50)[:, None], R=350)
+    print(f"{cases['mdot'].size} cases of {len(x)} points in {time.perf_counter() - start:.3f} s")
+    nozzle_data_plot(x, flow)
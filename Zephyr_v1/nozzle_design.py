@@ -0,0 +1,124 @@
+import numpy as np
+from .nozzle_ratios import area_ratio_M, pressure_ratio, temperature_ratio, density_ratio, mach_from_area_ratio
+
+# Nozzle design quantities from the user_interface notebook (areas, station conditions, mass flow,
+# thrust, CF, Isp and c*) for whole arrays of designs at once, run with: python -m Zephyr_v1.nozzle_design
+
+ONE_ATM = 101325.0  # Pa
+G0 = 9.80665  # m/s^2
+
+INPUTS = ['At_radius', 'k', 'R', 'Tc', 'Me', 'Ar', 'Pc', 'Pe', 'Pa', 'M_inlet']
+OUTPUTS = ['Me', 'Ar', 'At', 'A_inlet', 'R_inlet', 'A_exit', 'R_exit', 'Pc', 'Pt', 'Pe', 'Pa', 'Tc', 'Tt', 'Te',
+           'rhoc', 'rhot', 'rhoe', 'ut', 'ue', 'm_dot', 'c_star', 'F', 'F_pressure', 'CF', 'Isp']
+
+
+class NozzleDesign:
+    """
+    Ideal rocket nozzle designs, each input a scalar or an array and all of
+    them broadcast together, so one evaluate() covers every design.
+
+    The exit is set by either the exit Mach number Me or the expansion
+    ratio Ar = Ae/At, and the chamber by either Pc or the exit pressure Pe
+    it should expand to (default 1 atm, the notebook's ideal expansion).
+    Pa is the ambient pressure, thrust includes the pressure term
+    (Pe - Pa) * Ae. Pressures are Pa, lengths m, Tc K and R J/kg/K. The
+    chamber is the stagnation state and the inlet is where the Mach number
+    is M_inlet.
+    """
+
+    def __init__(self, At_radius, k, R, Tc, Me=None, Ar=None, Pc=None, Pe=None, Pa=ONE_ATM, M_inlet=0.1):
+        if (Me is None) == (Ar is None):
+            raise ValueError('Give exactly one of Me and Ar')
+        if Pc is not None and Pe is not None:
+            raise ValueError('Give at most one of Pc and Pe')
+        self.At_radius = At_radius
+        self.k = k
+        self.R = R
+        self.Tc = Tc
+        self.Me = Me
+        self.Ar = Ar
+        self.Pc = Pc
+        self.Pe = ONE_ATM if Pc is None and Pe is None else Pe
+        self.Pa = Pa
+        self.M_inlet = M_inlet
+
+    @classmethod
+    def from_frame(cls, frame):
+        # One design per row, columns named as the constructor arguments
+        return cls(**{name: frame[name].to_numpy() for name in INPUTS if name in frame})
+
+    def evaluate(self):
+        """
+        Returns {name: array} for every name in OUTPUTS, with the broadcast
+        shape of the inputs: F and F_pressure in N, m_dot in kg/s, c_star,
+        ut and ue in m/s and Isp in s.
+        """
+        k, R, Tc = [np.asarray(a, dtype=float) for a in (self.k, self.R, self.Tc)]
+        if self.Me is not None:
+            Me = np.asarray(self.Me, dtype=float)
+            Ar = area_ratio_M(Me, k)
+        else:
+            Ar = np.asarray(self.Ar, dtype=float)
+            Me = mach_from_area_ratio(Ar, k, 'supersonic')
+
+        # Pressure
+        Pr_exit = pressure_ratio(Me, k)
+        if self.Pc is not None:
+            Pc = np.asarray(self.Pc, dtype=float)
+            Pe = Pc * Pr_exit
+        else:
+            Pe = np.asarray(self.Pe, dtype=float)
+            Pc = Pe / Pr_exit
+        Pt = Pc * pressure_ratio(1, k)
+        Pa = np.asarray(self.Pa, dtype=float)
+
+        # Area and radius
+        At = np.pi * np.asarray(self.At_radius, dtype=float)**2
+        A_exit = Ar * At
+        A_inlet = area_ratio_M(np.asarray(self.M_inlet, dtype=float), k) * At
+
+        # Temperature, density and velocity
+        Tt = Tc * temperature_ratio(1, k)
+        Te = Tc * temperature_ratio(Me, k)
+        rhoc = Pc / (R * Tc)
+        ut = np.sqrt(k * R * Tt)
+        ue = np.sqrt(2 * k * R * Tc / (k-1) * (1 - Pr_exit**((k-1)/k)))
+
+        # Mass flow through the choked throat, and the characteristic velocity
+        m_dot = At * Pc * np.sqrt(k / (R * Tc)) * ((k+1)/2)**(-(k+1)/(2*(k-1)))
+        c_star = Pc * At / m_dot
+
+        # Thrust, momentum plus the pressure difference across the exit
+        F_pressure = (Pe - Pa) * A_exit
+        F = m_dot * ue + F_pressure
+
+        results = {'Me': Me, 'Ar': Ar, 'At': At, 'A_inlet': A_inlet, 'R_inlet': np.sqrt(A_inlet / np.pi),
+                   'A_exit': A_exit, 'R_exit': np.sqrt(A_exit / np.pi), 'Pc': Pc, 'Pt': Pt, 'Pe': Pe, 'Pa': Pa,
+                   'Tc': Tc, 'Tt': Tt, 'Te': Te, 'rhoc': rhoc, 'rhot': rhoc * density_ratio(1, k),
+                   'rhoe': rhoc * density_ratio(Me, k), 'ut': ut, 'ue': ue, 'm_dot': m_dot, 'c_star': c_star,
+                   'F': F, 'F_pressure': F_pressure, 'CF': F / (At * Pc), 'Isp': F / (m_dot * G0)}
+        shape = np.broadcast_shapes(*[value.shape for value in results.values()])
+        return {name: np.broadcast_to(value, shape) for name, value in results.items()}
+
+    def frame(self):
+        # evaluate() as a pandas DataFrame, one row per design
+        import pandas as pd
+        return pd.DataFrame({name: np.ravel(value) for name, value in self.evaluate().items()})
+
+
+if __name__ == '__main__':
+    import time
+
+    # The notebook's design, Mach 2 exit expanding to 1 atm with products from the combustion cell
+    design = NozzleDesign(At_radius=0.02, k=1.2, R=350, Tc=2500, Me=2).evaluate()
+    print(f"Pc {design['Pc'] / 1e3:.1f} kPa, m_dot {design['m_dot']:.3f} kg/s, F {design['F']:.1f} N, "
+          f"CF {design['CF']:.3f}, Isp {design['Isp']:.1f} s")
+
+    # A million candidates: expansion ratio, chamber pressure and gas properties, at sea level
+    rng = np.random.default_rng(0)
+    n = 10**6
+    start = time.perf_counter()
+    designs = NozzleDesign(At_radius=rng.uniform(0.005, 0.03, n), k=rng.uniform(1.15, 1.3, n),
+                           R=rng.uniform(300, 400, n), Tc=rng.uniform(2000, 3500, n), Ar=rng.uniform(1.5, 10, n),
+                           Pc=rng.uniform(5e5, 5e6, n)).evaluate()
+    print(f'{n} designs in {time.perf_counter() - start:.3f} s, best CF {designs["CF"].max():.3f}')
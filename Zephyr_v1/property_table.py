@@ -0,0 +1,162 @@
+import json
+import os
+import numpy as np
+from .equilibrium_cache import CACHE_DIR, mechanism_hash
+
+# Bump when the layout or the way tables are built changes, older tables are then rebuilt
+TABLE_VERSION = 1
+TABLE_DIR = os.path.join(CACHE_DIR, 'tables')
+
+AXES = ['OFR', 'Pc', 'T_initial']
+PROPERTIES = ['T', 'R', 'k', 'rho']
+# Density is proportional to Pc, so it's tabulated as rho / Pc which interpolates far better
+PRESSURE_SCALED = ['rho']
+
+
+class PropertyTable:
+    """
+    Equilibrium product properties (T, R, k, rho) tabulated over OFR, chamber
+    pressure Pc and initial temperature for one propellant pair.
+
+    Queries are multilinear interpolation (linear in log(Pc)) and take arrays
+    of any broadcastable shape, so millions of points can be looked up in one
+    call. `error` holds the largest relative error against direct Cantera
+    calls found by `validate`.
+    """
+
+    def __init__(self, axes, values, meta):
+        self.axes = axes      # {'OFR': 1D array, 'Pc': ..., 'T_initial': ...}
+        self.values = values  # {'T': 3D array over (OFR, Pc, T_initial), 'R': ..., ...}
+        self.meta = meta
+
+    @property
+    def error(self):
+        return self.meta.get('error')
+
+    def __call__(self, OFR, Pc, T_initial=298.15):
+        # Returns T, R, k, rho arrays with the broadcast shape of the inputs
+        OFR, Pc, T_initial = np.broadcast_arrays(np.asarray(OFR, dtype=float), np.asarray(Pc, dtype=float),
+                                                 np.asarray(T_initial, dtype=float))
+        shape = OFR.shape
+        index, weight = [], []
+        for name, x in zip(AXES, (OFR, Pc, T_initial)):
+            grid = self.axes[name]
+            if name == 'Pc':
+                grid, x = np.log(grid), np.log(x)
+            i, w = _locate(grid, x.ravel())
+            index.append(i)
+            weight.append(w)
+
+        results = []
+        for prop in PROPERTIES:
+            table = self.values[prop]
+            out = np.zeros(OFR.size)
+            # Sum over the 8 corners of the enclosing cell
+            for corner in range(8):
+                bits = [(corner >> axis) & 1 for axis in range(3)]
+                if any(bit and table.shape[axis] == 1 for axis, bit in enumerate(bits)):
+                    continue
+                w = np.ones(OFR.size)
+                for axis, bit in enumerate(bits):
+                    w *= weight[axis] if bit else 1 - weight[axis]
+                out += w * table[index[0] + bits[0], index[1] + bits[1], index[2] + bits[2]]
+            if prop in PRESSURE_SCALED:
+                out *= Pc.ravel()
+            results.append(out.reshape(shape))
+        return tuple(results)
+
+    def validate(self, n=200, seed=0):
+        # Compare against direct equilibrium calls at random points inside the table
+        from .combustion_optimiser import ofr_sweep
+        rng = np.random.default_rng(seed)
+        points = [rng.uniform(self.axes[name].min(), self.axes[name].max(), n) for name in AXES]
+        points[1] = np.exp(rng.uniform(np.log(self.axes['Pc'].min()), np.log(self.axes['Pc'].max()), n))
+        T, _, R, k, rho = ofr_sweep(points[0], fuel=self.meta['fuel'], oxidizer=self.meta['oxidizer'],
+                                    moles_O2_stoich=self.meta['moles_O2_stoich'], T_initial=points[2],
+                                    P_initial=points[1], mechanism=self.meta['mechanism'], use_cache=False)
+        exact = dict(zip(PROPERTIES, (T, R, k, rho)))
+        approx = dict(zip(PROPERTIES, self(*points)))
+        error = {}
+        for prop in PROPERTIES:
+            rel = np.abs(approx[prop] - exact[prop]) / np.abs(exact[prop])
+            error[prop] = {'max': float(rel.max()), 'mean': float(rel.mean())}
+        self.meta['error'] = error
+        return error
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in AXES:
+            np.save(os.path.join(directory, f'axis_{name}.npy'), self.axes[name])
+        for prop in PROPERTIES:
+            np.save(os.path.join(directory, f'{prop}.npy'), self.values[prop])
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f, indent=2)
+
+    @classmethod
+    def load(cls, directory):
+        # Property arrays are memory-mapped, only the cells actually queried are read from disk
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != TABLE_VERSION:
+            raise ValueError(f'{directory} is a version {meta.get("version")} table, expected {TABLE_VERSION}')
+        axes = {name: np.load(os.path.join(directory, f'axis_{name}.npy')) for name in AXES}
+        values = {prop: np.load(os.path.join(directory, f'{prop}.npy'), mmap_mode='r') for prop in PROPERTIES}
+        return cls(axes, values, meta)
+
+
+def _locate(grid, x):
+    # Cell index and fractional position of x along a sorted grid, clamped to the grid ends
+    if len(grid) == 1:
+        return np.zeros(len(x), dtype=np.intp), np.zeros(len(x))
+    i = np.clip(np.searchsorted(grid, x, side='right') - 1, 0, len(grid) - 2)
+    w = np.clip((x - grid[i]) / (grid[i + 1] - grid[i]), 0.0, 1.0)
+    return i, w
+
+
+def build_table(fuel='CH4', oxidizer='O2', moles_O2_stoich=2,
+                OFR=np.linspace(0.1, 6, 120), Pc=np.geomspace(1e5, 5e6, 12), T_initial=np.array([298.15]),
+                mechanism='gri30.yaml', processes=1, validate=200):
+    """
+    Equilibrate the full (OFR, Pc, T_initial) grid with ofr_sweep and return
+    a PropertyTable. Properties are stored as float32, which is well inside
+    the interpolation error; `validate` random points are checked against
+    Cantera to fill in the error bound.
+    """
+    from .combustion_optimiser import ofr_sweep
+    axes = {'OFR': np.asarray(OFR, dtype=float), 'Pc': np.asarray(Pc, dtype=float),
+            'T_initial': np.asarray(T_initial, dtype=float)}
+    T, _, R, k, rho = ofr_sweep(axes['OFR'][:, None, None], fuel=fuel, oxidizer=oxidizer,
+                                moles_O2_stoich=moles_O2_stoich, T_initial=axes['T_initial'][None, None, :],
+                                P_initial=axes['Pc'][None, :, None], mechanism=mechanism, processes=processes)
+    values = {prop: v.astype(np.float32) for prop, v in zip(PROPERTIES, (T, R, k, rho / axes['Pc'][None, :, None]))}
+    meta = {
+        'version': TABLE_VERSION, 'fuel': fuel, 'oxidizer': oxidizer, 'moles_O2_stoich': moles_O2_stoich,
+        'mechanism': mechanism, 'mechanism_hash': mechanism_hash(mechanism),
+    }
+    table = PropertyTable(axes, values, meta)
+    if validate:
+        table.validate(validate)
+    return table
+
+
+def get_table(fuel='CH4', oxidizer='O2', mechanism='gri30.yaml', moles_O2_stoich=2, **kwargs):
+    """
+    Load the stored table for a propellant pair, building and saving it first
+    if it's missing, out of date, or was built from a different mechanism or
+    grid. Each moles_O2_stoich has its own table. Other arguments go to
+    build_table; OFR, Pc and T_initial are compared with the stored grid.
+    """
+    directory = os.path.join(TABLE_DIR, f'{fuel}_{oxidizer}_{moles_O2_stoich:g}_'
+                                        f'{os.path.splitext(os.path.basename(mechanism))[0]}')
+    try:
+        table = PropertyTable.load(directory)
+        if (table.meta['mechanism_hash'] == mechanism_hash(mechanism)
+                and table.meta['moles_O2_stoich'] == moles_O2_stoich
+                and all(np.array_equal(table.axes[name], np.asarray(kwargs[name], dtype=float))
+                        for name in AXES if name in kwargs)):
+            return table
+    except (OSError, ValueError, KeyError):
+        pass
+    table = build_table(fuel, oxidizer, moles_O2_stoich, mechanism=mechanism, **kwargs)
+    table.save(directory)
+    return PropertyTable.load(directory)
@@ -1,7 +1,7 @@
-import matplotlib.pyplot as plt
-from matplotlib.ticker import ScalarFormatter
-
 def ratio_plot(M_values, Pr_Ma, Ar_Ma, Tr_Ma, rhor_Ma):
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import ScalarFormatter
+
     fig, ax1 = plt.subplots()
 
     color1 = 'tab:red'
@@ -0,0 +1,260 @@
+from functools import lru_cache
+import numpy as np
+
+
+# Parsing the mechanism is slower than most reactor runs, so each process loads it once
+@lru_cache(maxsize=None)
+def load_gas(mechanism='gri30.yaml'):
+    import cantera as ct
+    return ct.Solution(mechanism)
+
+
+class ReactorResult:
+    """
+    Time history of a reactor run, one row per recorded step.
+
+    t, T, P and heat_release_rate (W/m^3) are 1D arrays, X and
+    production_rates are (steps, species) and rates_of_progress is
+    (steps, reactions), or (steps, 0) if reactions weren't recorded. Use
+    species('CO') and reaction(i) to pull out single columns by name,
+    equation or index.
+    """
+
+    def __init__(self, species_names, reaction_equations, t, T, P, X, production_rates, rates_of_progress,
+                 heat_release_rate, event=None, steps=None):
+        self.species_names = species_names
+        self.reaction_equations = reaction_equations
+        self.t = t
+        self.T = T
+        self.P = P
+        self.X = X
+        self.production_rates = production_rates
+        self.rates_of_progress = rates_of_progress
+        self.heat_release_rate = heat_release_rate
+        self.event = event  # Name of the event that ended the run, None if it ran to the end time
+        self.steps = steps  # Integrator calls made, recorded or not
+
+    def __len__(self):
+        return len(self.t)
+
+    def species(self, name):
+        # Mole fraction history of one species
+        return self.X[:, self.species_names.index(name)]
+
+    def reaction(self, reaction):
+        # Net rate of progress history of one reaction, by equation or index
+        if isinstance(reaction, str):
+            reaction = self.reaction_equations.index(reaction)
+        return self.rates_of_progress[:, reaction]
+
+
+class ReactorRecorder:
+    """
+    Records the state of a reactor into preallocated arrays.
+
+    Each record() reads whole vectors (X, net_production_rates,
+    net_rates_of_progress) once into the next row instead of looking things
+    up species by species, and the arrays double in size when full, so the
+    cost per step is a few array copies whatever the mechanism size.
+    """
+
+    def __init__(self, reactor, capacity=1024, reactions=True):
+        self.reactor = reactor
+        thermo = reactor.phase
+        self.species_names = thermo.species_names
+        # Building the Reaction objects is slow, so only do it once per run
+        self.reaction_equations = [reaction.equation for reaction in thermo.reactions()] if reactions else []
+        self.n = 0
+        self.t = np.empty(capacity)
+        self.T = np.empty(capacity)
+        self.P = np.empty(capacity)
+        self.heat_release_rate = np.empty(capacity)
+        self.X = np.empty((capacity, thermo.n_species))
+        self.production_rates = np.empty((capacity, thermo.n_species))
+        self.rates_of_progress = np.empty((capacity, len(self.reaction_equations)))
+
+    def record(self, t):
+        if self.n == len(self.t):
+            self.grow()
+        thermo = self.reactor.phase
+        i = self.n
+        self.t[i] = t
+        self.T[i] = thermo.T
+        self.P[i] = thermo.P
+        self.heat_release_rate[i] = thermo.heat_release_rate
+        self.X[i] = thermo.X
+        self.production_rates[i] = thermo.net_production_rates
+        if self.reaction_equations:
+            self.rates_of_progress[i] = thermo.net_rates_of_progress
+        self.n += 1
+
+    def grow(self):
+        for name in ('t', 'T', 'P', 'heat_release_rate', 'X', 'production_rates', 'rates_of_progress'):
+            old = getattr(self, name)
+            new = np.empty((2 * len(old),) + old.shape[1:])
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def result(self, event=None, steps=None):
+        n = self.n
+        return ReactorResult(self.species_names, self.reaction_equations, self.t[:n], self.T[:n], self.P[:n],
+                             self.X[:n], self.production_rates[:n], self.rates_of_progress[:n],
+                             self.heat_release_rate[:n], event, steps)
+
+
+# Output policies decide how the network is advanced and which states are kept. Policies that
+# step the integrator see every internal step, grid policies call advance() and let CVODE take
+# as many steps as it likes between output times. Like a bare net.step() loop, the stepping
+# policies can overshoot end_time on the last step.
+
+class EveryStep:
+    """Record every internal integrator step."""
+
+    def advance(self, net, end_time):
+        return net.step()
+
+    def keep(self, thermo, t):
+        return True
+
+
+class EveryNth(EveryStep):
+    """Record every n-th internal integrator step."""
+
+    def __init__(self, n=10):
+        self.n = n
+        self.count = 0
+
+    def keep(self, thermo, t):
+        self.count += 1
+        return self.count % self.n == 0
+
+
+class FixedDt:
+    """Record at fixed intervals of dt."""
+
+    def __init__(self, dt):
+        self.dt = dt
+        self.k = 0
+
+    def next_time(self):
+        self.k += 1
+        return self.k * self.dt
+
+    def advance(self, net, end_time):
+        return net.advance(min(self.next_time(), end_time))
+
+    def keep(self, thermo, t):
+        return True
+
+
+class LogSpaced(FixedDt):
+    """Record at log-spaced times from t_first, per_decade points per decade."""
+
+    def __init__(self, t_first=1e-6, per_decade=20):
+        self.t_first = t_first
+        self.per_decade = per_decade
+        self.k = -1
+
+    def next_time(self):
+        self.k += 1
+        return self.t_first * 10 ** (self.k / self.per_decade)
+
+
+class Adaptive(EveryStep):
+    """
+    Step the integrator but only record when the temperature has changed by
+    dT, or the mole fraction of `species` by dX, since the last record.
+    """
+
+    def __init__(self, dT=1.0, species=None, dX=None):
+        self.dT = dT
+        self.species = species
+        self.dX = dX
+        self.index = None
+        self.last = None
+
+    def keep(self, thermo, t):
+        T = thermo.T
+        if self.species and self.index is None:
+            self.index = thermo.species_index(self.species)
+        X = thermo.X[self.index] if self.species else 0.0
+        if (self.last is None or abs(T - self.last[0]) >= self.dT
+                or (self.dX is not None and abs(X - self.last[1]) >= self.dX)):
+            self.last = (T, X)
+            return True
+        return False
+
+
+# Events are checked after every integrator call and stop the run when they return True
+
+class Ignition:
+    """Temperature has risen by `rise` K above its initial value."""
+
+    name = 'ignition'
+
+    def __init__(self, rise=400.0):
+        self.rise = rise
+        self.T_initial = None
+
+    def __call__(self, thermo, t):
+        if self.T_initial is None:
+            self.T_initial = thermo.T
+        return thermo.T - self.T_initial > self.rise
+
+
+class SteadyState:
+    """
+    Temperature changing by less than T_rate K/s and every net production
+    rate below rate_atol kmol/m^3/s, for `hold` checks in a row. t_steady
+    is the time of the first check in that run of steady checks.
+    """
+
+    name = 'steady state'
+
+    def __init__(self, T_rate=1e-3, rate_atol=1e-9, hold=3):
+        self.T_rate = T_rate
+        self.rate_atol = rate_atol
+        self.hold = hold
+        self.previous = None
+        self.count = 0
+        self.t_steady = None
+
+    def __call__(self, thermo, t):
+        T = thermo.T
+        steady = False
+        if self.previous is not None and t > self.previous[1]:
+            dT_dt = abs(T - self.previous[0]) / (t - self.previous[1])
+            steady = dT_dt < self.T_rate and np.abs(thermo.net_production_rates).max() < self.rate_atol
+        self.previous = (T, t)
+        self.count = self.count + 1 if steady else 0
+        if self.count == 1:
+            self.t_steady = t
+        return self.count >= self.hold
+
+
+def run_reactor(reactor, net, end_time, output=None, events=(), capacity=1024, reactions=True):
+    """
+    Integrate `net` to end_time, recording `reactor` according to the output
+    policy (EveryStep by default) and stopping early as soon as one of the
+    `events` fires. The initial and final states are always recorded.
+    reactions=False skips the rates of progress, which are most of the data
+    for a large mechanism. Returns a ReactorResult whose `event` is the name
+    of the event that stopped the run, if any.
+    """
+    output = output or EveryStep()
+    recorder = ReactorRecorder(reactor, capacity, reactions)
+    thermo = reactor.phase
+    t = net.time
+    recorder.record(t)
+    for event in events:
+        event(thermo, t)
+    steps = 0
+    fired = None
+    while t < end_time and fired is None:
+        t = output.advance(net, end_time)
+        steps += 1
+        fired = next((event.name for event in events if event(thermo, t)), None)
+        if output.keep(thermo, t) or fired is not None or t >= end_time:
+            if recorder.t[recorder.n - 1] != t:
+                recorder.record(t)
+    return recorder.result(fired, steps)
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from .equilibrium_cache import EquilibriumCache, mechanism_hash
+
+# Keys, eviction and invalidation of the equilibrium cache, run with:
+#   python -m pytest Zephyr_v1
+
+KEY = dict(fuel='CH4', oxidizer='O2', moles_O2_stoich=2, T_initial=298.15, P_initial=2e6, mode='HP')
+
+
+@pytest.fixture
+def mechanism(tmp_path):
+    # Only the file's bytes go into the key, so any file stands in for a mechanism
+    path = tmp_path / 'mech.yaml'
+    path.write_text('species: []\n')
+    return str(path)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EquilibriumCache(str(tmp_path / 'equilibrium.sqlite'))
+
+
+def put(cache, mechanism, OFR, offset=0.0, **changes):
+    key = dict(KEY, **changes)
+    OFR = np.asarray(OFR, dtype=float)
+    cache.put(mechanism, key['fuel'], key['oxidizer'], key['moles_O2_stoich'], OFR, key['T_initial'],
+              key['P_initial'], key['mode'], *(OFR + offset + i for i in range(5)))
+
+
+def get(cache, mechanism, OFR, **changes):
+    key = dict(KEY, **changes)
+    return cache.get(mechanism, key['fuel'], key['oxidizer'], key['moles_O2_stoich'], OFR, key['T_initial'],
+                     key['P_initial'], key['mode'])
+
+
+def test_hit_returns_stored_values_in_order(cache, mechanism):
+    put(cache, mechanism, [1.0, 2.0, 3.0])
+    values, found = get(cache, mechanism, [3.0, 0.5, 1.0])
+    assert found.tolist() == [True, False, True]
+    assert values[:, 0].tolist() == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert np.isnan(values[:, 1]).all()
+    assert values[:, 2].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_floats_match_exactly(cache, mechanism):
+    put(cache, mechanism, [0.1 + 0.2])
+    assert get(cache, mechanism, [0.3])[1].tolist() == [False]
+    assert get(cache, mechanism, [0.1 + 0.2])[1].tolist() == [True]
+
+
+@pytest.mark.parametrize('changes', [dict(fuel='C3H8'), dict(oxidizer='O2:1, N2:3.76'), dict(moles_O2_stoich=5),
+                                     dict(T_initial=300.0), dict(P_initial=1e6), dict(mode='TP')])
+def test_every_key_field_counts(cache, mechanism, changes):
+    put(cache, mechanism, [1.0, 2.0])
+    assert not get(cache, mechanism, [1.0, 2.0], **changes)[1].any()
+    put(cache, mechanism, [1.0, 2.0], offset=10, **changes)
+    assert get(cache, mechanism, [1.0], **changes)[0][0, 0] == 11.0
+    assert get(cache, mechanism, [1.0])[0][0, 0] == 1.0
+
+
+def test_broadcast_key_arrays(cache, mechanism):
+    OFR, P = np.array([1.0, 2.0])[:, None], np.array([1e6, 2e6])
+    cache.put(mechanism, 'CH4', 'O2', 2, OFR, 298.15, P, 'HP', *(np.broadcast_to(OFR * P, (2, 2)),) * 5)
+    values, found = cache.get(mechanism, 'CH4', 'O2', 2, OFR, 298.15, P, 'HP')
+    assert found.all() and values[0].tolist() == [1e6, 2e6, 2e6, 4e6]
+
+
+def test_editing_the_mechanism_misses(cache, mechanism):
+    put(cache, mechanism, [1.0])
+    before = mechanism_hash(mechanism)
+    with open(mechanism, 'a') as f:
+        f.write('# edited\n')
+    assert mechanism_hash(mechanism) != before
+    # The hash is memoized per cache, a new one sees the edit
+    assert not get(EquilibriumCache(cache.path), mechanism, [1.0])[1].any()
+
+
+def test_least_recently_used_are_evicted(tmp_path, mechanism):
+    cache = EquilibriumCache(str(tmp_path / 'equilibrium.sqlite'), max_entries=3)
+    put(cache, mechanism, [1.0, 2.0, 3.0])
+    get(cache, mechanism, [1.0])  # Now the most recently used
+    put(cache, mechanism, [4.0])
+    assert len(cache) == 3
+    found = get(cache, mechanism, [1.0, 2.0, 3.0, 4.0])[1]
+    # 2 and 3 were last used together, either can go
+    assert found[0] and found[3] and found[1:3].sum() == 1
+
+
+def test_invalidate(cache, mechanism, tmp_path):
+    other = tmp_path / 'other.yaml'
+    other.write_text('species: [other]\n')
+    put(cache, mechanism, [1.0, 2.0])
+    put(cache, str(other), [1.0])
+    cache.invalidate(mechanism)
+    assert len(cache) == 1 and get(cache, str(other), [1.0])[1].all()
+    cache.invalidate()
+    assert len(cache) == 0
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from .ignition_delay import ignition_delay
+
+# Checks ignition_delay against the OH history taken at every solver step (to within about a
+# step, the two runs don't take exactly the same steps), run with:
+#   python -m pytest Zephyr_v1
+
+
+def step_history(T, P, phi, fuel, oxidizer, t_end):
+    # OH mole fraction after every solver step up to t_end
+    import cantera as ct
+    gas = ct.Solution('gri30.yaml')
+    gas.TP = T, P
+    gas.set_equivalence_ratio(phi, fuel=fuel, oxidizer=oxidizer)
+    reactor = ct.IdealGasReactor(gas, clone=True)
+    network = ct.ReactorNet([reactor])
+    index = gas.species_index('OH')
+    times, fractions = [], []
+    while network.time < t_end:
+        times.append(network.step())
+        fractions.append(reactor.phase.X[index])
+    return np.array(times), np.array(fractions)
+
+
+@pytest.mark.parametrize('T', [1000, 1200, 1400, 1500, 1600, 1700, 1800])
+def test_plateau_matches_step_history(T):
+    # C3H8 in pure O2 rises straight to equilibrium OH, tau is where it reaches the plateau
+    tau, X_peak = ignition_delay(T, 5 * 101325, 1.0, fuel='C3H8', oxidizer='O2')
+    times, fractions = step_history(T, 5 * 101325, 1.0, 'C3H8', 'O2', 20 * tau)
+    assert fractions[-1] >= fractions.max() / 1.01
+    assert tau == pytest.approx(times[np.argmax(fractions >= fractions.max() / 1.01)], rel=1e-3)
+
+
+@pytest.mark.parametrize('fuel', ['CH4', 'H2', 'C3H8'])
+@pytest.mark.parametrize('T', [1200, 1600])
+def test_peak_matches_step_argmax(fuel, T):
+    # Diluted in N2 the OH overshoots, tau is its peak
+    tau, X_peak = ignition_delay(T, 5 * 101325, 1.0, fuel=fuel, oxidizer='O2:1, N2:3.76')
+    times, fractions = step_history(T, 5 * 101325, 1.0, fuel, 'O2:1, N2:3.76', 20 * tau)
+    assert fractions[-1] < fractions.max() / 1.01
+    assert tau == pytest.approx(times[np.argmax(fractions)], rel=1e-3)
+    assert X_peak == pytest.approx(fractions.max(), rel=1e-3)
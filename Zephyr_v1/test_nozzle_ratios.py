@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from .nozzle_ratios import area_ratio_M, mach_from_area_ratio, round_trip_error
+
+# Round trips through area_ratio_M and mach_from_area_ratio, run with:
+#   python -m pytest Zephyr_v1
+
+
+@pytest.mark.parametrize('k', [1.05, 1.1, 1.2, 1.4, 1.67])
+def test_round_trip_near_throat(k):
+    # Within rounding of Ar all the way in to M = 1 -+ 1e-6, low k starts furthest from the root
+    distance = np.logspace(-6, -1, 400)
+    assert round_trip_error(1 - distance, k, 'subsonic').max() < 100
+    assert round_trip_error(1 + distance, k, 'supersonic').max() < 100
+
+
+@pytest.mark.parametrize('k', [1.05, 1.1, 1.2, 1.4, 1.67])
+def test_round_trip_full_range(k):
+    assert round_trip_error(np.logspace(-6, -0.05, 400), k, 'subsonic').max() < 100
+    assert round_trip_error(np.logspace(0.05, np.log10(30), 400), k, 'supersonic').max() < 100
+
+
+def test_throat_and_branch_array():
+    M = np.array([0.5, 2.0, 0.9, 3.0])
+    Ar = area_ratio_M(M, 1.2)
+    assert mach_from_area_ratio(Ar, 1.2, M > 1) == pytest.approx(M, rel=1e-12)
+    assert mach_from_area_ratio(1.0, 1.2, 'subsonic') == 1.0
+    assert np.isnan(mach_from_area_ratio(0.9, 1.2))
+    with pytest.raises(ValueError):
+        mach_from_area_ratio(2.0, 1.2, 'sonic')
@@ -0,0 +1,77 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from . import combustion_optimiser, property_table
+from .equilibrium_cache import EquilibriumCache
+from .property_table import PROPERTIES, get_table
+
+# When get_table reuses a stored table and when it rebuilds, run with:
+#   python -m pytest Zephyr_v1
+
+GRID = dict(OFR=np.linspace(2, 4, 3), Pc=np.array([1e6, 2e6]), validate=0)
+
+
+@pytest.fixture
+def builds(tmp_path, monkeypatch):
+    # Tables and equilibrium results go to a temporary directory, returns the list of build_table calls
+    monkeypatch.setattr(property_table, 'TABLE_DIR', str(tmp_path / 'tables'))
+    monkeypatch.setattr(combustion_optimiser, '_cache', EquilibriumCache(str(tmp_path / 'equilibrium.sqlite')))
+    calls = []
+    build_table = property_table.build_table
+
+    def counted(*args, **kwargs):
+        calls.append((args, kwargs))
+        return build_table(*args, **kwargs)
+    monkeypatch.setattr(property_table, 'build_table', counted)
+    return calls
+
+
+def test_stored_table_is_reused(builds):
+    first = get_table(**GRID)
+    second = get_table(**GRID)
+    assert len(builds) == 1
+    for prop in PROPERTIES:
+        assert np.array_equal(first.values[prop], second.values[prop])
+    # Axes that aren't given aren't compared
+    get_table(OFR=GRID['OFR'], validate=0)
+    assert len(builds) == 1
+
+
+def test_nodes_interpolate_exactly(builds):
+    table = get_table(**GRID)
+    T, R, k, rho = table(GRID['OFR'][:, None], GRID['Pc'])
+    assert np.array_equal(T, table.values['T'][:, :, 0])
+    assert rho / GRID['Pc'] == pytest.approx(table.values['rho'][:, :, 0], rel=1e-6)
+
+
+def test_stoichiometry_has_its_own_table(builds):
+    two = get_table(moles_O2_stoich=2, **GRID)
+    five = get_table(moles_O2_stoich=5, **GRID)
+    assert len(builds) == 2
+    assert five.meta['moles_O2_stoich'] == 5 and not np.array_equal(two.values['T'], five.values['T'])
+    get_table(moles_O2_stoich=2, **GRID)
+    assert len(builds) == 2
+
+
+@pytest.mark.parametrize('grid', [dict(OFR=np.linspace(2, 4, 4)), dict(Pc=np.array([1e6, 3e6])),
+                                  dict(T_initial=np.array([298.15, 400.0]))])
+def test_different_grid_rebuilds(builds, grid):
+    get_table(**GRID)
+    table = get_table(**dict(GRID, **grid))
+    assert len(builds) == 2
+    for name, axis in grid.items():
+        assert np.array_equal(table.axes[name], axis)
+
+
+def test_edited_mechanism_rebuilds(builds, tmp_path):
+    import cantera as ct
+    mechanism = tmp_path / 'gri30.yaml'
+    paths = (os.path.join(directory, 'gri30.yaml') for directory in ct.get_data_directories())
+    shutil.copy(next(path for path in paths if os.path.exists(path)), mechanism)
+    get_table(mechanism=str(mechanism), **GRID)
+    get_table(mechanism=str(mechanism), **GRID)
+    with open(mechanism, 'a') as f:
+        f.write('# edited\n')
+    get_table(mechanism=str(mechanism), **GRID)
+    assert len(builds) == 2
@@ -42,6 +42,18 @@ unsigned long lastTransmitTime = 0;
 const unsigned long transmitInterval = 100;  
 unsigned long dataPointCount = 0;
 
+// Binary telemetry (see telemetry_protocol.py), enabled with "BINARY_MODE,1"
+bool binaryMode = false;
+const uint16_t frameSync = 0x5AA5;  // Sent little-endian: A5 5A
+
+struct __attribute__((packed)) TelemetryFrame {
+  uint16_t sync;
+  uint32_t seq;
+  float values[20];  // V0-5, P0-5, dP0-1, SV0-1, SP0-1, OP0-1
+  uint32_t time;
+  uint16_t crc;      // CRC-16/CCITT-FALSE over seq, values and time
+};
+
 // Rocket Operation Constants
 const double fuelSetpointThrust = 2.31;
 const double oxidiserSetpointThrust = 45.21;
@@ -69,6 +81,7 @@ enum SystemState {
   };
 
 SystemState currentState = IDLE;
+SystemState previousState = COOLING;  // Differs from currentState so IDLE is reported at startup
 
 // Helper Functions ------------------------------------------
 void readPressures() {
@@ -101,11 +114,46 @@ void checkPressureLimits() {
   }
 }
 
+uint16_t crc16(const uint8_t *data, size_t length) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < length; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+void sendBinaryFrame(unsigned long currentTime) {
+  TelemetryFrame frame;
+  frame.sync = frameSync;
+  frame.seq = dataPointCount++;
+  for (int i = 0; i < 6; i++) {
+    frame.values[i] = ptOutputsV[i];
+    frame.values[i + 6] = ptOutputsP[i];
+  }
+  for (int i = 0; i < 2; i++) {
+    frame.values[12 + i] = ptdP[i];
+    frame.values[14 + i] = svOutputs[i];
+    frame.values[16 + i] = pvSetpoints[i];
+    frame.values[18 + i] = pvOutputs[i];
+  }
+  frame.time = currentTime - stateStartTime;
+  const uint8_t *bytes = (const uint8_t *)&frame;
+  frame.crc = crc16(bytes + sizeof(frame.sync), sizeof(frame) - sizeof(frame.sync) - sizeof(frame.crc));
+  Serial.write(bytes, sizeof(frame));
+}
+
 void sendData(bool forceSend = false) {
   static unsigned long lastTransmitTime = 0;
   unsigned long currentTime = millis();
 
-  if (forceSend || (currentTime - lastTransmitTime >= transmitInterval)) {
+  if (binaryMode && (forceSend || (currentTime - lastTransmitTime >= transmitInterval))) {
+    sendBinaryFrame(currentTime);
+    lastTransmitTime = currentTime;
+  }
+  else if (forceSend || (currentTime - lastTransmitTime >= transmitInterval)) {
     String data = String(dataPointCount++) + ",";
     for (int i = 0; i < 6; i++) {
       data += String(ptOutputsV[i], 2) + ",";
@@ -232,16 +280,30 @@ void handleSerialCommands(String input) {
     stateStartTime = millis();
   }
 
+  else if (input == "BINARY_MODE,1") {
+    binaryMode = true;
+    Serial.println("BINARY_MODE ON");
+  }
+
+  else if (input == "BINARY_MODE,0") {
+    binaryMode = false;
+    Serial.println("BINARY_MODE OFF");
+  }
+
 }
 
 // Execute State Logic -----------------------------------------------
 
 void executeStateLogic() {
+  // State lines are markers for the GUI, print them once on entry rather than every loop
+  bool stateEntered = currentState != previousState;
+  previousState = currentState;
+
   switch (currentState) {
 
     case IDLE:
       closeAllValvesSafetly();
-      Serial.println("IDLE");
+      if (stateEntered) Serial.println("IDLE");
       break;
 
     case TESTINGCONNECTION:
@@ -281,7 +343,7 @@ void executeStateLogic() {
       break;
 
     case PIDTUNETEST:
-      Serial.println("PID Test Initiated...");
+      if (stateEntered) Serial.println("PID Test Initiated...");
       openAllSolenoidValves();
       if (millis() - stateStartTime < pidDuration) {  
         checkActiveCommands();
@@ -305,7 +367,7 @@ void executeStateLogic() {
 
 
     case IGNITION:
-      Serial.println("Ignition...");
+      if (stateEntered) Serial.println("Ignition...");
       openAllSolenoidValves();
       // Run continuously until 1 second has passed
       if (millis() - stateStartTime < ignitionDuration) {  
@@ -329,7 +391,7 @@ void executeStateLogic() {
       break;
 
     case THRUSTING:
-      Serial.println("Thrusting...");
+      if (stateEntered) Serial.println("Thrusting...");
       if (millis() - stateStartTime < thrustDuration) {  
         checkActiveCommands();
         readPressures();
@@ -346,7 +408,7 @@ void executeStateLogic() {
       break;
 
     case COOLING:
-      Serial.println("Cooling...");
+      if (stateEntered) Serial.println("Cooling...");
       
       if (millis() - stateStartTime < 10000) {  
         checkActiveCommands();
@@ -0,0 +1,117 @@
+import argparse
+import math
+import os
+import pty
+import select
+import threading
+import time
+import tty
+from telemetry_protocol import encode_frame, BINARY_MODE_ON, BINARY_MODE_OFF
+
+# Stand-in for Arduino.ino on a pseudo-terminal, so the GUI and the serial decoding can be
+# exercised without hardware. Run it, then start the GUI with the printed port:
+#   python firmware_sim.py --rate 200
+#   python user_interface.py /dev/pts/5
+
+# state: (duration in ms, next state, line printed on entering the state), as in executeStateLogic()
+STATES = {
+    "TESTINGCONNECTION": (500, "IDLE", None),
+    "PIDTUNETEST": (1000, "IDLE", "PID Test Initiated..."),
+    "IGNITION": (5000, "THRUSTING", "Ignition..."),
+    "THRUSTING": (10000, "COOLING", "Thrusting..."),
+    "COOLING": (10000, "IDLE", "Cooling..."),
+}
+COMMANDS = {"TEST_CONNECTION": "TESTINGCONNECTION", "PID_TUNE_TEST": "PIDTUNETEST", "IGNITION": "IGNITION"}
+
+
+class FirmwareSim(threading.Thread):
+    def __init__(self, rate=10.0, binary=False, time_scale=1.0):
+        super().__init__(daemon=True)
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)  # No echo or newline translation, like a real serial port
+        self.port = os.ttyname(self.slave)
+        self.interval = 1.0 / rate
+        self.binary = binary
+        self.time_scale = time_scale  # < 1 runs the test sequences faster than real time
+        self.state = "IDLE"
+        self.state_start = time.monotonic()
+        self.count = 0
+        self.running = True
+
+    def send_line(self, text):
+        os.write(self.master, (text + "\r\n").encode())
+
+    def send_sample(self, elapsed_ms):
+        t = elapsed_ms / 1000
+        p = [100 + 20 * math.sin(t + i) for i in range(6)]
+        v = [0.5 + x / 2068 * 4 for x in p]
+        row = [self.count] + v + p + [p[0] - p[1], p[2] - p[3], 1, 1, 10, 300, 128, 128, int(elapsed_ms)]
+        self.count += 1
+        if self.binary:
+            os.write(self.master, encode_frame(row))
+        else:
+            self.send_line(",".join(f"{x:.2f}" if isinstance(x, float) else str(x) for x in row))
+
+    def handle_command(self, command):
+        if command in (BINARY_MODE_ON, BINARY_MODE_OFF):
+            self.binary = command == BINARY_MODE_ON
+            self.send_line("BINARY_MODE ON" if self.binary else "BINARY_MODE OFF")
+        elif command in ("IDLE", "EMERGENCY_SHUTDOWN"):
+            self.set_state("IDLE")
+        elif command in COMMANDS:
+            self.set_state(COMMANDS[command])
+
+    def set_state(self, state):
+        self.state = state
+        self.state_start = time.monotonic()
+        marker = "IDLE" if state == "IDLE" else STATES[state][2]
+        if marker:
+            self.send_line(marker)
+
+    def run(self):
+        pending = b""
+        next_send = time.monotonic()
+        while self.running:
+            ready, _, _ = select.select([self.master], [], [], max(0.0, next_send - time.monotonic()))
+            if ready:
+                pending += os.read(self.master, 4096)
+                *commands, pending = pending.split(b"\n")
+                for command in commands:
+                    self.handle_command(command.decode(errors="replace").strip())
+            if time.monotonic() < next_send:
+                continue
+            next_send += self.interval
+
+            if self.state == "IDLE":
+                continue
+            duration, next_state, _ = STATES[self.state]
+            elapsed_ms = (time.monotonic() - self.state_start) * 1000 / self.time_scale
+            if elapsed_ms >= duration:
+                if self.state == "TESTINGCONNECTION":
+                    self.send_line("TESTINGCONNECTION complete. Returning to IDLE.")
+                elif self.state == "PIDTUNETEST":
+                    self.send_line("PID_DONE")
+                elif self.state == "COOLING":
+                    self.send_line("Test Complete...")
+                self.set_state(next_state)
+                continue
+            self.send_sample(elapsed_ms)
+
+    def stop(self):
+        self.running = False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated pressure controller on a pty")
+    parser.add_argument("--rate", type=float, default=10.0, help="samples per second")
+    parser.add_argument("--binary", action="store_true", help="start in binary frame mode")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="speed up test sequences (< 1)")
+    args = parser.parse_args()
+    sim = FirmwareSim(args.rate, args.binary, args.time_scale)
+    sim.start()
+    print(f"Simulated controller on {sim.port}")
+    try:
+        while sim.is_alive():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        sim.stop()
@@ -0,0 +1,209 @@
+import bisect
+import math
+import numpy as np
+from telemetry_buffer import FIELDS
+
+COUNT = FIELDS.index("dataPointCount")
+TIME = FIELDS.index("time")  # Firmware ms since its current state started
+
+# Upper edges of the latency histogram bins (s), log-spaced from 1 us to 10 s, 10 to a decade
+LATENCY_EDGES = [1e-6 * 10 ** (i / 10) for i in range(71)]
+
+
+class LatencyHistogram:
+    """
+    Durations (s) counted in the LATENCY_EDGES bins, plus their count,
+    total and maximum.
+
+    `add` is a bisect and a few additions, cheap enough to call on every
+    pass through a hot path. Percentiles are interpolated within the bin
+    they fall in, so they're within a bin width (about 25%) of the real
+    value.
+    """
+    def __init__(self):
+        # Below the lowest edge, one per bin, then above the highest edge
+        self.counts = [0] * (len(LATENCY_EDGES) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_right(LATENCY_EDGES, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        if not self.count:
+            return math.nan
+        target = q / 100 * self.count
+        running = 0
+        for i, n in enumerate(self.counts):
+            if n and running + n >= target:
+                break
+            running += n
+        # Linear within the bin the target falls in
+        lower = LATENCY_EDGES[i - 1] if i > 0 else 0.0
+        upper = LATENCY_EDGES[i] if i < len(LATENCY_EDGES) else self.max
+        return min(lower + (upper - lower) * (target - running) / n, self.max)
+
+    def to_dict(self):
+        # Summary plus the non-empty bins as [upper edge, count]
+        edges = LATENCY_EDGES + [self.max]
+        return {
+            "count": self.count, "total": self.total, "max": self.max,
+            "mean": self.total / self.count if self.count else math.nan,
+            "p50": self.percentile(50), "p90": self.percentile(90), "p99": self.percentile(99),
+            "bins": [[edges[i], n] for i, n in enumerate(list(self.counts)) if n],
+        }
+
+
+class RuntimeStats:
+    """
+    Counters, peaks and latency histograms for the hot paths of one thread.
+
+    Only the owning thread writes to it. Other threads can read it at any
+    time through `to_dict`, which copies everything first, the values may
+    just be a pass or two behind.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.peaks = {}
+        self.latencies = {}
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def peak(self, name, value):
+        if value > self.peaks.get(name, -math.inf):
+            self.peaks[name] = value
+
+    def time(self, name, seconds):
+        histogram = self.latencies.get(name)
+        if histogram is None:
+            histogram = self.latencies[name] = LatencyHistogram()
+        histogram.add(seconds)
+
+    def to_dict(self):
+        return {
+            "counters": self.counters.copy(),
+            "peaks": self.peaks.copy(),
+            "latencies": {name: histogram.to_dict() for name, histogram in self.latencies.copy().items()},
+        }
+
+
+class TelemetryHealth:
+    """
+    Checks each block of samples as it reaches the GUI.
+
+    Gaps are jumps in dataPointCount, samples lost on the link or dropped by
+    the decoder. A count that goes backwards is a controller restart and
+    starts the checks again. Skew compares the firmware's `time` field with
+    the host clock when a block arrives: `skew` is how much the offset
+    between them has changed since the first sample (clock drift plus lag)
+    and `lag` how far it is above the smallest offset seen, i.e. how much
+    later than the best case the samples are being shown. The firmware's
+    time restarts with every state, the offsets are taken again when it
+    goes back.
+    """
+
+    def __init__(self):
+        self.samples = 0
+        self.gaps = 0     # Places where dataPointCount jumped
+        self.missing = 0  # Samples missing across those jumps
+        self.repeats = 0  # Samples whose count didn't go up
+        self.resets = 0
+        self.last_count = None
+        self.last_time = None
+        self.first_offset = None  # Host time - firmware time (s) at the first sample
+        self.min_offset = math.inf
+        self.skew = math.nan
+        self.lag = math.nan
+        self.max_lag = 0.0
+
+    def check(self, block, host_time):
+        # block is an (n, len(FIELDS)) array, host_time in s from time.monotonic()
+        counts = block[:, COUNT]
+        previous = counts[0] - 1 if self.last_count is None else self.last_count
+        steps = np.diff(counts, prepend=previous)
+        if (steps < 0).any():
+            # Only check what came after the last restart
+            restart = np.flatnonzero(steps < 0)[-1]
+            self.resets += 1
+            steps = steps[restart + 1:]
+        jumps = steps[steps > 1]
+        self.gaps += len(jumps)
+        self.missing += int((jumps - 1).sum())
+        self.repeats += int((steps == 0).sum())
+        self.samples += len(block)
+        self.last_count = counts[-1]
+
+        times = block[:, TIME]
+        if self.last_time is None or times[0] < self.last_time or (np.diff(times) < 0).any():
+            self.first_offset = None
+            self.min_offset = math.inf
+        self.last_time = times[-1]
+        # The newest sample of the block has waited the least, use it for the offset
+        offset = host_time - times[-1] / 1000
+        if self.first_offset is None:
+            self.first_offset = offset
+        self.min_offset = min(self.min_offset, offset)
+        self.skew = offset - self.first_offset
+        self.lag = offset - self.min_offset
+        self.max_lag = max(self.max_lag, self.lag)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in
+                ("samples", "gaps", "missing", "repeats", "resets", "skew", "lag", "max_lag")}
+
+
+def _rate(snapshot, previous, elapsed, get):
+    # Per second change of a figure between two snapshots, NaN without a previous one
+    if previous is None or not elapsed:
+        return math.nan
+    try:
+        return (get(snapshot) - get(previous)) / elapsed
+    except (KeyError, TypeError):
+        return math.nan
+
+
+def health_report(snapshot, previous=None, elapsed=None):
+    """
+    The Health tab's text for a snapshot from PressureControlGUI's
+    health_snapshot, with per second rates when given the previous
+    snapshot and the seconds between them.
+    """
+    gui, serial, decoder, telemetry = (snapshot[key] for key in ("gui", "serial", "decoder", "telemetry"))
+    serial = serial or {"counters": {}, "peaks": {}, "latencies": {}}
+    decoder = decoder or {"crc_errors": 0, "parse_errors": 0}
+
+    def rate(get):
+        return _rate(snapshot, previous, elapsed, get)
+
+    def ms(seconds):
+        return f"{seconds * 1000:7.2f} ms"
+
+    lines = [
+        f"Samples     {rate(lambda s: s['gui']['counters'].get('samples', 0)):8.0f}/s   "
+        f"{telemetry['samples']} received, {telemetry['gaps']} gaps ({telemetry['missing']} missing), "
+        f"{telemetry['repeats']} repeated, {telemetry['resets']} restarts",
+        f"Link        {rate(lambda s: s['serial']['counters'].get('bytes', 0)) / 1000:8.1f} kB/s   "
+        f"backlog peak {serial['peaks'].get('backlog_bytes', 0)} B, "
+        f"{serial['counters'].get('messages', 0)} messages",
+        f"Errors      {decoder['parse_errors']} parse "
+        f"({rate(lambda s: s['decoder']['parse_errors']):.1f}/s), {decoder['crc_errors']} CRC "
+        f"({rate(lambda s: s['decoder']['crc_errors']):.1f}/s)",
+        f"Skew        {ms(telemetry['skew'])}   lag {ms(telemetry['lag'])}   max lag {ms(telemetry['max_lag'])}",
+        f"Frames      {rate(lambda s: s['gui']['counters'].get('frames', 0)):8.1f}/s",
+        f"{'':<12}{'count':>8} {'p50':>10} {'p99':>10} {'max':>10}",
+    ]
+    for name, latencies in (("decode", serial["latencies"]), ("batch_wait", serial["latencies"]),
+                            ("handle_data", gui["latencies"]), ("plot_frame", gui["latencies"]),
+                            ("save_data", gui["latencies"])):
+        histogram = latencies.get(name)
+        if histogram:
+            lines.append(f"{name:<12}{histogram['count']:>8} {ms(histogram['p50'])} {ms(histogram['p99'])} "
+                         f"{ms(histogram['max'])}")
+    return "\n".join(lines)
@@ -0,0 +1,31 @@
+import numpy as np
+
+
+def minmax_decimate(x, y, n_bins):
+    """
+    Reduce (x, y) to at most ~2 * n_bins points for drawing.
+
+    The samples are split into n_bins equal bins counted back from the newest
+    sample, and each bin is replaced by its minimum and maximum (in the order
+    they occurred), so spikes survive decimation. Any leftover samples at the
+    old end that don't fill a bin are kept as they are.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    if n_bins <= 0 or n <= 2 * n_bins:
+        return x, y
+
+    size = n // n_bins
+    head = n - n_bins * size
+    bins = y[head:].reshape(n_bins, size)
+    i_min = bins.argmin(axis=1)
+    i_max = bins.argmax(axis=1)
+
+    # Index of both extremes within the full arrays, earliest first
+    base = head + np.arange(n_bins) * size
+    idx = np.empty((n_bins, 2), dtype=np.intp)
+    idx[:, 0] = base + np.minimum(i_min, i_max)
+    idx[:, 1] = base + np.maximum(i_min, i_max)
+    idx = np.concatenate([np.arange(head), idx.ravel()])
+    return x[idx], y[idx]
@@ -0,0 +1,167 @@
+import csv
+import json
+import os
+import queue
+import threading
+import time
+import numpy as np
+from datetime import datetime
+from telemetry_buffer import TELEMETRY_DTYPE, FIELDS
+
+# Column order of the CSV files written by earlier versions of the GUI, dataPointCount goes last
+CSV_COLUMNS = ["time"] + FIELDS[1:-1] + ["dataPointCount"]
+CSV_HEADER = ["Time"] + FIELDS[1:-1] + ["dataPointCount"]
+
+
+def unique_path(directory, prefix, suffix=""):
+    # DATA_10-18_14-05-33.csv, then DATA_10-18_14-05-33_2.csv, ... if that already exists. The path is
+    # reserved straight away, as an empty file with a suffix or a directory without, so two calls in
+    # the same second can't both get it even though the file is only written later
+    os.makedirs(directory, exist_ok=True)
+    timestamp = datetime.now().strftime("%m-%d_%H-%M-%S")
+    n = 1
+    while True:
+        path = os.path.join(directory, f"{prefix}_{timestamp}{'' if n == 1 else f'_{n}'}{suffix}")
+        try:
+            if suffix:
+                open(path, "x").close()
+            else:
+                os.mkdir(path)
+            return path
+        except FileExistsError:
+            n += 1
+
+
+class RunRecorder(threading.Thread):
+    """
+    Streams telemetry for one run to disk on a background thread.
+
+    Samples go to RUN_<timestamp>/samples.bin as raw little-endian
+    TELEMETRY_DTYPE rows, so the file can be opened with `load_run` (a
+    read-only np.memmap) while the run is still going or after a crash.
+    Writes are buffered and fsync'd every FSYNC_INTERVAL seconds. Run metadata
+    (K values, calibration, firmware phase changes) lives in meta.json, which
+    is replaced atomically whenever it changes.
+    """
+    FSYNC_INTERVAL = 1.0  # s
+
+    def __init__(self, directory=None, metadata=None):
+        super().__init__(daemon=True)
+        self.run_dir = unique_path(directory or os.getcwd(), "RUN")
+        self.samples_path = os.path.join(self.run_dir, "samples.bin")
+        self.meta_path = os.path.join(self.run_dir, "meta.json")
+        self.queue = queue.Queue()
+        self.rows = 0
+        self.meta = {
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "fields": FIELDS,
+            "dtype": TELEMETRY_DTYPE.descr,
+            "events": [],
+        }
+        self.meta.update(metadata or {})
+        self.csv_path = None
+        self.start()
+
+    def write(self, block):
+        # block: (n, len(FIELDS)) float array or TELEMETRY_DTYPE array, called from the GUI thread
+        self.queue.put(("data", np.array(block, copy=True)))
+
+    def set_metadata(self, key, value):
+        self.queue.put(("meta", (key, value)))
+
+    def add_event(self, name):
+        self.queue.put(("event", (name, time.time())))
+
+    def close(self, csv_path=None):
+        # Finish the run in the background; optionally export a CSV copy once everything is on disk
+        self.queue.put(("close", csv_path))
+
+    def run(self):
+        last_sync = time.monotonic()
+        with open(self.samples_path, "ab", buffering=1 << 16) as f:
+            self.write_meta()
+            closing = False
+            while not closing:
+                try:
+                    items = [self.queue.get(timeout=self.FSYNC_INTERVAL)]
+                except queue.Empty:
+                    items = []
+                # Take whatever else is queued so bursts are written as one chunk
+                while True:
+                    try:
+                        items.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                blocks, meta_changed = [], False
+                for kind, payload in items:
+                    if kind == "data":
+                        blocks.append(payload)
+                    elif kind == "meta":
+                        self.meta[payload[0]] = payload[1]
+                        meta_changed = True
+                    elif kind == "event":
+                        # Sample index lets the event be lined up with the data afterwards
+                        self.meta["events"].append({"event": payload[0], "time": payload[1],
+                                                    "sample": self.rows + sum(len(b) for b in blocks)})
+                        meta_changed = True
+                    elif kind == "close":
+                        self.csv_path = payload
+                        closing = True
+
+                for block in blocks:
+                    if block.dtype != TELEMETRY_DTYPE:
+                        block = np.ascontiguousarray(block, dtype="<f8").view(TELEMETRY_DTYPE).reshape(-1)
+                    f.write(block.tobytes())
+                    self.rows += len(block)
+                if meta_changed:
+                    self.write_meta()
+                if closing or time.monotonic() - last_sync >= self.FSYNC_INTERVAL:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    last_sync = time.monotonic()
+
+        if self.rows == 0 and not self.meta["events"]:
+            # Nothing was recorded, don't leave an empty run folder behind
+            os.remove(self.samples_path)
+            os.remove(self.meta_path)
+            os.rmdir(self.run_dir)
+            if self.csv_path and os.path.getsize(self.csv_path) == 0:
+                os.remove(self.csv_path)  # Reserved by unique_path, nothing to export
+            return
+        self.meta["finished"] = datetime.now().isoformat(timespec="seconds")
+        self.meta["rows"] = self.rows
+        self.write_meta()
+        if self.csv_path:
+            export_csv(self.run_dir, self.csv_path)
+
+    def write_meta(self):
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.meta_path)
+
+
+def load_run(run_dir):
+    # Returns (samples, metadata); samples is a read-only memmap of the recorded rows
+    with open(os.path.join(run_dir, "meta.json")) as f:
+        meta = json.load(f)
+    path = os.path.join(run_dir, "samples.bin")
+    # A crash can leave a partly written last row, ignore it
+    rows = os.path.getsize(path) // TELEMETRY_DTYPE.itemsize
+    if rows == 0:
+        return np.zeros(0, dtype=TELEMETRY_DTYPE), meta
+    return np.memmap(path, dtype=TELEMETRY_DTYPE, mode="r", shape=(rows,)), meta
+
+
+def export_csv(run_dir, csv_path):
+    # Python's float repr round-trips exactly, so the CSV holds the same values as samples.bin
+    samples, _ = load_run(run_dir)
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        for start in range(0, len(samples), 10000):
+            chunk = samples[start:start + 10000]
+            writer.writerows(zip(*(chunk[name].tolist() for name in CSV_COLUMNS)))
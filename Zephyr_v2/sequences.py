@@ -0,0 +1,88 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+# Phase markers printed by executeStateLogic() in Arduino.ino, matched on the start of a
+# message, and the text reported when each phase begins
+TEST_CONNECTION_PHASES = [("TESTINGCONNECTION", "Connection test complete.")]
+PID_TUNE_PHASES = [("PID TEST", "PID tuning test commenced."), ("PID_DONE", "PID tuning test completed.")]
+IGNITION_PHASES = [
+    ("IGNITION", "IGNITION state commenced."), ("THRUSTING", "THRUSTING state commenced."),
+    ("COOLING", "COOLING state commenced."), ("TEST COMPLETE", "Burn complete.")
+]
+
+
+class TestSequence(QObject):
+    """
+    Tracks one firmware test (connection test, PID tune, ignition) from the
+    frames delivered by SerialThread, without polling the port.
+
+    The sequence starts out WAITING: "IDLE" lines still in flight from before
+    the command was sent are ignored. The first sample or phase marker moves
+    it to RUNNING, and the next "IDLE" after that finishes it. If the firmware
+    never answers, the sequence gives up after `start_timeout` ms.
+    """
+    WAITING, RUNNING, DONE = "WAITING", "RUNNING", "DONE"
+
+    log = pyqtSignal(str)
+    phase_changed = pyqtSignal(str)
+    finished = pyqtSignal(bool)  # True if the firmware went back to IDLE, False on timeout/abort
+
+    def __init__(self, name, phases, start_timeout=5000, parent=None):
+        super().__init__(parent)
+        self.name = name
+        self.phases = phases
+        self.state = self.WAITING
+        self.phase = None
+        self.transitions = []  # (phase, samples received so far) for the run record
+        self.samples = 0
+        self.start_timer = QTimer(self)
+        self.start_timer.setSingleShot(True)
+        self.start_timer.timeout.connect(self.on_start_timeout)
+        self.start_timer.start(start_timeout)
+
+    def on_data(self, block):
+        if self.state == self.DONE:
+            return
+        self.samples += len(block)
+        if self.state == self.WAITING:
+            self.set_running()
+
+    def on_message(self, msg):
+        # Returns True if the message was a marker for this sequence
+        if self.state == self.DONE:
+            return False
+        upper = msg.strip().upper()
+        if upper == "IDLE":
+            if self.state == self.RUNNING:
+                self.finish(True)
+            return True
+        for phase, text in self.phases:
+            if upper.startswith(phase):
+                if self.state == self.WAITING:
+                    self.set_running()
+                if phase != self.phase:
+                    # Firmware repeats its phase line every loop, only report the change
+                    self.phase = phase
+                    self.transitions.append((phase, self.samples))
+                    self.phase_changed.emit(phase)
+                    self.log.emit(text)
+                return True
+        return False
+
+    def set_running(self):
+        self.state = self.RUNNING
+        self.start_timer.stop()
+        self.log.emit(f"{self.name} running...")
+
+    def on_start_timeout(self):
+        if self.state == self.WAITING:
+            self.log.emit(f"{self.name}: no response from controller.")
+            self.finish(False)
+
+    def abort(self):
+        if self.state != self.DONE:
+            self.finish(False)
+
+    def finish(self, completed):
+        self.state = self.DONE
+        self.start_timer.stop()
+        self.finished.emit(completed)
@@ -0,0 +1,142 @@
+import os
+import numpy as np
+from datetime import datetime
+
+# Field order of the 22-field line sent by sendData() in Arduino.ino
+FIELDS = [
+    "dataPointCount", "V0", "V1", "V2", "V3", "V4", "V5",
+    "P0", "P1", "P2", "P3", "P4", "P5",
+    "dP0", "dP1", "SV0", "SV1", "SP0", "SP1", "OP0", "OP1", "time"
+]
+
+# One row per sample, one column per field
+TELEMETRY_DTYPE = np.dtype([(name, "<f8") for name in FIELDS])
+
+
+class TelemetryBuffer:
+    """
+    Fixed-capacity ring buffer of telemetry samples backed by a structured
+    NumPy array.
+
+    Every row is written twice, at `i` and `i + capacity`, so the last N
+    samples (N <= capacity) are always one contiguous slice and can be handed
+    to the plots as a view without copying. Once the buffer is full, the
+    oldest rows are spilled to disk in chunks before they are overwritten,
+    so the whole session can still be recovered with `to_array()`.
+    """
+
+    def __init__(self, capacity=65536, spill_dir=None, spill_chunk=None):
+        self.capacity = int(capacity)
+        self.spill_dir = spill_dir if spill_dir is not None else os.getcwd()
+        self.spill_chunk = int(spill_chunk or max(1, self.capacity // 8))
+        self.spill_path = None
+        self._buf = np.zeros(2 * self.capacity, dtype=TELEMETRY_DTYPE)
+        self._count = 0    # Total samples appended this session
+        self._spilled = 0  # Samples already written to the spill file
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def total(self):
+        return self._count
+
+    def __getitem__(self, name):
+        # Column view of every retained sample, e.g. buffer["P1"]
+        return self.last()[name]
+
+    def last(self, n=None):
+        # Zero-copy view of the newest n samples (all retained samples by default)
+        size = len(self)
+        n = size if n is None else max(0, min(int(n), size))
+        end = self._count % self.capacity + self.capacity if self._count >= self.capacity else self._count
+        return self._buf[end - n:end]
+
+    def append(self, row):
+        # Append one sample given as a sequence of len(FIELDS) numbers
+        self._make_room(1)
+        i = self._count % self.capacity
+        self._buf[i] = tuple(row)
+        self._buf[i + self.capacity] = self._buf[i]
+        self._count += 1
+
+    def extend(self, rows):
+        # Append a block of samples, either a TELEMETRY_DTYPE array or a 2D float array
+        rows = np.asarray(rows)
+        if rows.dtype != TELEMETRY_DTYPE:
+            rows = np.ascontiguousarray(rows, dtype=np.float64).reshape(-1, len(FIELDS))
+            rows = rows.view(TELEMETRY_DTYPE).reshape(-1)
+        # Anything that would be overwritten within this block is kept only on disk
+        if len(rows) > self.capacity:
+            self._spill_all()
+            self._write_spill(rows[:-self.capacity])
+            self._count += len(rows) - self.capacity
+            self._spilled = self._count
+            rows = rows[-self.capacity:]
+        start = 0
+        while start < len(rows):
+            i = self._count % self.capacity
+            n = min(len(rows) - start, self.capacity - i)
+            self._make_room(n)
+            block = rows[start:start + n]
+            self._buf[i:i + n] = block
+            self._buf[i + self.capacity:i + self.capacity + n] = block
+            self._count += n
+            start += n
+
+    def clear(self):
+        # The next spill starts a new file, the old one is left as it was
+        self._count = 0
+        self._spilled = 0
+        self.spill_path = None
+
+    def to_array(self, include_spilled=True):
+        # Copy of the session so far, spilled rows first
+        retained = np.array(self.last())
+        if not include_spilled or self.spill_path is None:
+            return retained
+        spilled = np.fromfile(self.spill_path, dtype=TELEMETRY_DTYPE)
+        # Rows that were spilled ahead of time are still in the ring, drop the overlap
+        overlap = self._spilled - (self._count - len(retained))
+        return np.concatenate([spilled, retained[overlap:]])
+
+    def _make_room(self, n):
+        # Spill the oldest chunk(s) to disk before they get overwritten
+        while self._count + n - self.capacity > self._spilled:
+            oldest = self._count - len(self)
+            start = self._spilled - oldest
+            stop = min(start + self.spill_chunk, len(self))
+            end = self._count % self.capacity + self.capacity if self._count >= self.capacity else self._count
+            ring = self._buf[end - len(self):end]
+            self._write_spill(ring[start:stop])
+            self._spilled += stop - start
+
+    def _spill_all(self):
+        oldest = self._count - len(self)
+        if self._spilled < self._count:
+            self._write_spill(self.last()[self._spilled - oldest:])
+            self._spilled = self._count
+
+    def _write_spill(self, rows):
+        if self.spill_path is None:
+            self.spill_path = reserve_spill_path(self.spill_dir)
+        with open(self.spill_path, "ab") as f:
+            rows.tofile(f)
+
+
+def reserve_spill_path(directory):
+    # Creates an empty SPILL_<timestamp>.bin, or SPILL_<timestamp>_2.bin, ... so no two buffers share a file
+    timestamp = datetime.now().strftime("%m-%d_%H-%M-%S")
+    n = 1
+    while True:
+        path = os.path.join(directory, f"SPILL_{timestamp}{'' if n == 1 else f'_{n}'}.bin")
+        try:
+            open(path, "xb").close()
+            return path
+        except FileExistsError:
+            n += 1
+
+
+def load_spill(path):
+    # Read a spill file back into a structured array
+    return np.fromfile(path, dtype=TELEMETRY_DTYPE)
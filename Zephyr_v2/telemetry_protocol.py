@@ -0,0 +1,150 @@
+import binascii
+import struct
+import numpy as np
+from telemetry_buffer import FIELDS
+
+# Binary telemetry frame sent by sendBinaryFrame() in Arduino.ino once "BINARY_MODE,1" is received.
+# All fields little-endian, no padding:
+#   sync    uint16  0x5AA5 (bytes A5 5A, never valid in the ASCII text lines)
+#   seq     uint32  dataPointCount
+#   values  float32 x 20, V0..V5, P0..P5, dP0, dP1, SV0, SV1, SP0, SP1, OP0, OP1
+#   time    uint32  ms since the state started
+#   crc     uint16  CRC-16/CCITT-FALSE over seq, values and time
+SYNC = b"\xa5\x5a"
+FRAME_STRUCT = struct.Struct("<HI20fIH")
+FRAME_SIZE = FRAME_STRUCT.size
+FRAME_DTYPE = np.dtype([
+    ("sync", "<u2"), ("seq", "<u4"), ("values", "<f4", (20,)), ("time", "<u4"), ("crc", "<u2")
+])
+
+BINARY_MODE_ON = "BINARY_MODE,1"
+BINARY_MODE_OFF = "BINARY_MODE,0"
+
+
+def crc16(data):
+    # CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), same as crc16() in Arduino.ino
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode_frame(row):
+    # row: sequence of len(FIELDS) numbers in FIELDS order
+    body = FRAME_STRUCT.pack(0x5AA5, int(row[0]), *row[1:-1], int(row[-1]), 0)[2:-2]
+    return SYNC + body + struct.pack("<H", crc16(body))
+
+
+def frames_to_block(frames):
+    # Decode a run of back-to-back frames into an (n, len(FIELDS)) float array
+    frames = np.frombuffer(frames, dtype=FRAME_DTYPE)
+    block = np.empty((len(frames), len(FIELDS)), dtype=np.float64)
+    block[:, 0] = frames["seq"]
+    block[:, 1:-1] = frames["values"]
+    block[:, -1] = frames["time"]
+    return block
+
+
+def lines_to_block(lines):
+    # Parse comma-separated data lines (bytes) into an (n, len(FIELDS)) float array
+    return np.array(b",".join(lines).split(b","), dtype=np.float64).reshape(-1, len(FIELDS))
+
+
+class StreamDecoder:
+    """
+    Incremental decoder for the controller's serial stream.
+
+    Text lines and binary frames can be interleaved (phase markers stay text
+    in binary mode), so every chunk is scanned for the sync word: bytes before
+    it are split into text lines, bytes after it are taken as a frame once a
+    whole one has arrived. A frame with a bad CRC is dropped and counted in
+    `crc_errors`, a data line that doesn't parse is passed on as a message and
+    counted in `parse_errors`. `feed` returns ("data", block) and
+    ("message", str) items in stream order.
+    """
+
+    def __init__(self):
+        self.pending = bytearray()
+        self.crc_errors = 0
+        self.parse_errors = 0
+
+    def feed(self, chunk):
+        self.pending += chunk
+        items = []
+        lines = []
+        frames = []
+
+        def flush_lines():
+            if lines:
+                items.extend(self.parse_lines(lines))
+                lines.clear()
+
+        def flush_frames():
+            if frames:
+                items.append(("data", frames_to_block(b"".join(frames))))
+                frames.clear()
+
+        buf = self.pending
+        pos = 0
+        while pos < len(buf):
+            sync = buf.find(SYNC, pos)
+            text_end = len(buf) if sync < 0 else sync
+            newline = buf.rfind(b"\n", pos, text_end)
+            if newline >= 0:
+                flush_frames()
+                lines.extend(buf[pos:newline].split(b"\n"))
+                pos = newline + 1
+            if sync < 0:
+                # Keep a partial line, or a lone A5 that may be the start of a sync word
+                break
+            if pos < sync:
+                # Text without a newline right before a frame, still a line of its own
+                flush_frames()
+                lines.append(buf[pos:sync])
+                pos = sync
+            if len(buf) - sync < FRAME_SIZE:
+                break
+            frame = bytes(buf[sync:sync + FRAME_SIZE])
+            if crc16(frame[2:-2]) == struct.unpack_from("<H", frame, FRAME_SIZE - 2)[0]:
+                flush_lines()
+                frames.append(frame)
+                pos = sync + FRAME_SIZE
+            else:
+                # Usually a real frame with a flipped bit: skip the whole frame unless another
+                # sync word starts inside it, in which case the bad one was a false match
+                self.crc_errors += 1
+                resync = buf.find(SYNC, sync + len(SYNC), sync + FRAME_SIZE)
+                pos = resync if resync >= 0 else sync + FRAME_SIZE
+        flush_lines()
+        flush_frames()
+        del self.pending[:pos]
+        return items
+
+    def parse_lines(self, lines):
+        items = []
+        samples = []
+        for raw in lines:
+            line = raw.strip()
+            if not line:
+                continue
+            if line.count(b",") == len(FIELDS) - 1:
+                samples.append(line)
+            else:
+                if samples:
+                    items.extend(self.parse_samples(samples))
+                    samples = []
+                items.append(("message", line.decode(errors="replace")))
+        if samples:
+            items.extend(self.parse_samples(samples))
+        return items
+
+    def parse_samples(self, samples):
+        try:
+            return [("data", lines_to_block(samples))]
+        except ValueError:
+            # Only fall back to line by line when the batch has a bad line in it
+            items = []
+            for line in samples:
+                try:
+                    items.append(("data", lines_to_block([line])))
+                except ValueError:
+                    self.parse_errors += 1
+                    items.append(("message", line.decode(errors="replace")))
+            return items
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from telemetry_buffer import FIELDS, TelemetryBuffer, load_spill, reserve_spill_path
+
+# Run from the repository root with: python -m pytest Zephyr_v2
+
+
+def samples(start, n):
+    # n rows whose every field is the sample's index, so order and gaps show up in any column
+    return np.repeat(np.arange(start, start + n, dtype=np.float64)[:, None], len(FIELDS), axis=1)
+
+
+def counts(rows):
+    return rows["dataPointCount"].tolist()
+
+
+def test_wraparound_keeps_newest_contiguous(tmp_path):
+    buffer = TelemetryBuffer(capacity=8, spill_dir=tmp_path)
+    for i in range(21):
+        buffer.append(samples(i, 1)[0])
+    assert len(buffer) == 8 and buffer.total == 21
+    assert counts(buffer.last()) == list(range(13, 21))
+    assert counts(buffer.last(3)) == [18, 19, 20]
+    assert buffer.last().base is not None  # A view into the ring, not a copy
+    assert buffer["P1"].tolist() == list(range(13, 21))
+
+
+@pytest.mark.parametrize("block", [1, 3, 8, 13])
+def test_extend_matches_append(tmp_path, block):
+    appended = TelemetryBuffer(capacity=8, spill_dir=tmp_path / "appended")
+    extended = TelemetryBuffer(capacity=8, spill_dir=tmp_path / "extended")
+    (tmp_path / "appended").mkdir()
+    (tmp_path / "extended").mkdir()
+    total = 0
+    while total < 40:
+        rows = samples(total, block)
+        extended.extend(rows)
+        for row in rows:
+            appended.append(row)
+        total += block
+    assert counts(extended.last()) == counts(appended.last())
+    assert counts(extended.to_array()) == counts(appended.to_array()) == list(range(total))
+
+
+def test_spill_keeps_whole_session(tmp_path):
+    buffer = TelemetryBuffer(capacity=16, spill_dir=tmp_path, spill_chunk=4)
+    assert buffer.spill_path is None
+    buffer.extend(samples(0, 10))
+    assert buffer.spill_path is None  # Nothing spilled until the ring is full
+    buffer.extend(samples(10, 50))
+    assert counts(buffer.to_array()) == list(range(60))
+    assert counts(buffer.to_array(include_spilled=False)) == list(range(44, 60))
+    spilled = counts(load_spill(buffer.spill_path))
+    assert spilled == list(range(len(spilled))) and len(spilled) >= 44
+
+
+def test_clear_starts_new_spill_file(tmp_path):
+    buffer = TelemetryBuffer(capacity=4, spill_dir=tmp_path)
+    buffer.extend(samples(0, 10))
+    first = buffer.spill_path
+    before = load_spill(first)
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.total == 0 and buffer.spill_path is None
+    assert counts(buffer.to_array()) == []
+    buffer.extend(samples(100, 10))
+    assert buffer.spill_path != first
+    assert np.array_equal(load_spill(first), before)
+    assert counts(buffer.to_array()) == list(range(100, 110))
+
+
+def test_spill_paths_are_unique(tmp_path):
+    paths = {reserve_spill_path(tmp_path) for _ in range(5)}
+    assert len(paths) == 5
+    assert sorted(str(p) for p in tmp_path.iterdir()) == sorted(paths)
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from telemetry_buffer import FIELDS
+from telemetry_protocol import FRAME_SIZE, SYNC, StreamDecoder, crc16, encode_frame
+
+# Run from the repository root with: python -m pytest Zephyr_v2
+
+
+def row(i):
+    # A sample that survives float32, with the count and time the frame stores as integers
+    return [i] + [i + j / 4 for j in range(1, len(FIELDS) - 1)] + [10 * i]
+
+
+def line(i):
+    return ",".join(str(x) for x in row(i)).encode() + b"\r\n"
+
+
+def decode(decoder, chunks):
+    # Feeds the chunks in order, returns the sample rows and the messages
+    data, messages = [], []
+    for chunk in chunks:
+        for kind, item in decoder.feed(chunk):
+            if kind == "data":
+                data.extend(item.tolist())
+            else:
+                messages.append(item)
+    return data, messages
+
+
+def test_frame_round_trip():
+    frame = encode_frame(row(7))
+    assert len(frame) == FRAME_SIZE and frame.startswith(SYNC)
+    assert crc16(b"123456789") == 0x29B1  # The CRC-16/CCITT-FALSE check value
+    assert decode(StreamDecoder(), [frame]) == ([row(7)], [])
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, FRAME_SIZE - 1, FRAME_SIZE + 3, 1000])
+def test_frames_split_across_chunks(size):
+    stream = b"".join(encode_frame(row(i)) for i in range(20))
+    chunks = [stream[i:i + size] for i in range(0, len(stream), size)]
+    decoder = StreamDecoder()
+    assert decode(decoder, chunks) == ([row(i) for i in range(20)], [])
+    assert decoder.crc_errors == 0 and not decoder.pending
+
+
+def test_bad_crc_is_dropped():
+    frames = [bytearray(encode_frame(row(i))) for i in range(3)]
+    frames[1][10] ^= 0x01
+    decoder = StreamDecoder()
+    assert decode(decoder, [b"".join(frames)]) == ([row(0), row(2)], [])
+    assert decoder.crc_errors == 1
+
+
+def test_resync_after_garbage():
+    # Garbage holding a stray sync word, so a false frame start has to be skipped
+    garbage = b"\x00\xff" + SYNC + b"\x13\x37" * 10
+    stream = encode_frame(row(0)) + garbage + encode_frame(row(1)) + encode_frame(row(2))
+    decoder = StreamDecoder()
+    data, messages = decode(decoder, [stream[i:i + 7] for i in range(0, len(stream), 7)])
+    assert data == [row(0), row(1), row(2)]
+    assert decoder.crc_errors >= 1
+
+
+def test_mixed_text_and_frames():
+    stream = (b"PHASE,IGNITION\r\n" + line(0) + line(1) + encode_frame(row(2)) + encode_frame(row(3))
+              + b"Setpoints updated\r\n" + line(4) + encode_frame(row(5)))
+    for size in (1, 3, len(stream)):
+        decoder = StreamDecoder()
+        data, messages = decode(decoder, [stream[i:i + size] for i in range(0, len(stream), size)])
+        assert data == [row(i) for i in range(6)]
+        assert messages == ["PHASE,IGNITION", "Setpoints updated"]
+        assert decoder.crc_errors == decoder.parse_errors == 0
+
+
+def test_partial_line_waits_for_newline():
+    decoder = StreamDecoder()
+    assert decoder.feed(line(0)[:-6]) == []
+    data, messages = decode(decoder, [line(0)[-6:]])
+    assert data == [row(0)] and messages == []
+
+
+def test_bad_data_line_is_a_message():
+    bad = b",".join([b"x"] * len(FIELDS)) + b"\r\n"
+    decoder = StreamDecoder()
+    data, messages = decode(decoder, [line(0) + bad + line(1)])
+    assert data == [row(0), row(1)]
+    assert messages == [bad.strip().decode()]
+    assert decoder.parse_errors == 1
+    assert np.isfinite(data).all()
@@ -3,57 +3,127 @@ import serial
 import threading
 import pyqtgraph as pg
 import time
-import csv
+import numpy as np
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QHBoxLayout,
     QTabWidget, QTextEdit, QLineEdit, QComboBox, QSlider
 )
 from PyQt5.QtGui import QFont, QPixmap
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from datetime import datetime
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 import serial.tools.list_ports
 import os
+import tempfile
+from telemetry_buffer import TelemetryBuffer, FIELDS
+from plot_decimation import minmax_decimate
+from telemetry_protocol import StreamDecoder, BINARY_MODE_ON, BINARY_MODE_OFF
+from run_recorder import RunRecorder, unique_path
+from sequences import TestSequence, TEST_CONNECTION_PHASES, PID_TUNE_PHASES, IGNITION_PHASES
+from instrumentation import RuntimeStats, TelemetryHealth, health_report
+
+# Graphs are redrawn at most this many times per second, independent of the data rate
+PLOT_FPS = 30
+# Visible window options for the graphs, in samples (None = everything retained)
+PLOT_WINDOWS = {"All": None, "500 samples": 500, "2000 samples": 2000, "10000 samples": 10000}
+# The Health tab's performance panel is refreshed this often, and the figures are written to the
+# current run's meta.json every HEALTH_EXPORT_INTERVAL
+HEALTH_REFRESH_MS = 500
+HEALTH_EXPORT_INTERVAL = 10.0  # s
 
 class SerialThread(QThread):
-    data_received = pyqtSignal(list)
+    # Parsed samples arrive as an (n, len(FIELDS)) float array, at most once per EMIT_INTERVAL
+    data_received = pyqtSignal(object)
     message_received = pyqtSignal(str)
 
+    EMIT_INTERVAL = 0.02  # s
+
     def __init__(self, serial_conn):
         super().__init__()
         self.serial_conn = serial_conn
         self.running = True
+        self.decoder = StreamDecoder()  # Handles both text lines and binary frames
+        self.samples = []               # Decoded blocks waiting to be emitted
+        self.last_emit = 0.0
+        self.batch_start = 0.0          # When the oldest waiting block was decoded
+        self.stats = RuntimeStats()     # Only written by this thread, read by the Health tab
 
     def run(self):
+        # Short port timeout so a quiet link still flushes batches and notices stop()
+        self.serial_conn.timeout = self.EMIT_INTERVAL
         while self.running and self.serial_conn.is_open:
-            if self.serial_conn.in_waiting:
-                try:
-                    line = self.serial_conn.readline().decode().strip()
-                    if "," in line:
-                        data = line.split(",")
-                        self.data_received.emit(data)
-                    else:
-                        self.message_received.emit(line)
-                except Exception as e:
-                    self.message_received.emit(f"Serial Error: {e}")
-            time.sleep(0.01)
+            try:
+                # Block for the first byte (up to the port timeout), then take everything queued
+                backlog = self.serial_conn.in_waiting
+                chunk = self.serial_conn.read(backlog or 1)
+            except Exception as e:
+                self.message_received.emit(f"Serial Error: {e}")
+                break
+            items = []
+            if chunk:
+                # A growing backlog means the reads aren't keeping up with the controller
+                self.stats.count("bytes", len(chunk))
+                self.stats.peak("backlog_bytes", backlog)
+                start = time.perf_counter()
+                items = self.decoder.feed(chunk)
+                self.stats.time("decode", time.perf_counter() - start)
+            for kind, payload in items:
+                if kind == "data":
+                    if not self.samples:
+                        self.batch_start = time.perf_counter()
+                    self.samples.append(payload)
+                else:
+                    # Keep messages in order with the data around them
+                    self.flush_samples()
+                    self.stats.count("messages")
+                    self.message_received.emit(payload)
+            if self.samples and time.monotonic() - self.last_emit >= self.EMIT_INTERVAL:
+                self.flush_samples()
+        self.flush_samples()
+
+    def flush_samples(self):
+        if not self.samples:
+            return
+        blocks, self.samples = self.samples, []
+        self.last_emit = time.monotonic()
+        block = np.concatenate(blocks)
+        self.stats.count("samples", len(block))
+        self.stats.time("batch_wait", time.perf_counter() - self.batch_start)
+        self.data_received.emit(block)
 
     def stop(self):
         self.running = False
 
 class PressureControlGUI(QWidget):
-    def __init__(self):
+    def __init__(self, extra_ports=()):
         super().__init__()
+        self.extra_ports = list(extra_ports)  # e.g. the pty printed by firmware_sim.py
         self.serial_conn = None
         self.serial_thread = None
-        self.data = {
-            "dataPointCount": [], "V0": [], "V1": [], "V2": [], "V3": [], "V4": [], "V5": [],
-            "P0": [], "P1": [], "P2": [], "P3": [], "P4": [], "P5": [],
-            "dP0": [], "dP1": [], "SV0": [], "SV1": [], "SP0": [], "SP1": [], "OP0": [], "OP1": [], "time": []
-        }
+        self.sequence = None
+        self.recorder = None
+        self.closed_recorders = []
+        # The recorder already keeps every sample, the buffer's spill files are only scratch
+        self.spill_dir = tempfile.TemporaryDirectory(prefix="zephyr_spill_")
+        self.data = TelemetryBuffer(spill_dir=self.spill_dir.name)
         self.plot_lines = {}
+        self.plot_sources = {}
+        self.plot_window = None
+        self.plots_dirty = False
+        self.stats = RuntimeStats()                # Hot paths on the GUI thread
+        self.telemetry_health = TelemetryHealth()  # Gaps and skew of the samples received
+        self.health_previous = None                # Last snapshot and its time, for the rates
+        self.health_exported = time.monotonic()
         self.initUI()
         self.setup_plots()
 
+        # Redraw on a fixed-rate timer instead of on every serial line
+        self.plot_timer = QTimer(self)
+        self.plot_timer.timeout.connect(self.update_plots)
+        self.plot_timer.start(1000 // PLOT_FPS)
+
+        self.health_timer = QTimer(self)
+        self.health_timer.timeout.connect(self.update_health)
+        self.health_timer.start(HEALTH_REFRESH_MS)
+
     def initUI(self):
         self.setWindowTitle("Command Centre")
         self.setFixedSize(1400, 900)
@@ -66,7 +136,8 @@ class PressureControlGUI(QWidget):
         graph_label = "<span style='font-size:10pt; font-weight:bold; color:white; font-family:Consolas;'>{}</span>"
 
         main_layout = QHBoxLayout()
-        image_path = os.path.join(os.getcwd(), "logosmall")
+        # Next to this file, so the GUI can be started from any directory
+        image_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logosmall.png")
 
         self.tabs = QTabWidget()
         self.tabs.setStyleSheet("""
@@ -149,6 +220,14 @@ class PressureControlGUI(QWidget):
         port_layout.addWidget(self.port_combo)
         settings_layout.addLayout(port_layout)
 
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel("Telemetry Mode:", styleSheet="color: #ffffff;"))
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems(["Text", "Binary"])
+        self.mode_combo.currentTextChanged.connect(self.set_telemetry_mode)
+        mode_layout.addWidget(self.mode_combo)
+        settings_layout.addLayout(mode_layout)
+
         init_serial_button = QPushButton("Initialize Serial Port")
         init_serial_button.clicked.connect(self.init_serial)
         init_serial_button.setStyleSheet("background-color: #ffffff; color: #000000;")
@@ -289,6 +368,14 @@ class PressureControlGUI(QWidget):
         button_layout.addWidget(shutdown_button)
         play_layout.addLayout(button_layout)
 
+        window_layout = QHBoxLayout()
+        window_layout.addWidget(QLabel("Plot Window:", styleSheet="color: #ffffff;"))
+        self.window_combo = QComboBox()
+        self.window_combo.addItems(PLOT_WINDOWS.keys())
+        self.window_combo.currentTextChanged.connect(self.set_plot_window)
+        window_layout.addWidget(self.window_combo)
+        play_layout.addLayout(window_layout)
+
         graph_layout2 = QHBoxLayout()
         graph_column1 = QVBoxLayout()
         self.graph_A0A1 = pg.PlotWidget(title=graph_label.format("A0/A1"))
@@ -342,6 +429,13 @@ class PressureControlGUI(QWidget):
         health_title_label.setStyleSheet("color: white;")
         health_layout.addWidget(health_title_label)
 
+        # Is the GUI keeping up: data and error rates, gaps, lag and hot path timings
+        self.health_label = QLabel()
+        self.health_label.setFont(small_font)
+        self.health_label.setStyleSheet("background-color: #000000; color: #ffffff; padding: 4px;")
+        self.health_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        health_layout.addWidget(self.health_label)
+
         graph_layout3 = QHBoxLayout()
         self.graph_delta_A0A1 = pg.PlotWidget(title=graph_label.format("delta A0/A1"))
         self.graph_delta_A0A1.setLabel('left', graph_label.format("P (kPa)"))
@@ -363,12 +457,11 @@ class PressureControlGUI(QWidget):
         main_layout.addWidget(self.tabs)
         self.setLayout(main_layout)
         self.update_port_list()
-        self.setup_plots()
 
     def update_port_list(self):
         ports = [port.device for port in serial.tools.list_ports.comports()]
         self.port_combo.clear()
-        self.port_combo.addItems(ports)
+        self.port_combo.addItems(ports + self.extra_ports)
 
     def update_serial(self, port):
         if self.serial_conn and self.serial_conn.is_open:
@@ -386,43 +479,44 @@ class PressureControlGUI(QWidget):
                 self.serial_thread.data_received.connect(self.handle_data)
                 self.serial_thread.message_received.connect(self.handle_message)
                 self.serial_thread.start()
+                self.start_recording()
+                if self.mode_combo.currentText() == "Binary":
+                    self.send_command(BINARY_MODE_ON)
                 self.settings_output.append(f"Serial port {port} initialized.")
         except serial.SerialException as e:
             self.settings_output.append(f"Error: {e}")
 
+    def set_telemetry_mode(self, mode):
+        # SerialThread decodes either format, so only the controller needs telling
+        self.send_command(BINARY_MODE_ON if mode == "Binary" else BINARY_MODE_OFF)
+        if self.recorder:
+            self.recorder.set_metadata("telemetry_mode", mode)
+
     def send_command(self, command):
         if self.serial_conn and self.serial_conn.is_open:
             self.serial_conn.write((command + "\n").encode())
 
-    def read_serial_data(self):
-        if self.serial_conn and self.serial_conn.in_waiting:
-            return self.serial_conn.readline().decode().strip().split(",")
-        return None
-
-    def handle_data(self, data):
-        try:
-            if len(data) >= 19:  # Match new 19-field format
-                self.data["dataPointCount"].append(float(data[0]))
-                for i in range(6):
-                    self.data[f"V{i}"].append(float(data[i + 1]))
-                    self.data[f"P{i}"].append(float(data[i + 7]) )  
-                self.data["dP0"].append(float(data[13]) )  
-                self.data["dP1"].append(float(data[14]))  
-                self.data["SV0"].append(float(data[15]))
-                self.data["SV1"].append(float(data[16]))
-                self.data["SP0"].append(float(data[17]))  
-                self.data["SP1"].append(float(data[18]))  
-                self.data["OP0"].append(float(data[19]))
-                self.data["OP1"].append(float(data[20]))
-                self.data["time"].append(float(data[21]))
-                self.update_plots()
-                if abs(self.data["dP0"][-1]) > 17.4 or abs(self.data["dP1"][-1]) > 101.5:
-                    self.send_command("IDLE")
-                    self.play_output.append("Differential pressure limit exceeded, shutting down.")
-        except (ValueError, IndexError) as e:
-            self.settings_output.append(f"Data parse error: {e}")
+    def handle_data(self, block):
+        # block is an (n, len(FIELDS)) array of samples parsed by SerialThread
+        start = time.perf_counter()
+        self.telemetry_health.check(block, time.monotonic())
+        self.data.extend(block)
+        self.plots_dirty = True
+        if self.recorder:
+            self.recorder.write(block)
+        if self.sequence:
+            self.sequence.on_data(block)
+        dP0 = np.abs(block[:, FIELDS.index("dP0")]).max()
+        dP1 = np.abs(block[:, FIELDS.index("dP1")]).max()
+        if dP0 > 17.4 or dP1 > 101.5:
+            self.send_command("IDLE")
+            self.play_output.append("Differential pressure limit exceeded, shutting down.")
+        self.stats.count("samples", len(block))
+        self.stats.time("handle_data", time.perf_counter() - start)
 
     def handle_message(self, msg):
+        if self.sequence and self.sequence.on_message(msg):
+            return
         if "TESTINGCONNECTION complete" in msg or "PID_DONE" in msg:
             self.save_data()
             self.settings_output.append(f"{msg} - Data saved.")
@@ -437,78 +531,127 @@ class PressureControlGUI(QWidget):
 
     def setup_plots(self):
         colors = {"data": "#ffffff", "setpoint": "#bfbfbf", "output": "#6d6d6d", "max": "#ff0000"}
-        self.plot_lines["V1_P"] = self.graph_V1_PID.plot(pen=colors["data"], name="P1 (kPa)")
-        self.plot_lines["V1_SP"] = self.graph_V1_PID.plot(pen=colors["setpoint"], name="V1 Setpoint (kPa)")
-        self.plot_lines["V1_OP"] = self.graph_V1_PID.plot(pen=colors["output"], name="V1 Output")
-
-        self.plot_lines["V2_P"] = self.graph_V2_PID.plot(pen=colors["data"], name="P3 (kPa)")
-        self.plot_lines["V2_SP"] = self.graph_V2_PID.plot(pen=colors["setpoint"], name="V2 Setpoint (kPa)")
-        self.plot_lines["V2_OP"] = self.graph_V2_PID.plot(pen=colors["output"], name="V2 Output")
-
-        self.plot_lines["A0"] = self.graph_A0A1.plot(pen=colors["data"], name="A0 (kPa)")
-        self.plot_lines["A1"] = self.graph_A0A1.plot(pen=colors["setpoint"], name="A1 (kPa)")
-        self.plot_lines["V1_SP_A0A1"] = self.graph_A0A1.plot(pen=colors["output"], name="V1 Setpoint (kPa)")
-        self.plot_lines["V1_OP_PWM1"] = self.graph_PWM1.plot(pen=colors["data"], name="V1 PWM")
-
-        self.plot_lines["A2"] = self.graph_A2A3.plot(pen=colors["data"], name="A2 (kPa)")
-        self.plot_lines["A3"] = self.graph_A2A3.plot(pen=colors["setpoint"], name="A3 (kPa)")
-        self.plot_lines["V2_SP_A2A3"] = self.graph_A2A3.plot(pen=colors["output"], name="V2 Setpoint (kPa)")
-        self.plot_lines["V2_OP_PWM2"] = self.graph_PWM2.plot(pen=colors["data"], name="V2 PWM")
+        # (curve key, graph, telemetry field, pen, legend name)
+        curves = [
+            ("V1_P", self.graph_V1_PID, "P1", colors["data"], "P1 (kPa)"),
+            ("V1_SP", self.graph_V1_PID, "SP0", colors["setpoint"], "V1 Setpoint (kPa)"),
+            ("V1_OP", self.graph_V1_PID, "OP0", colors["output"], "V1 Output"),
+
+            ("V2_P", self.graph_V2_PID, "P3", colors["data"], "P3 (kPa)"),
+            ("V2_SP", self.graph_V2_PID, "SP1", colors["setpoint"], "V2 Setpoint (kPa)"),
+            ("V2_OP", self.graph_V2_PID, "OP1", colors["output"], "V2 Output"),
+
+            ("A0", self.graph_A0A1, "P0", colors["data"], "A0 (kPa)"),
+            ("A1", self.graph_A0A1, "P1", colors["setpoint"], "A1 (kPa)"),
+            ("V1_SP_A0A1", self.graph_A0A1, "SP0", colors["output"], "V1 Setpoint (kPa)"),
+            ("V1_OP_PWM1", self.graph_PWM1, "OP0", colors["data"], "V1 PWM"),
+
+            ("A2", self.graph_A2A3, "P2", colors["data"], "A2 (kPa)"),
+            ("A3", self.graph_A2A3, "P3", colors["setpoint"], "A3 (kPa)"),
+            ("V2_SP_A2A3", self.graph_A2A3, "SP1", colors["output"], "V2 Setpoint (kPa)"),
+            ("V2_OP_PWM2", self.graph_PWM2, "OP1", colors["data"], "V2 PWM"),
+
+            ("A4", self.graph_A4A5, "P4", colors["data"], "A4 (kPa)"),
+            ("A5", self.graph_A4A5, "P5", colors["setpoint"], "A5 (kPa)"),
+
+            ("dP0", self.graph_delta_A0A1, "dP0", colors["data"], "Fuel dP (kPa)"),
+            ("dP1", self.graph_delta_A2A3, "dP1", colors["data"], "Ox dP (kPa)"),
+        ]
+        for key, graph, field, pen, name in curves:
+            self.plot_lines[key] = graph.plot(pen=pen, name=name)
+            self.plot_sources[key] = field
 
-        self.plot_lines["A4"] = self.graph_A4A5.plot(pen=colors["data"], name="A4 (kPa)")
-        self.plot_lines["A5"] = self.graph_A4A5.plot(pen=colors["setpoint"], name="A5 (kPa)")
+        # Limit lines are horizontal, so they cost the same to draw however long the run is
+        self.plot_lines["dP0_max"] = pg.InfiniteLine(pos=120, angle=0, pen=colors["max"], label="Max Delta (120 kPa)")
+        self.graph_delta_A0A1.addItem(self.plot_lines["dP0_max"])
+        self.plot_lines["dP1_max"] = pg.InfiniteLine(pos=700, angle=0, pen=colors["max"], label="Max Delta (700 kPa)")
+        self.graph_delta_A2A3.addItem(self.plot_lines["dP1_max"])
 
-        self.plot_lines["dP0"] = self.graph_delta_A0A1.plot(pen=colors["data"], name="Fuel dP (kPa)")
-        self.plot_lines["dP0_max"] = self.graph_delta_A0A1.plot(pen=colors["max"], name="Max Delta (120 kPa)")
-        self.plot_lines["dP1"] = self.graph_delta_A2A3.plot(pen=colors["data"], name="Ox dP (kPa)")
-        self.plot_lines["dP1_max"] = self.graph_delta_A2A3.plot(pen=colors["max"], name="Max Delta (700 kPa)")
+    def set_plot_window(self, text):
+        self.plot_window = PLOT_WINDOWS.get(text)
+        self.plots_dirty = True
 
     def update_plots(self):
-        t = self.data["time"]
-        self.plot_lines["V1_P"].setData(t, self.data["P1"])
-        self.plot_lines["V1_SP"].setData(t, self.data["SP0"])
-        self.plot_lines["V1_OP"].setData(t, self.data["OP0"])
-
-        self.plot_lines["V2_P"].setData(t, self.data["P3"])
-        self.plot_lines["V2_SP"].setData(t, self.data["SP1"])
-        self.plot_lines["V2_OP"].setData(t, self.data["OP1"])
-
-        self.plot_lines["A0"].setData(t, self.data["P0"])
-        self.plot_lines["A1"].setData(t, self.data["P1"])
-        self.plot_lines["V1_SP_A0A1"].setData(t, self.data["SP0"])
-        self.plot_lines["V1_OP_PWM1"].setData(t, self.data["OP0"])
+        # Called by plot_timer, only redraws when new samples have arrived
+        if not self.plots_dirty:
+            return
+        self.plots_dirty = False
+        start = time.perf_counter()
+        samples = self.data.last(self.plot_window)
+        t = samples["time"]
+        for key, field in self.plot_sources.items():
+            curve = self.plot_lines[key]
+            width = int(curve.getViewBox().width()) if curve.getViewBox() else 0
+            curve.setData(*minmax_decimate(t, samples[field], max(width, 100)))
+        self.stats.count("frames")
+        self.stats.time("plot_frame", time.perf_counter() - start)
+
+    def health_snapshot(self):
+        # Everything the Health tab shows, as exported to the run's meta.json
+        serial_thread = self.serial_thread
+        return {
+            "gui": self.stats.to_dict(),
+            "serial": serial_thread.stats.to_dict() if serial_thread else None,
+            "decoder": {"crc_errors": serial_thread.decoder.crc_errors,
+                        "parse_errors": serial_thread.decoder.parse_errors} if serial_thread else None,
+            "telemetry": self.telemetry_health.to_dict(),
+        }
 
-        self.plot_lines["A2"].setData(t, self.data["P2"])
-        self.plot_lines["A3"].setData(t, self.data["P3"])
-        self.plot_lines["V2_SP_A2A3"].setData(t, self.data["SP1"])
-        self.plot_lines["V2_OP_PWM2"].setData(t, self.data["OP1"])
+    def update_health(self):
+        # Called by health_timer, rates are over the time since the last call
+        now = time.monotonic()
+        snapshot = self.health_snapshot()
+        previous, elapsed = (None, None) if self.health_previous is None else (
+            self.health_previous[0], now - self.health_previous[1])
+        self.health_previous = snapshot, now
+        if self.tabs.currentWidget() is self.health_label.parentWidget():
+            self.health_label.setText(health_report(snapshot, previous, elapsed))
+        if self.recorder and now - self.health_exported >= HEALTH_EXPORT_INTERVAL:
+            self.recorder.set_metadata("health", snapshot)
+            self.health_exported = now
+
+    def start_recording(self):
+        # Everything received is streamed to a RUN_<timestamp> folder as it arrives
+        self.stop_recording()
+        # Each run's health starts from zero. init_serial also comes through here with a new
+        # SerialThread, whose counters restart, so the rates can't be taken against the old snapshot
+        self.stats = RuntimeStats()
+        self.telemetry_health = TelemetryHealth()
+        self.health_previous = None
+        self.health_exported = time.monotonic()
+        self.recorder = RunRecorder(metadata={
+            "port": self.port_combo.currentText(),
+            "k_values": self.k_values(),
+            "calibration": self.calibration_values(),
+        })
+
+    def stop_recording(self, csv_path=None):
+        if self.recorder:
+            self.recorder.set_metadata("health", self.health_snapshot())
+            self.recorder.close(csv_path)
+            # Only keep the ones still writing, for closeEvent to wait on
+            self.closed_recorders = [recorder for recorder in self.closed_recorders if recorder.is_alive()]
+            self.closed_recorders.append(self.recorder)
+            self.recorder = None
 
-        self.plot_lines["A4"].setData(t, self.data["P4"])
-        self.plot_lines["A5"].setData(t, self.data["P5"])
+    def save_data(self):
+        # Ends the current run (CSV export happens on the recorder thread) and starts a new one
+        if not self.recorder:
+            return
+        start = time.perf_counter()
+        self.stop_recording(unique_path(os.getcwd(), "DATA", ".csv"))
+        if self.serial_conn and self.serial_conn.is_open:
+            self.start_recording()
+        self.stats.count("saves")
+        self.stats.time("save_data", time.perf_counter() - start)
 
-        self.plot_lines["dP0"].setData(t, self.data["dP0"])
-        self.plot_lines["dP0_max"].setData(t, [120] * len(t))
-        self.plot_lines["dP1"].setData(t, self.data["dP1"])
-        self.plot_lines["dP1_max"].setData(t, [700] * len(t))
+    def k_values(self):
+        return [getattr(self, f"{param}{prefix}_slider").value() * 0.1
+                for prefix in ("V1", "V2") for param in ("kp", "ki", "kd")]
 
-    def save_data(self):
-        timestamp = datetime.now().strftime("%m-%d_%H-%M")
-        file_name = os.path.join(os.getcwd(), f"DATA_{timestamp}.csv")
-        with open(file_name, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "Time", "V0", "V1", "V2", "V3", "V4", "V5", "P0", "P1", "P2", "P3", "P4", "P5",
-                "dP0", "dP1", "SV0", "SV1", "SP0", "SP1", "OP0", "OP1"
-            ])
-            for i in range(len(self.data["time"])):
-                writer.writerow([
-                    self.data["time"][i],
-                    self.data["V0"][i], self.data["V1"][i], self.data["V2"][i], self.data["V3"][i],
-                    self.data["V4"][i], self.data["V5"][i], self.data["P0"][i], self.data["P1"][i],
-                    self.data["P2"][i], self.data["P3"][i], self.data["P4"][i], self.data["P5"][i],
-                    self.data["dP0"][i], self.data["dP1"][i], self.data["SV0"][i], self.data["SV1"][i],
-                    self.data["SP0"][i], self.data["SP1"][i], self.data["OP0"][i], self.data["OP1"][i]
-                ])
+    def calibration_values(self):
+        return {attr: getattr(self, attr).text()
+                for attr in ("v_min_edit", "v_max_edit", "p_min_edit", "p_max_edit", "v_ref_edit")}
 
     def update_valve(self, value, label, index):
         val = value * 0.33
@@ -532,6 +675,9 @@ class PressureControlGUI(QWidget):
         kd2 = self.kdV2_slider.value() * 0.1
         self.send_command(f"{kp1},{ki1},{kd1},{kp2},{ki2},{kd2}")
         self.settings_output.append(f"K values sent: {kp1},{ki1},{kd1},{kp2},{ki2},{kd2}")
+        if self.recorder:
+            self.recorder.set_metadata("k_values", [kp1, ki1, kd1, kp2, ki2, kd2])
+            self.recorder.add_event("UPDATE_K_VALUES")
 
     def send_calibration(self):
         v_min = self.v_min_edit.text()
@@ -542,97 +688,55 @@ class PressureControlGUI(QWidget):
         try:
             float(v_min), float(v_max), float(p_min), float(p_max), float(v_ref)
             self.send_command(f"UPDATE_CALIBRATION,{v_min},{v_max},{p_min},{p_max},{v_ref}")
+            if self.recorder:
+                self.recorder.set_metadata("calibration", self.calibration_values())
+                self.recorder.add_event("UPDATE_CALIBRATION")
         except ValueError:
             self.settings_output.append("Error: Calibration values must be numbers")
 
+    def start_sequence(self, command, name, phases, output):
+        # Test sequences are driven by the frames SerialThread delivers, so nothing here blocks
+        if self.sequence:
+            output.append(f"{self.sequence.name} already running.")
+            return
+        if not (self.serial_conn and self.serial_conn.is_open):
+            output.append("Error: Serial port not initialized.")
+            return
+        self.sequence = TestSequence(name, phases, parent=self)
+        self.sequence.log.connect(output.append)
+        if self.recorder:
+            self.sequence.phase_changed.connect(self.recorder.add_event)
+            self.recorder.add_event(f"SENT {command}")
+        self.sequence.finished.connect(lambda completed: self.end_sequence(completed, output))
+        self.send_command(command)
+
+    def end_sequence(self, completed, output):
+        self.sequence = None
+        if completed:
+            output.append("Test completed. Returning to idle & saving data.")
+        else:
+            output.append("Test ended without returning to idle, saving data.")
+        self.save_data()
+        output.append("Data saved to working directory.")
+
     def test_connection(self):
-        self.send_command("TEST_CONNECTION")
-        while True:
-            response = self.read_serial_data()
-            if response and "IDLE" in response:
-                self.settings_output.append("Test completed. Returning to idle & saving data.")
-                self.save_data()
-                self.settings_output.append("Data saved to working directory.")
-                break
-            elif response:
-                self.settings_output.append(",".join(response))
-            QApplication.processEvents()
+        self.start_sequence("TEST_CONNECTION", "Connection test", TEST_CONNECTION_PHASES, self.settings_output)
 
     def pid_tune_test(self):
-        self.send_command("PID_TUNE_TEST")
-        while True:
-            response = self.read_serial_data()
-            if response and "IDLE" in response:
-                self.settings_output.append("Test completed. Returning to idle & saving data.")
-                self.save_data()
-                self.settings_output.append("Data saved to working directory.")
-                break
-            elif response and "PID_DONE" in response:
-                self.settings_output.append("PID tuning test completed.")
-            elif response:
-                try:
-                    self.data["dataPointCount"].append(float(response[0]))
-                    for i in range(6):
-                        self.data[f"V{i}"].append(float(response[i + 1]))
-                        self.data[f"P{i}"].append(float(response[i + 7])) 
-                    self.data["dP0"].append(float(response[13])) 
-                    self.data["dP1"].append(float(response[14]))  
-                    self.data["SV0"].append(float(response[15]))
-                    self.data["SV1"].append(float(response[16]))
-                    self.data["SP0"].append(float(response[17]))  
-                    self.data["SP1"].append(float(response[18])) 
-                    self.data["OP0"].append(float(response[19]))
-                    self.data["OP1"].append(float(response[20]))
-                    self.data["time"].append(float(response[21]))
-                    self.update_plots()
-                    self.settings_output.append("Testing...")
-                except (ValueError, IndexError) as e:
-                    self.settings_output.append(f"Data parse error: {e}")
-            QApplication.processEvents()
+        self.start_sequence("PID_TUNE_TEST", "PID tune test", PID_TUNE_PHASES, self.settings_output)
 
     def ignition(self):
-        self.send_command("IGNITION")
-        while True:
-            response = self.read_serial_data()
-            if response and "IDLE" in response:
-                self.play_output.append("Test completed. Returning to idle & saving data.")
-                self.save_data()
-                self.play_output.append("Data saved to working directory.")
-                break
-            elif response and any(state in response for state in ["IGNITION", "THRUSTING", "COOLING"]):
-                self.play_output.append(f"{response.split(',')[0]} state commenced.")
-            elif response:
-                try:
-                    self.data["dataPointCount"].append(float(response[0]))
-                    for i in range(6):
-                        self.data[f"V{i}"].append(float(response[i + 1]))
-                        self.data[f"P{i}"].append(float(response[i + 7])) 
-                    self.data["dP0"].append(float(response[13])) 
-                    self.data["dP1"].append(float(response[14]))  
-                    self.data["SV0"].append(float(response[15]))
-                    self.data["SV1"].append(float(response[16]))
-                    self.data["SP0"].append(float(response[17]))  
-                    self.data["SP1"].append(float(response[18]))  
-                    self.data["OP0"].append(float(response[19]))
-                    self.data["OP1"].append(float(response[20]))
-                    self.data["time"].append(float(response[21]))
-                    self.update_plots()
-                    if abs(self.data["dP0"][-1]) > 17.4 or abs(self.data["dP1"][-1]) > 101.5:
-                        self.send_command("IDLE")
-                        self.play_output.append("Differential pressure limit exceeded, shutting down.")
-                    self.play_output.append("Testing...")
-                except (ValueError, IndexError) as e:
-                    self.play_output.append(f"Data parse error: {e}")
-            QApplication.processEvents()
+        self.start_sequence("IGNITION", "Ignition", IGNITION_PHASES, self.play_output)
 
     def shutdown(self):
         self.send_command("IDLE")
         self.play_output.append("Forced System Shutdown...")
-        response = self.read_serial_data()
-        if response:
-            self.play_output.append(response[0])
-        self.save_data()
-        self.play_output.append("Data saved to working directory.")
+        if self.sequence:
+            # Saves the data through end_sequence
+            self.sequence.abort()
+        else:
+            self.save_data()
+            self.play_output.append("Data saved to working directory.")
 
     def closeEvent(self, event):
         if self.serial_thread:
@@ -640,6 +744,10 @@ class PressureControlGUI(QWidget):
             self.serial_thread.wait()
         if self.serial_conn:
             self.serial_conn.close()
+        self.stop_recording()
+        for recorder in self.closed_recorders:
+            recorder.join()
+        self.spill_dir.cleanup()
         event.accept()
 
     def update_kpV1(self):
@@ -668,6 +776,6 @@ class PressureControlGUI(QWidget):
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    gui = PressureControlGUI()
+    gui = PressureControlGUI(extra_ports=sys.argv[1:])
     gui.show()
     sys.exit(app.exec_())
\ No newline at end of file
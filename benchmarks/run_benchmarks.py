@@ -0,0 +1,273 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Timing suite for the hot paths of both versions, with fixed inputs so runs can be compared
+# over time. Run from the repository root with:
+#   python benchmarks/run_benchmarks.py                       # print the timings
+#   python benchmarks/run_benchmarks.py --save laptop         # store them as baselines/laptop.json
+#   python benchmarks/run_benchmarks.py --compare laptop      # exit code 1 if anything got slower
+# --only takes part of a benchmark name, e.g. --only gui. Caches are redirected to a temporary
+# directory so every run does the full calculation, and the GUI runs on Qt's offscreen platform.
+#
+# baselines/reference.json is the committed reference, what --compare uses without a name. Its
+# machine entry says where it was measured; timings only compare on the same machine, so save a
+# baseline of your own before changing anything and compare against that. Re-save the reference
+# (--save reference) when a change is meant to move the numbers, in the same commit.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+REFERENCE = 'reference'
+
+# A benchmark fails --compare when its best time is this many times the baseline's
+SLOWDOWN_THRESHOLD = 1.25
+
+# Synthetic telemetry for the GUI benchmarks
+TELEMETRY_LINES = 100000
+TELEMETRY_BLOCK = 1000  # Samples per handle_data call, about what SerialThread emits at full rate
+
+BENCHMARKS = []
+_app = None  # The QApplication of the GUI benchmarks
+
+
+def benchmark(repeat=5):
+    """
+    Register a benchmark. The decorated function does any set up and
+    returns the callable to time, which is run `repeat` times.
+    """
+    def register(setup):
+        BENCHMARKS.append((setup.__name__, setup, repeat))
+        return setup
+    return register
+
+
+@benchmark(repeat=3)
+def mechanism_load():
+    import cantera as ct
+    return lambda: ct.Solution('gri30.yaml')
+
+
+@benchmark()
+def hp_equilibrium():
+    from Zephyr_v1.combustion_optimiser import adiabatic_flame_temp
+    return lambda: adiabatic_flame_temp(1.5, 2500, fuel='CH4', moles_O2_stoich=2, use_cache=False)
+
+
+@benchmark(repeat=3)
+def ofr_sweep_1000():
+    import numpy as np
+    from Zephyr_v1.combustion_optimiser import ofr_sweep
+    OFR = np.linspace(0.5, 4, 1000)
+    return lambda: ofr_sweep(OFR, fuel='CH4', moles_O2_stoich=2, use_cache=False)
+
+
+@benchmark(repeat=3)
+def reactor_10ms():
+    from Zephyr_v1.GasReactor import simulate
+    return lambda: simulate(1200, 101325.0, 'CH4:1, O2:2', end_time=0.01)
+
+
+@benchmark(repeat=3)
+def ignition_delay_point():
+    from Zephyr_v1.ignition_delay import ignition_delay
+    return lambda: ignition_delay(1200, 101325.0, 1.0, fuel='CH4')
+
+
+@benchmark(repeat=1)
+def free_flame_coarse():
+    # Cold start at the loosest refine criteria only, with a fresh flame cache every run
+    from Zephyr_v1.flame_sweep import FlameCache, REFINE_SCHEDULE, solve_flame
+
+    def run():
+        with tempfile.TemporaryDirectory() as directory:
+            solve_flame(1.0, 101325.0, 300, fuel='CH4', oxidizer='O2:1, N2:3.76', schedule=REFINE_SCHEDULE[:1],
+                        cache=FlameCache(directory))
+    return run
+
+
+@benchmark(repeat=3)
+def coolprop_grid_100x100():
+    import numpy as np
+    from Zephyr_v1.PVT_coolprop import property_grid
+    T, P = np.linspace(200, 700, 100)[:, None], np.linspace(1e5, 2e7, 100)
+    return lambda: property_grid('Methane', T, P)
+
+
+@benchmark()
+def area_ratio_1e6():
+    import numpy as np
+    from Zephyr_v1.nozzle_ratios import area_ratio_M
+    M = np.random.default_rng(0).uniform(0.05, 5, 10**6)
+    return lambda: area_ratio_M(M, 1.2)
+
+
+@benchmark()
+def mach_from_area_ratio_1e6():
+    import numpy as np
+    from Zephyr_v1.nozzle_ratios import mach_from_area_ratio
+    rng = np.random.default_rng(0)
+    Ar, k = rng.uniform(1, 25, 10**6), rng.uniform(1.1, 1.4, 10**6)
+    return lambda: (mach_from_area_ratio(Ar, k, 'subsonic'), mach_from_area_ratio(Ar, k, 'supersonic'))
+
+
+def telemetry_lines(n=TELEMETRY_LINES):
+    # Text lines as firmware_sim.py sends them, 1 ms apart
+    import math
+    lines = []
+    for i in range(n):
+        t = i / 1000
+        p = [100 + 20 * math.sin(t + j) for j in range(6)]
+        v = [0.5 + x / 2068 * 4 for x in p]
+        row = [i] + v + p + [p[0] - p[1], p[2] - p[3], 1, 1, 10, 300, 128, 128, i]
+        lines.append(','.join(f'{x:.2f}' if isinstance(x, float) else str(x) for x in row))
+    return ('\r\n'.join(lines) + '\r\n').encode()
+
+
+def gui_window():
+    # The main window. It opens the first serial port it finds, hide them all so nothing is sent
+    # to a connected controller
+    from unittest import mock
+    from PyQt5.QtWidgets import QApplication
+    from user_interface import PressureControlGUI
+    global _app
+    _app = QApplication.instance() or QApplication([])  # Kept alive, the widgets go with it
+    with mock.patch('serial.tools.list_ports.comports', return_value=[]):
+        gui = PressureControlGUI()
+    gui.show()
+    gui.plot_timer.stop()
+    return gui
+
+
+@benchmark()
+def gui_parse_100k():
+    from telemetry_protocol import StreamDecoder
+    stream = telemetry_lines()
+    # SerialThread reads whatever is waiting, feed in serial-sized chunks
+    chunks = [stream[i:i + 4096] for i in range(0, len(stream), 4096)]
+
+    def run():
+        decoder = StreamDecoder()
+        for chunk in chunks:
+            decoder.feed(chunk)
+    return run
+
+
+@benchmark()
+def gui_append_100k():
+    import numpy as np
+    from telemetry_protocol import StreamDecoder
+    gui = gui_window()
+    block = np.vstack([data for kind, data in StreamDecoder().feed(telemetry_lines()) if kind == 'data'])
+    blocks = np.array_split(block, len(block) // TELEMETRY_BLOCK)
+
+    def run():
+        gui.data.clear()
+        for b in blocks:
+            gui.handle_data(b)
+    return run
+
+
+@benchmark()
+def gui_plot_100k():
+    from telemetry_protocol import StreamDecoder
+    gui = gui_window()
+    for kind, data in StreamDecoder().feed(telemetry_lines()):
+        if kind == 'data':
+            gui.handle_data(data)
+
+    def run():
+        gui.plots_dirty = True
+        gui.update_plots()
+        _app.processEvents()
+    return run
+
+
+def time_benchmark(setup, repeat):
+    # Best and median of `repeat` runs, in seconds
+    run = setup()
+    run()  # Warm up: first-call imports, caches of loaded mechanisms and Qt's first paint
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times), 'repeat': repeat}
+
+
+def machine():
+    import numpy as np
+    versions = {'python': platform.python_version(), 'numpy': np.__version__}
+    for module in ('cantera', 'CoolProp', 'scipy', 'PyQt5.QtCore'):
+        try:
+            imported = __import__(module, fromlist=['_'])
+            versions[module] = getattr(imported, '__version__', getattr(imported, 'PYQT_VERSION_STR', None))
+        except ImportError:
+            versions[module] = None
+    return {'platform': platform.platform(), 'processor': platform.processor(), 'cpus': os.cpu_count(),
+            'versions': versions}
+
+
+def compare(results, baseline, threshold=SLOWDOWN_THRESHOLD):
+    # Prints each benchmark's best time against the baseline's, returns the names that got slower
+    slower = []
+    for name, result in results.items():
+        if name not in baseline['results']:
+            print(f'{name:<26} not in baseline')
+            continue
+        ratio = result['min'] / baseline['results'][name]['min']
+        flag = '  SLOWER' if ratio > threshold else ''
+        print(f'{name:<26} {ratio:6.2f}x baseline{flag}')
+        if flag:
+            slower.append(name)
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the hot paths of Zephyr_v1 and Zephyr_v2')
+    parser.add_argument('--only', help='only run benchmarks whose name contains this')
+    parser.add_argument('--save', metavar='NAME', help=f'store the results as {BASELINE_DIR}/NAME.json')
+    parser.add_argument('--compare', metavar='NAME', nargs='?', const=REFERENCE,
+                        help=f'compare against a stored baseline (default {REFERENCE})')
+    parser.add_argument('--threshold', type=float, default=SLOWDOWN_THRESHOLD,
+                        help='slowdown ratio that counts as a regression (default %(default)s)')
+    args = parser.parse_args(argv)
+
+    # Nothing is read from or written to the real caches. Zephyr_v2's modules import each other
+    # by their plain names, as when the GUI is run from its own directory
+    os.environ['ZEPHYR_CACHE_DIR'] = tempfile.mkdtemp()
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path[:0] = [ROOT, os.path.join(ROOT, 'Zephyr_v2')]
+
+    results = {}
+    for name, setup, repeat in BENCHMARKS:
+        if args.only and args.only not in name:
+            continue
+        results[name] = time_benchmark(setup, repeat)
+        print(f'{name:<26} {results[name]["min"] * 1000:10.1f} ms best, {results[name]["median"] * 1000:10.1f} ms '
+              f'median of {repeat}', flush=True)
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f'{args.save}.json')
+        with open(path, 'w') as f:
+            json.dump({'date': datetime.now().isoformat(timespec='seconds'), 'machine': machine(),
+                       'results': results}, f, indent=2)
+        print(f'Saved {path}')
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f'{args.compare}.json')) as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, args.threshold)
+        print(f'{len(results) - len(slower)}/{len(results)} benchmarks within {args.threshold:.2f}x of '
+              f'{args.compare}')
+        return not slower
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)